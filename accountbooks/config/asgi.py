@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'config.asgi_urls')
 
 application = get_asgi_application()
+
+# 회원가입 이메일 Bloom filter 를 백그라운드에서 채운다. (worker 프로세스마다)
+from users.email_filter import email_filter  # noqa: E402
+
+email_filter.start()
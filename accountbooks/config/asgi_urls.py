@@ -0,0 +1,13 @@
+"""config URL Configuration (ASGI)
+
+`config.asgi`가 사용하는 URL 설정으로, 비동기 뷰가 있는 경로는 비동기 뷰로 연결한다.
+"""
+from django.urls import path, include
+
+from utils.metrics import MetricsView
+
+urlpatterns = [
+    path('expenses/', include('expenses.async_urls')),
+    path('metrics/', MetricsView.as_view()),
+    path('user/', include('users.async_urls')),
+]
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
+
 import my_settings
 
 from pathlib import Path
@@ -44,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'utils.middleware.TimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,7 +56,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'config.urls'
+# ASGI(`config.asgi`)는 비동기 뷰를 사용하는 `config.asgi_urls`를 사용한다.
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'config.urls')
 
 TEMPLATES = [
     {
@@ -122,3 +126,163 @@ STATIC_URL = '/static/'
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Pagination
+# 지출내역 리스트 뷰의 커서(cursor) 페이지 크기 기본값과 상한값
+
+EXPENSE_PAGE_SIZE = 100
+
+EXPENSE_MAX_PAGE_SIZE = 1000
+
+# Search
+# auto: MySQL FULLTEXT(ngram parser) 사용, 그 외 DB는 n-gram 역색인 테이블 사용
+# ngram: 항상 n-gram 역색인 테이블 사용
+
+EXPENSE_SEARCH_BACKEND = 'auto'
+
+# Authorization
+# 검증된 token → 유저 정보 in-process 캐시 (LRU 최대 크기, TTL 초). 0 이면 사용하지 않는다.
+
+AUTH_PRINCIPAL_CACHE_SIZE = 10000
+
+AUTH_PRINCIPAL_CACHE_TTL = 300
+
+# Bulk operations
+# 일괄등록 요청당 최대 항목 수와 bulk_create chunk 크기
+
+EXPENSE_BULK_MAX_SIZE = 1000
+
+EXPENSE_BULK_CHUNK_SIZE = 500
+
+# Streaming
+# 스트리밍 응답의 서버 측 커서 fetch 크기
+
+STREAM_CHUNK_SIZE = 2000
+
+# Async
+# ASGI 비동기 뷰의 ORM 호출을 실행하는 DB 전용 스레드 풀 크기 (0 이면 sync_to_async 사용)
+
+ASYNC_DB_POOL_SIZE = 8
+
+# Password hashing
+# bcrypt cost factor 와 해싱 전용 스레드 풀 크기(None 이면 CPU 코어 수), 최대 대기 작업 수, 대기 시간(초)
+
+BCRYPT_ROUNDS = 12
+
+PASSWORD_HASHER_WORKERS = None
+
+PASSWORD_HASHER_MAX_PENDING = 32
+
+PASSWORD_HASHER_TIMEOUT = 5
+
+# Instrumentation
+# 요청별 성능 계측(Server-Timing 헤더, 로그, 경로별 히스토그램) 사용 여부와 /metrics/ 조회 허용 주소
+
+REQUEST_TIMING_ENABLED = True
+
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# JSON
+# True 이면 JsonResponse 를 빠른 인코더(orjson 이 설치되어 있으면 orjson)로 직렬화한다.
+# orjson 은 선택 의존성이다. (`pip install orjson`) 설치되어 있으면 응답이 공백 없는 UTF-8 JSON 이 되며,
+# 없으면 `DjangoJSONEncoder`와 같은 바이트를 출력한다. 어느 쪽이든 값(날짜 형식 포함)은 같다.
+
+JSON_FAST_ENCODER = True
+
+# Database connection pool
+# `utils.db.mysql` 백엔드의 연결 풀 크기, 연결 수명(초), pre-ping 사용 여부, 대기 시간(초)
+# (DATABASES 항목에 POOL 이 있으면 그 값을 사용한다)
+
+DATABASE_POOL = {
+    'MIN_SIZE'    : 2,
+    'MAX_SIZE'    : 20,
+    'MAX_LIFETIME': 1800,
+    'PRE_PING'    : True,
+    'TIMEOUT'     : 10,
+}
+
+# Read replicas
+# 읽기 전용 replica DB alias 목록(my_settings.DATABASE_REPLICAS), 쓰기 후 primary 고정 시간(초),
+# 복제 지연 허용치(초)와 확인 주기(초), 항상 primary 에서 읽는 모델
+
+DATABASE_ROUTERS = ['utils.routers.ShardRouter', 'utils.routers.ReplicaRouter']
+
+DATABASE_REPLICAS = getattr(my_settings, 'DATABASE_REPLICAS', [])
+
+READ_YOUR_WRITES_WINDOW = 5
+
+REPLICA_MAX_LAG = 10
+
+REPLICA_LAG_CHECK_INTERVAL = 5
+
+PRIMARY_ONLY_MODELS = ['expenses.LedgerVersion', 'expenses.ShardMap', 'expenses.ExpenseImport', 'expenses.Job']
+
+# Sharding
+# 유저별 가계부 데이터(SHARDED_MODELS)를 나누어 저장하는 shard DB alias 목록(my_settings.DATABASE_SHARDS)과
+# shard map(유저 → shard) 캐시 TTL(초). default 는 항상 포함되며 shard map 에 없는 유저의 shard 이다.
+# shard 간 이동 시 id 를 유지하므로 shard 마다 id 범위가 겹치지 않아야 한다. (MySQL auto_increment_offset 등)
+
+DATABASE_SHARDS = getattr(my_settings, 'DATABASE_SHARDS', ['default'])
+
+SHARDED_MODELS = [
+    'expenses.Expense',
+    'expenses.DeletedExpense',
+    'expenses.Tag',
+    'expenses.ExpenseSearchToken',
+    'expenses.DailySpending',
+    'expenses.MonthlySpending',
+    'expenses.TagMonthlySpending',
+    'expenses.LedgerVersion',
+]
+
+SHARD_MAP_CACHE_TTL = 10
+
+# Import
+# CSV 가져오기 업로드 최대 크기(byte), 트랜잭션(bulk_create) 당 행 수, 오류 파일에 기록하는 최대 줄 수, 오류 파일 디렉터리
+
+EXPENSE_IMPORT_MAX_SIZE = 100 * 1024 * 1024
+
+EXPENSE_IMPORT_CHUNK_SIZE = 5000
+
+EXPENSE_IMPORT_MAX_ERRORS = 10000
+
+EXPENSE_IMPORT_DIR = os.path.join(BASE_DIR, 'imports')
+
+# Jobs
+# 작업자(run_jobs) 프로세스 수, 대기열 확인 간격(초), 점유 시각이 갱신되지 않은 작업을 다시 대기열에 넣는 시간(초),
+# 재시도 대기 시간(초, 시도마다 2배)과 상한, 내보내기 작업 파일 디렉터리
+
+JOB_WORKER_PROCESSES = 2
+
+JOB_POLL_INTERVAL = 1
+
+JOB_LOCK_TIMEOUT = 300
+
+JOB_RETRY_BACKOFF = 5
+
+JOB_RETRY_MAX_DELAY = 600
+
+JOB_OUTPUT_DIR = os.path.join(BASE_DIR, 'jobs')
+
+# Admission control
+# CPU 비용이 큰 경로(bcrypt)의 경로별 동시 실행 수, 최대 대기 요청 수, 최대 대기 시간(초),
+# 클라이언트 주소별･이메일별 토큰 버킷(초당 요청 수, burst)과 버킷 최대 키 수,
+# 클라이언트 주소 헤더(프록시 뒤에서 사용, None 이면 REMOTE_ADDR). 카운터는 /metrics/ 에서 조회한다.
+
+ADMISSION_CONTROL = {
+    'signin': {'concurrency': 8, 'queue': 16, 'timeout': 1, 'client_rate': 2, 'client_burst': 20,
+               'email_rate': 0.2, 'email_burst': 10},
+    'signup': {'concurrency': 4, 'queue': 8, 'timeout': 1, 'client_rate': 0.5, 'client_burst': 10,
+               'email_rate': 0.1, 'email_burst': 3},
+}
+
+ADMISSION_CONTROL_MAX_KEYS = 100000
+
+ADMISSION_CLIENT_IP_HEADER = None
+
+# Sign-up email filter
+# 회원가입 이메일 중복 확인용 Bloom filter 의 초기 용량(항목 수, 0 이면 사용하지 않는다)과 목표 false positive 비율
+
+SIGNUP_EMAIL_FILTER_CAPACITY = 1000000
+
+SIGNUP_EMAIL_FILTER_ERROR_RATE = 0.01
@@ -15,7 +15,10 @@ Including another URLconf
 """
 from django.urls import path, include
 
+from utils.metrics import MetricsView
+
 urlpatterns = [
     path('expenses/', include('expenses.urls')),
+    path('metrics/', MetricsView.as_view()),
     path('user/', include('users.urls')),
 ]
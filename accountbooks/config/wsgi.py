@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# 회원가입 이메일 Bloom filter 를 백그라운드에서 채운다. (worker 프로세스마다)
+from users.email_filter import email_filter  # noqa: E402
+
+email_filter.start()
@@ -0,0 +1,177 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Min, Sum
+from django.db.models.functions import TruncMonth, TruncWeek, TruncYear
+
+from utils.exceptions import InvalidValueException
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# 집계 단위 → 날짜 절사(truncation) 함수 (week 는 월요일 시작)
+# date 는 DateField 이므로 일 단위는 절사 없이 그대로 묶는다. (인덱스 순서로 그룹핑되며 함수 호출이 없다)
+PERIODS = {'day': F, 'week': TruncWeek, 'month': TruncMonth, 'year': TruncYear}
+
+# 집계 열 (percentile 열은 뒤에 `p<백분위>`로 붙는다)
+FIELDS = ('bucket', 'total', 'count', 'avg', 'min', 'max')
+
+# 요청당 최대 백분위 수
+MAX_PERCENTILES = 10
+
+# 백분위 계산 시 금액 열의 fetch 크기
+CHUNK_SIZE = getattr(settings, 'STREAM_CHUNK_SIZE', 2000)
+
+
+def get_options(params):
+    """
+    집계 옵션 검사 함수.
+
+    parameters
+    ----------
+    params: dict-like
+        period: str (day, week, month or year, default: month)
+        start-date: str (yyyy-mm-dd)
+        end-date: str (yyyy-mm-dd)
+        percentiles: str (쉼표로 구분한 0~100 사이 값, 예: 50,90,99)
+
+    returns
+    -------
+    options: dict
+        period, start_date, end_date, percentiles (list of float)
+    """
+
+    period = params.get('period') or 'month'
+    if period not in PERIODS:
+        raise InvalidValueException(message="'period' must be one of %s." % ', '.join(PERIODS))
+    try:
+        start_date, end_date = [datetime.date.fromisoformat(params[key]) if params.get(key) else None
+                                for key in ('start-date', 'end-date')]
+    except ValueError:
+        raise InvalidValueException(message="date format must be 'yyyy-mm-dd'.")
+    if start_date and end_date and start_date > end_date:
+        raise InvalidValueException(message="'end-date' must greater than 'start-date'.")
+
+    percentiles = []
+    for value in filter(None, (params.get('percentiles') or '').split(',')):
+        try:
+            percentile = float(value)
+        except ValueError:
+            percentile = -1
+        if not 0 <= percentile <= 100:
+            raise InvalidValueException(message="'percentiles' must be numbers between 0 and 100.")
+        percentiles.append(percentile)
+    if len(percentiles) > MAX_PERCENTILES:
+        raise InvalidValueException(message="too many percentiles. (max: %d)" % MAX_PERCENTILES)
+    return {'period': period, 'start_date': start_date, 'end_date': end_date, 'percentiles': percentiles}
+
+
+def percentile_field(percentile):
+    return 'p%g' % percentile
+
+
+def compute_percentiles(amounts, counts, percentiles):
+    """
+    bucket 별 백분위 계산 함수. (NumPy)
+
+    bucket 순서로 이어진 금액 배열을 bucket 안에서 정렬(lexsort)한 뒤 모든 bucket･백분위의 위치를 한 번에 구하여
+    선형 보간한다. (`numpy.percentile`의 기본 방식과 같다) bucket 별 파이썬 반복문이 없다.
+
+    parameters
+    ----------
+    amounts: numpy.ndarray (int64, bucket 순서)
+    counts: list of int (bucket 별 행 수, 합계는 len(amounts))
+    percentiles: list of float
+
+    returns
+    -------
+    values: numpy.ndarray (bucket 수 × 백분위 수)
+    """
+
+    counts = numpy.asarray(counts, dtype=numpy.int64)
+    starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+    buckets = numpy.repeat(numpy.arange(len(counts)), counts)
+    ordered = amounts[numpy.lexsort((amounts, buckets))]
+
+    positions = starts[:, None] + (counts[:, None] - 1) * (numpy.asarray(percentiles) / 100)[None, :]
+    lower = numpy.floor(positions).astype(numpy.int64)
+    upper = numpy.ceil(positions).astype(numpy.int64)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (positions - lower)
+
+
+def compute_percentiles_python(amounts, counts, percentiles):
+    """`compute_percentiles`와 같은 값을 반환하는 파이썬 구현. (NumPy 가 설치되지 않은 경우)"""
+
+    values, start = [], 0
+    for count in counts:
+        ordered = sorted(amounts[start:start + count])
+        start += count
+        row = []
+        for percentile in percentiles:
+            position = (count - 1) * percentile / 100
+            lower = int(position)
+            upper = min(lower + 1, count - 1)
+            row.append(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower))
+        values.append(row)
+    return values
+
+
+def aggregate(queryset, options):
+    """
+    기간별 집계 함수.
+
+    날짜 절사(Trunc*)와 GROUP BY･SUM･COUNT･AVG･MIN･MAX 를 DB 에서 수행하여 bucket 별 한 행씩 읽는다.
+    백분위가 있으면 같은 조건의 금액 열을 날짜 순으로 chunk 단위로 읽어(`values_list`) NumPy 배열로 만든 뒤
+    `compute_percentiles`로 계산한다. 절사 함수는 날짜에 대해 단조 증가하므로 날짜 순 금액 배열은
+    bucket 순으로 이어진다. 두 쿼리는 한 트랜잭션에서 실행하여 같은 스냅샷을 읽는다. (MySQL REPEATABLE READ)
+
+    parameters
+    ----------
+    queryset: QuerySet (Expense, 유저･키워드 조건이 적용된)
+    options: dict (`get_options()`)
+
+    returns
+    -------
+    (fields, buckets): (tuple of str, list of list)
+    """
+
+    if options['start_date']:
+        queryset = queryset.filter(date__gte=options['start_date'])
+    if options['end_date']:
+        queryset = queryset.filter(date__lte=options['end_date'])
+    percentiles = options['percentiles']
+
+    # 두 쿼리가 같은 연결(같은 스냅샷)에서 실행되도록 DB를 고정한다. (replica 라우터는 쿼리마다 DB를 고를 수 있다)
+    db = queryset.db
+    queryset = queryset.using(db)
+    with transaction.atomic(using=db):
+        rows = list(queryset.annotate(bucket=PERIODS[options['period']]('date'))
+                            .values('bucket')
+                            .annotate(total=Sum('amount'), count=Count('id'), avg=Avg('amount'),
+                                      min=Min('amount'), max=Max('amount'))
+                            .order_by('bucket')
+                            .values_list('bucket', 'total', 'count', 'avg', 'min', 'max'))
+        amounts = None
+        if percentiles and rows:
+            counts = [row[2] for row in rows]
+            values = queryset.order_by('date').values_list('amount', flat=True).iterator(chunk_size=CHUNK_SIZE)
+            if numpy is not None:
+                amounts = numpy.fromiter(values, dtype=numpy.int64, count=sum(counts))
+            else:
+                amounts = list(values)
+
+    # MySQL 의 SUM･AVG 는 Decimal 을 반환한다.
+    buckets = [[bucket, int(total), count, round(float(avg), 2), low, high]
+               for bucket, total, count, avg, low, high in rows]
+    if amounts is not None:
+        if numpy is not None:
+            values = compute_percentiles(amounts, counts, percentiles).round(2).tolist()
+        else:
+            values = [[round(value, 2) for value in row]
+                      for row in compute_percentiles_python(amounts, counts, percentiles)]
+        for bucket, row in zip(buckets, values):
+            bucket.extend(row)
+    return FIELDS + tuple(map(percentile_field, percentiles)), buckets
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import async_views, urls
+
+# ASGI 전용 URL 설정
+# 비동기 뷰가 있는 경로를 먼저 매칭하고 나머지는 동기 뷰(`expenses.urls`)를 사용한다.
+urlpatterns = [
+    path('', async_views.AsyncExpenseListView.as_view()),
+    path('new/', async_views.AsyncExpenseNewView.as_view()),
+    path('<int:expense_id>/', async_views.AsyncExpenseDetailView.as_view()),
+] + urls.urlpatterns
@@ -0,0 +1,44 @@
+from utils.aio import AsyncView, run_db
+from utils.decorators import login_decorator
+
+from . import views
+
+
+class AsyncExpenseListView(AsyncView):
+    """
+    가계부 지출내역 리스트 뷰. (ASGI)
+
+    인가 확인은 이벤트 루프에서 수행하고, 조회는 동기 뷰(`ExpenseListView`)의 로직을 DB 스레드에서 실행한다.
+    """
+
+    @login_decorator
+    async def get(self, request):
+        return await run_db(views.ExpenseListView.get.__wrapped__, self, request)
+
+
+class AsyncExpenseNewView(AsyncView):
+    """
+    가계부 지출내역 신규등록 뷰. (ASGI)
+    """
+
+    @login_decorator
+    async def post(self, request):
+        return await run_db(views.ExpenseNewView.post.__wrapped__, self, request)
+
+
+class AsyncExpenseDetailView(AsyncView):
+    """
+    가계부 지출내역 상세 뷰. (ASGI)
+    """
+
+    @login_decorator
+    async def get(self, request, expense_id):
+        return await run_db(views.ExpenseDetailView.get.__wrapped__, self, request, expense_id)
+
+    @login_decorator
+    async def put(self, request, expense_id):
+        return await run_db(views.ExpenseDetailView.put.__wrapped__, self, request, expense_id)
+
+    @login_decorator
+    async def delete(self, request, expense_id):
+        return await run_db(views.ExpenseDetailView.delete.__wrapped__, self, request, expense_id)
@@ -0,0 +1,155 @@
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max
+from django.utils import timezone
+
+from . import ledger, sharding
+from .models import Expense, DeletedExpense
+from .rollups import collect_deltas
+
+# INSERT … SELECT / DELETE 한 번에 처리하는 행 수
+CHUNK_SIZE = getattr(settings, 'EXPENSE_BULK_CHUNK_SIZE', 500)
+
+# 테이블 간 이동 시 그대로 복사되는 컬럼
+COMMON_COLUMNS = ['user_id', 'title', 'date', 'amount', 'description', 'tag_id']
+
+
+def insert_expenses(user_id, expenses, chunk_size=CHUNK_SIZE):
+    """
+    일괄 저장 함수.
+
+    chunk 단위 `bulk_create`로 저장한 뒤 부가 데이터(`ledger.expenses_added`)를 갱신한다.
+    id를 반환하지 않는 DB(MySQL)에서는 저장 전 최대 id 이후이면서 저장 시작 이후에 생성된 유저의 행을
+    새 행으로 다시 조회한다. (가져오기와 같은 방식, 유저 전체를 훑지 않는다)
+    유저 shard 의 트랜잭션 안에서 호출되어야 한다.
+
+    parameters
+    ----------
+    user_id: int
+    expenses: list of Expense (저장 전)
+    chunk_size: int
+
+    returns
+    -------
+    expenses: list of Expense (id가 있는)
+    """
+
+    queryset = Expense.objects.filter(user_id=user_id)
+    last_id = queryset.aggregate(last_id=Max('id'))['last_id'] or 0
+    started = timezone.now()
+    Expense.objects.bulk_create(expenses, batch_size=chunk_size)
+    if not all(expense.id for expense in expenses):
+        expenses = list(queryset.filter(id__gt=last_id, created_at__gte=started).order_by('id'))
+    ledger.expenses_added(user_id, expenses)
+    return expenses
+
+
+def move_expenses(user_id, queryset, target_model, columns, select, params, on_chunk=None, chunk_size=CHUNK_SIZE):
+    """
+    지출내역 테이블 간 일괄 이동 함수.
+
+    `queryset`에 해당하는 행을 chunk 단위로 `INSERT … SELECT` 후 `DELETE` 한다.
+    행을 파이썬 객체로 만들지 않으며, 모든 SQL의 WHERE 절에 `user_id`를 포함하여 소유권을 보장한다.
+    전체 이동은 유저 shard 의 트랜잭션 하나로 수행된다.
+
+    parameters
+    ----------
+    user_id: int
+    queryset: QuerySet (원본 테이블)
+    target_model: Model
+    columns: list of str (대상 테이블 컬럼)
+    select: list of str (원본 테이블 SELECT 식, `%s`는 params 로 채운다)
+    params: list
+    on_chunk: callable(ids) (INSERT 후 DELETE 직전 호출)
+    chunk_size: int
+
+    returns
+    -------
+    count: int
+    """
+
+    db = sharding.db_for_user(user_id)
+    connection = connections[db]
+    qn = connection.ops.quote_name
+    source = qn(queryset.model._meta.db_table)
+    target = qn(target_model._meta.db_table)
+    queryset = queryset.using(db).filter(user_id=user_id).order_by('id')
+
+    count, last_id = 0, 0
+    with sharding.atomic(user_id):
+        while True:
+            ids = list(queryset.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                return count
+            placeholders = ', '.join(['%s'] * len(ids))
+
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'INSERT INTO %s (%s) SELECT %s FROM %s WHERE %s = %%s AND %s IN (%s)' % (
+                        target, ', '.join(qn(column) for column in columns), ', '.join(select),
+                        source, qn('user_id'), qn('id'), placeholders),
+                    list(params) + [user_id] + ids)
+                if on_chunk:
+                    on_chunk(ids)
+                cursor.execute(
+                    'DELETE FROM %s WHERE %s = %%s AND %s IN (%s)' % (source, qn('user_id'), qn('id'), placeholders),
+                    [user_id] + ids)
+                count += cursor.rowcount
+            last_id = ids[-1]
+
+
+def soft_delete(user_id, queryset):
+    """
+    일괄 삭제 함수.
+
+    지출내역(expenses)을 백업 테이블(deleted_expenses)로 이동한다.
+
+    returns
+    -------
+    count: int
+    """
+
+    connection = connections[sharding.db_for_user(user_id)]
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    qn = connection.ops.quote_name
+    columns = COMMON_COLUMNS + ['created_at', 'updated_at', 'deleted_at']
+    select = [qn(column) for column in COMMON_COLUMNS + ['created_at', 'updated_at']] + ['%s']
+
+    def on_chunk(ids):
+        deltas = collect_deltas(Expense.objects.filter(user_id=user_id, id__in=ids), sign=-1)
+        ledger.expenses_removed(user_id, ids, deltas)
+
+    return move_expenses(user_id, queryset, DeletedExpense, columns, select, [now], on_chunk=on_chunk)
+
+
+def restore(user_id, queryset):
+    """
+    일괄 복원 함수.
+
+    백업 테이블(deleted_expenses)의 지출내역을 지출내역 테이블(expenses)로 이동한다.
+    생성일시는 유지하며(없으면 현재 시각) 수정일시는 현재 시각으로 한다.
+    복원된 행은 복원 전 최대 id 이후이면서 이번 복원의 수정일시를 가진 행으로 찾아 색인한다.
+
+    returns
+    -------
+    count: int
+    """
+
+    connection = connections[sharding.db_for_user(user_id)]
+    restored_at = timezone.now()
+    now = connection.ops.adapt_datetimefield_value(restored_at)
+    qn = connection.ops.quote_name
+    columns = COMMON_COLUMNS + ['created_at', 'updated_at']
+    select = [qn(column) for column in COMMON_COLUMNS] + ['COALESCE(%s, %%s)' % qn('created_at'), '%s']
+    deltas = []
+
+    def on_chunk(ids):
+        deltas.extend(collect_deltas(DeletedExpense.objects.filter(user_id=user_id, id__in=ids)))
+
+    with sharding.atomic(user_id):
+        restored = Expense.objects.filter(user_id=user_id)
+        last_id = restored.aggregate(last_id=Max('id'))['last_id'] or 0
+        count = move_expenses(user_id, queryset, Expense, columns, select, [now, now], on_chunk=on_chunk)
+        rows = list(restored.filter(id__gt=last_id, updated_at=restored_at).values_list('id', 'title', 'description'))
+        ledger.expenses_restored(user_id, rows, deltas)
+    return count
@@ -0,0 +1,312 @@
+import codecs
+import csv
+import io
+import os
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from utils.exceptions import DataTooLongException, DataTypeException, InvalidValueException
+from utils.validators import validate_expense
+
+from . import ledger, sharding
+from .models import Expense, ExpenseImport
+
+# 트랜잭션(bulk_create) 하나로 저장하는 행 수
+CHUNK_SIZE = getattr(settings, 'EXPENSE_IMPORT_CHUNK_SIZE', 5000)
+
+# 오류 파일에 기록하는 최대 줄 수 (실패 건수는 계속 센다)
+MAX_ERRORS = getattr(settings, 'EXPENSE_IMPORT_MAX_ERRORS', 10000)
+
+# 오류 파일 디렉터리
+IMPORT_DIR = getattr(settings, 'EXPENSE_IMPORT_DIR', os.path.join(settings.BASE_DIR, 'imports'))
+
+# 가져오는 필드 (description 열은 없어도 된다)
+FIELDS = ('date', 'title', 'amount', 'description')
+REQUIRED_FIELDS = ('date', 'title', 'amount')
+
+# 구분자 옵션 값 → 구분자
+DELIMITERS = {',': ',', ';': ';', '|': '|', 'tab': '\t'}
+
+
+def get_options(params):
+    """
+    가져오기 옵션 검사 함수.
+
+    parameters
+    ----------
+    params: dict-like
+        encoding: str (default: utf-8, 은행 내역 등은 cp949)
+        delimiter: str (',', ';', '|' or 'tab', default: ',')
+        <field>-column: str (필드의 열 이름, 기본값은 필드 이름. 예: date-column=거래일자)
+
+    returns
+    -------
+    options: dict
+        encoding, delimiter, columns (필드 → 열 이름)
+    """
+
+    encoding = params.get('encoding') or 'utf-8-sig'
+    try:
+        if codecs.lookup(encoding).name == 'utf-8':
+            encoding = 'utf-8-sig'
+    except LookupError:
+        raise InvalidValueException(message="unknown encoding '%s'." % encoding)
+    delimiter = params.get('delimiter') or ','
+    if delimiter not in DELIMITERS:
+        raise InvalidValueException(message="'delimiter' must be one of %s." % ', '.join(DELIMITERS))
+    columns = {field: (params.get('%s-column' % field) or field).strip().lower() for field in FIELDS}
+    return {'encoding': encoding, 'delimiter': DELIMITERS[delimiter], 'columns': columns}
+
+
+def map_columns(header, columns):
+    """헤더(첫 줄)에서 필드별 열 위치를 찾는다. 필수 필드의 열이 없으면 `InvalidValueException`."""
+
+    positions = {name.strip().lower(): index for index, name in reversed(list(enumerate(header)))}
+    indexes = {field: positions.get(name) for field, name in columns.items()}
+    for field in REQUIRED_FIELDS:
+        if indexes[field] is None:
+            raise InvalidValueException(message="'%s' column not found in header." % columns[field])
+    return indexes
+
+
+def parse_date(value):
+    """yyyy-mm-dd, yyyy.mm.dd, yyyy/mm/dd, yyyymmdd 형식을 yyyy-mm-dd 로 바꾼다."""
+
+    value = value.strip().replace('.', '-').replace('/', '-')
+    if len(value) == 8 and value.isdigit():
+        value = '%s-%s-%s' % (value[:4], value[4:6], value[6:])
+    return value
+
+
+def parse_amount(value):
+    """천 단위 구분 쉼표와 '원'을 제거하고 정수로 바꾼다."""
+
+    value = value.strip().replace(',', '')
+    if value.endswith('원'):
+        value = value[:-1].rstrip()
+    try:
+        return int(value)
+    except ValueError:
+        raise DataTypeException(message="amount datatype must be %s." % int)
+
+
+def parse_row(row, indexes):
+    """
+    CSV 행 변환 함수.
+
+    필드별 열 값을 `validate_expense` 입력 형식(dict)으로 바꾼다. 필수 값이 비어 있으면 `InvalidValueException`.
+    """
+
+    values = {}
+    for field, index in indexes.items():
+        value = row[index].strip() if index is not None and index < len(row) else ''
+        if not value and field in REQUIRED_FIELDS:
+            raise InvalidValueException(message="'%s' is required." % field)
+        values[field] = value
+    return {'date': parse_date(values['date']), 'title': values['title'], 'amount': parse_amount(values['amount']),
+            'description': values['description']}
+
+
+def error_path(import_id):
+    return os.path.join(IMPORT_DIR, '%d.errors.csv' % import_id)
+
+
+def upload_path(import_id):
+    return os.path.join(IMPORT_DIR, '%d.upload' % import_id)
+
+
+def save_upload(job, upload):
+    """업로드 파일을 가져오기 작업이 읽을 수 있도록 IMPORT_DIR 에 chunk 단위로 저장한다."""
+
+    os.makedirs(IMPORT_DIR, exist_ok=True)
+    with open(upload_path(job.id), 'wb') as fileobj:
+        for chunk in upload.chunks():
+            fileobj.write(chunk)
+
+
+class ErrorFile:
+    """
+    오류 파일 클래스.
+
+    실패한 줄을 `line, error, <원본 열...>` 형식의 CSV 로 기록한다. 첫 오류가 생길 때 파일을 만들며,
+    최대 max_lines 줄까지만 기록한다.
+    """
+
+    def __init__(self, path, header, max_lines=MAX_ERRORS):
+        self.path = path
+        self.header = header
+        self.max_lines = max_lines
+        self.count = 0
+        self.file = None
+        self.writer = None
+
+    def write(self, line, error, row):
+        self.count += 1
+        if self.count > self.max_lines:
+            return
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.file = open(self.path, 'w', encoding='utf-8-sig', newline='')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(['line', 'error'] + list(self.header))
+        self.writer.writerow([line, error] + list(row))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def insert(user_id, rows):
+    """
+    chunk 저장 함수.
+
+    유저 shard 의 트랜잭션 하나로 행을 INSERT(executemany) 한 뒤 새 행의 id를 조회하여
+    부가 데이터(`ledger.rows_added`)를 갱신한다. 행을 모델 객체로 만들지 않는다.
+    새 행은 저장 전 최대 id 이후이면서 이번 chunk 의 생성일시를 가진 행으로 찾는다.
+
+    parameters
+    ----------
+    user_id: int
+    rows: list of dict (`validate_expense()`)
+    """
+
+    db = sharding.db_for_user(user_id)
+    connection = connections[db]
+    qn = connection.ops.quote_name
+    columns = ['user_id', 'title', 'date', 'amount', 'description', 'created_at', 'updated_at']
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (qn(Expense._meta.db_table), ', '.join(map(qn, columns)),
+                                              ', '.join(['%s'] * len(columns)))
+    now = timezone.now()
+    created_at = Expense._meta.get_field('created_at').get_db_prep_value(now, connection)
+    adapt_date = connection.ops.adapt_datefield_value
+
+    with transaction.atomic(using=db):
+        queryset = Expense.objects.using(db).filter(user_id=user_id)
+        last_id = queryset.aggregate(last_id=Max('id'))['last_id'] or 0
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [(user_id, row['title'], adapt_date(row['date']), row['amount'],
+                                      row['description'], created_at, created_at) for row in rows])
+        added = list(queryset.filter(id__gt=last_id, created_at=now)
+                             .values_list('id', 'title', 'description', 'date', 'amount'))
+        ledger.rows_added(user_id, added)
+
+
+def report(job, fileobj):
+    """진행률(읽은 바이트･줄 수, 등록･실패 건수)을 기록한다."""
+
+    job.processed_bytes = fileobj.tell()
+    ExpenseImport.objects.filter(id=job.id).update(processed_bytes=job.processed_bytes, lines=job.lines,
+                                                   imported=job.imported, failed=job.failed,
+                                                   updated_at=timezone.now())
+
+
+def run(job, fileobj, options, chunk_size=None, on_chunk=None):
+    """
+    CSV 가져오기 함수.
+
+    업로드 파일을 한 줄씩 읽어(csv.reader) 행마다 `validate_expense`(`EXPENSE_SCHEMA`)로 검사하고
+    chunk_size 행마다 `insert()`로 저장한 뒤 진행률을 기록한다. 파일 전체를 메모리에 올리지 않는다.
+    검사에 실패한 줄은 오류 파일에 기록하고 계속 진행하며, 헤더 오류･인코딩 오류 등 더 읽을 수 없는 경우에는
+    저장된 chunk 를 유지한 채 failed 상태로 끝낸다.
+
+    parameters
+    ----------
+    job: ExpenseImport
+    fileobj: binary file object (UploadedFile 등)
+    options: dict (`get_options()`)
+    chunk_size: int (default: EXPENSE_IMPORT_CHUNK_SIZE)
+    on_chunk: callable(job) (chunk 저장･진행률 기록 후 호출, 백그라운드 작업의 진행률･취소 확인용)
+
+    returns
+    -------
+    job: ExpenseImport
+    """
+
+    chunk_size = chunk_size or CHUNK_SIZE
+    job.status = ExpenseImport.STATUS_RUNNING
+    job.save(update_fields=['status', 'updated_at'])
+
+    stream = io.TextIOWrapper(fileobj, encoding=options['encoding'], newline='')
+    reader = csv.reader(stream, delimiter=options['delimiter'])
+    errors = None
+    try:
+        with sharding.use_shard(sharding.db_for_user(job.user_id)):
+            header = next(reader, None)
+            if not header:
+                raise InvalidValueException(message="empty file.")
+            indexes = map_columns(header, options['columns'])
+            errors = ErrorFile(error_path(job.id), header)
+
+            chunk = []
+            for row in reader:
+                if not any(row):
+                    continue
+                job.lines += 1
+                try:
+                    chunk.append(validate_expense(parse_row(row, indexes)))
+                except (DataTypeException, DataTooLongException, InvalidValueException) as e:
+                    job.failed += 1
+                    errors.write(reader.line_num, e.message, row)
+                if len(chunk) >= chunk_size:
+                    insert(job.user_id, chunk)
+                    job.imported += len(chunk)
+                    chunk = []
+                    report(job, fileobj)
+                    if on_chunk is not None:
+                        on_chunk(job)
+            if chunk:
+                insert(job.user_id, chunk)
+                job.imported += len(chunk)
+        job.status = ExpenseImport.STATUS_DONE
+    except InvalidValueException as e:
+        job.status, job.error = ExpenseImport.STATUS_FAILED, e.message
+    except UnicodeDecodeError:
+        job.status = ExpenseImport.STATUS_FAILED
+        job.error = "cannot decode with '%s' after line %d." % (options['encoding'], reader.line_num)
+    except csv.Error as e:
+        job.status, job.error = ExpenseImport.STATUS_FAILED, ('line %d: %s' % (reader.line_num, e))[:255]
+    finally:
+        stream.detach()
+        if errors is not None:
+            errors.close()
+
+    job.processed_bytes = job.size if job.status == ExpenseImport.STATUS_DONE else fileobj.tell()
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def abort(job, message):
+    """중단된 가져오기(취소･작업자 오류)를 failed 로 기록한다. 이미 저장된 chunk 는 유지된다."""
+
+    ExpenseImport.objects.filter(id=job.id).update(status=ExpenseImport.STATUS_FAILED, error=message[:255],
+                                                   finished_at=timezone.now(), updated_at=timezone.now())
+
+
+def get_progress(job):
+    """
+    진행률 조회 함수.
+
+    returns
+    -------
+    progress: dict
+    """
+
+    return {
+        'id'             : job.id,
+        'filename'       : job.filename,
+        'status'         : job.status,
+        'size'           : job.size,
+        'processed_bytes': job.processed_bytes,
+        'progress'       : round(job.processed_bytes * 100 / job.size, 1) if job.size else 100.0,
+        'lines'          : job.lines,
+        'imported'       : job.imported,
+        'failed'         : job.failed,
+        'error'          : job.error,
+        'errors'         : '/expenses/imports/%d/errors/' % job.id if job.failed else None,
+        'created_at'     : job.created_at,
+        'finished_at'    : job.finished_at,
+    }
@@ -0,0 +1,397 @@
+import contextlib
+import datetime
+import logging
+import os
+import socket
+import time
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from utils import routers
+
+from . import sharding
+from .models import Job
+
+logger = logging.getLogger('accountbooks.jobs')
+
+# 점유 시각(locked_at)이 이 시간(초) 이상 갱신되지 않은 실행 중 작업은 작업자가 종료된 것으로 본다.
+LOCK_TIMEOUT = getattr(settings, 'JOB_LOCK_TIMEOUT', 300)
+
+# 재시도 대기 시간(초). 시도마다 2배씩 늘어나며 RETRY_MAX_DELAY 를 넘지 않는다.
+RETRY_BACKOFF = getattr(settings, 'JOB_RETRY_BACKOFF', 5)
+RETRY_MAX_DELAY = getattr(settings, 'JOB_RETRY_MAX_DELAY', 600)
+
+# 내보내기 작업 파일 디렉터리
+OUTPUT_DIR = getattr(settings, 'JOB_OUTPUT_DIR', os.path.join(settings.BASE_DIR, 'jobs'))
+
+# 진행률을 DB에 기록하는 최소 간격(초)
+REPORT_INTERVAL = 1.0
+
+# 작업 종류 → (실행 함수, 최대 시도 횟수)
+HANDLERS = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def register(kind, max_attempts=1):
+    """
+    작업 종류 등록 데코레이터.
+
+    실행 함수는 (job, context)를 받아 결과(dict, JSON)를 반환한다. 예외가 발생하면 max_attempts 까지 재시도한다.
+    재실행해도 결과가 같은(idempotent) 작업만 max_attempts 를 2 이상으로 둔다.
+    """
+
+    def decorator(func):
+        HANDLERS[kind] = (func, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(kind, user_id=None, params=None, run_at=None):
+    """
+    작업 등록 함수.
+
+    parameters
+    ----------
+    kind: str (HANDLERS)
+    user_id: int (None 이면 시스템 작업)
+    params: dict (JSON)
+    run_at: datetime (default: now)
+
+    returns
+    -------
+    job: Job
+    """
+
+    _, max_attempts = HANDLERS[kind]
+    return Job.objects.create(kind=kind, user_id=user_id, params=params or {}, max_attempts=max_attempts,
+                              run_at=run_at or timezone.now())
+
+
+def make_worker_id():
+    return '%s:%d:%s' % (socket.gethostname()[:40], os.getpid(), uuid.uuid4().hex[:6])
+
+
+def claim(worker_id, limit=10):
+    """
+    작업 점유(claim) 함수.
+
+    실행할 수 있는(queued, run_at 경과) 작업을 오래된 순으로 조회한 뒤
+    `UPDATE … WHERE id = %s AND status = 'queued'` 조건부 UPDATE 로 점유한다.
+    다른 작업자가 먼저 점유한 작업은 UPDATE 된 행이 없으므로 다음 후보로 넘어간다.
+    (SELECT … FOR UPDATE SKIP LOCKED 없이 SQLite･MySQL 에서 동일하게 동작한다)
+
+    parameters
+    ----------
+    worker_id: str
+    limit: int (후보 수)
+
+    returns
+    -------
+    job: Job or None
+    """
+
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.STATUS_QUEUED, run_at__lte=now).order_by('run_at', 'id') \
+                            .values_list('id', flat=True)[:limit]
+    for job_id in candidates:
+        claimed = Job.objects.filter(id=job_id, status=Job.STATUS_QUEUED) \
+                             .update(status=Job.STATUS_RUNNING, locked_by=worker_id, locked_at=now, started_at=now,
+                                     attempts=F('attempts') + 1, updated_at=now)
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def heartbeat(job_ids, worker_id):
+    """실행 중인 작업의 점유 시각을 갱신한다."""
+
+    if job_ids:
+        Job.objects.filter(id__in=job_ids, status=Job.STATUS_RUNNING, locked_by=worker_id) \
+                   .update(locked_at=timezone.now())
+
+
+def finish(job, worker_id, **values):
+    """점유한 작업자의 작업인 경우에만 상태를 기록하고 점유를 해제한다. (다시 대기열에 들어간 작업은 건드리지 않는다)"""
+
+    now = timezone.now()
+    values.setdefault('finished_at', now)
+    return Job.objects.filter(id=job.id, status=Job.STATUS_RUNNING, locked_by=worker_id) \
+                      .update(locked_by=None, locked_at=None, updated_at=now, **values)
+
+
+def retry_delay(attempts):
+    return min(RETRY_BACKOFF * 2 ** max(attempts - 1, 0), RETRY_MAX_DELAY)
+
+
+def fail(job, worker_id, error):
+    """
+    작업 실패 기록 함수.
+
+    시도 횟수가 max_attempts 보다 적으면 `retry_delay()` 초 뒤에 다시 실행하도록 대기열에 되돌리고,
+    아니면 failed 로 끝낸다. 취소 요청이 있었으면 cancelled 로 끝낸다.
+    """
+
+    if Job.objects.filter(id=job.id, cancel_requested=True).exists():
+        return finish(job, worker_id, status=Job.STATUS_CANCELLED, error=error)
+    if job.attempts < job.max_attempts:
+        run_at = timezone.now() + datetime.timedelta(seconds=retry_delay(job.attempts))
+        return finish(job, worker_id, status=Job.STATUS_QUEUED, error=error, run_at=run_at, finished_at=None)
+    return finish(job, worker_id, status=Job.STATUS_FAILED, error=error)
+
+
+def requeue_stale(timeout=LOCK_TIMEOUT):
+    """
+    종료된 작업자의 작업 회수 함수.
+
+    점유 시각이 timeout 초 이상 갱신되지 않은 실행 중 작업을 실패한 시도로 처리한다. (`fail()`)
+
+    returns
+    -------
+    count: int
+    """
+
+    expired = timezone.now() - datetime.timedelta(seconds=timeout)
+    count = 0
+    for job in Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=expired):
+        count += fail(job, job.locked_by, 'worker lost. (no heartbeat for %ds)' % timeout)
+    return count
+
+
+def cancel(job):
+    """
+    작업 취소 함수.
+
+    대기 중인 작업은 바로 cancelled 가 되며, 실행 중인 작업은 취소 요청을 기록하여
+    실행 함수가 다음 진행률 기록(`JobContext.report`) 시 멈추도록 한다.
+
+    returns
+    -------
+    cancelled: bool (이미 끝난 작업이면 False)
+    """
+
+    now = timezone.now()
+    if Job.objects.filter(id=job.id, status=Job.STATUS_QUEUED) \
+                  .update(status=Job.STATUS_CANCELLED, cancel_requested=True, finished_at=now, updated_at=now):
+        return True
+    return bool(Job.objects.filter(id=job.id, status=Job.STATUS_RUNNING)
+                           .update(cancel_requested=True, updated_at=now))
+
+
+class JobContext:
+    """
+    실행 중인 작업의 진행률 기록･취소 확인 객체.
+
+    실행 함수는 처리 단위(chunk)마다 `report()`를 호출한다. 진행률 기록은 점유 시각 갱신(heartbeat)을 겸한다.
+    """
+
+    def __init__(self, job, worker_id, interval=REPORT_INTERVAL):
+        self.job = job
+        self.worker_id = worker_id
+        self.interval = interval
+        self.reported_at = None
+
+    def report(self, progress):
+        """
+        진행률(0~100)을 기록하고 취소 요청을 확인한다. interval 초에 한 번만 DB에 기록한다.
+        취소가 요청되었거나 다른 작업자에게 넘어간 작업이면 `JobCancelled`를 발생시킨다.
+        """
+
+        now = time.monotonic()
+        if self.reported_at is not None and now - self.reported_at < self.interval:
+            return
+        self.reported_at = now
+        updated = Job.objects.filter(id=self.job.id, status=Job.STATUS_RUNNING, locked_by=self.worker_id,
+                                     cancel_requested=False) \
+                             .update(progress=round(min(progress, 100), 1), locked_at=timezone.now())
+        if not updated:
+            raise JobCancelled
+
+
+def execute(job_id, worker_id):
+    """
+    작업 실행 함수. (작업자 프로세스)
+
+    유저 작업은 유저 shard 와 primary DB로 라우팅한 상태에서 실행 함수를 호출하고 반환값을 result 로 기록한다.
+    실행 함수의 예외는 `fail()`로 기록한다. (재시도 또는 failed)
+
+    parameters
+    ----------
+    job_id: int
+    worker_id: str
+
+    returns
+    -------
+    status: str
+    """
+
+    close_old_connections()
+    job = Job.objects.get(id=job_id)
+    token = routers.set_user(job.user_id, primary=True)
+    try:
+        handler, _ = HANDLERS.get(job.kind, (None, 0))
+        if handler is None:
+            raise ValueError("unknown job kind '%s'." % job.kind)
+        context = JobContext(job, worker_id)
+        context.report(0)
+        shard = sharding.use_shard(sharding.db_for_user(job.user_id)) if job.user_id else contextlib.nullcontext()
+        with shard:
+            result = handler(job, context)
+        finish(job, worker_id, status=Job.STATUS_DONE, progress=100, result=result, error=None)
+    except JobCancelled:
+        finish(job, worker_id, status=Job.STATUS_CANCELLED)
+    except Exception as e:
+        logger.exception('job %d (%s) failed', job.id, job.kind)
+        fail(job, worker_id, ('%s: %s' % (type(e).__name__, e))[:1000])
+    finally:
+        routers.reset_user(token)
+        close_old_connections()
+    return Job.objects.filter(id=job_id).values_list('status', flat=True).first()
+
+
+def run_pending(worker_id=None, limit=None):
+    """
+    대기 중인 작업을 현재 프로세스에서 차례로 실행한다. (`run_jobs --processes 0`, 테스트)
+
+    returns
+    -------
+    count: int (실행한 작업 수)
+    """
+
+    worker_id = worker_id or make_worker_id()
+    count = 0
+    while limit is None or count < limit:
+        job = claim(worker_id)
+        if job is None:
+            break
+        execute(job.id, worker_id)
+        count += 1
+    return count
+
+
+def get_status(job):
+    """
+    작업 상태 조회 함수.
+
+    returns
+    -------
+    status: dict
+    """
+
+    return {
+        'id'              : job.id,
+        'kind'            : job.kind,
+        'status'          : job.status,
+        'progress'        : job.progress,
+        'attempts'        : job.attempts,
+        'max_attempts'    : job.max_attempts,
+        'result'          : job.result,
+        'error'           : job.error,
+        'cancel_requested': job.cancel_requested,
+        'run_at'          : job.run_at,
+        'created_at'      : job.created_at,
+        'started_at'      : job.started_at,
+        'finished_at'     : job.finished_at,
+    }
+
+
+def output_path(job):
+    return os.path.join(OUTPUT_DIR, '%d.%s' % (job.id, job.result['extension'])) if job.result else None
+
+
+@register('import')
+def run_import(job, context):
+    """업로드된 CSV 가져오기. (`imports.run`) 저장된 chunk 가 중복되지 않도록 재시도하지 않는다."""
+
+    from . import imports
+    from .models import ExpenseImport
+
+    record = ExpenseImport.objects.get(id=job.params['import_id'])
+    path = imports.upload_path(record.id)
+    try:
+        with open(path, 'rb') as fileobj:
+            record = imports.run(record, fileobj, job.params['options'],
+                                 on_chunk=lambda r: context.report(r.processed_bytes * 100 / (r.size or 1)))
+    except JobCancelled:
+        imports.abort(record, 'cancelled.')
+        raise
+    except Exception:
+        imports.abort(record, 'import stopped by an internal error.')
+        raise
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    return {'import_id': record.id, 'status': record.status, 'imported': record.imported, 'failed': record.failed}
+
+
+@register('export', max_attempts=3)
+def run_export(job, context):
+    """지출내역 내보내기 파일 생성. (`views.get_export_rows`) 결과 파일은 OUTPUT_DIR 에 저장한다."""
+
+    from .views import EXPORT_FORMATS, get_export_rows
+
+    fields, rows, querysets = get_export_rows(job.user_id, job.params)
+    encode, content_type, extension = EXPORT_FORMATS[job.params.get('format', 'csv')]
+    total = sum(queryset.count() for queryset in querysets) or 1
+    counter = {'rows': 0}
+
+    def counted(rows):
+        for row in rows:
+            counter['rows'] += 1
+            if counter['rows'] % 1000 == 0:
+                context.report(counter['rows'] * 100 / total)
+            yield row
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(OUTPUT_DIR, '%d.%s' % (job.id, extension))
+    try:
+        with open(path, 'w', encoding='utf-8', newline='') as fileobj:
+            for chunk in encode(counted(rows), fields):
+                fileobj.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return {'rows': counter['rows'], 'size': os.path.getsize(path), 'content_type': content_type,
+            'extension': extension, 'filename': 'expenses-%s.%s' % (job.params.get('scope', 'active'), extension),
+            'file': '/expenses/jobs/%d/file/' % job.id}
+
+
+@register('rebuild_rollups', max_attempts=3)
+def run_rebuild_rollups(job, context):
+    """유저 일별･월별 집계 재구성. (`rollups.rebuild`)"""
+
+    from . import rollups
+
+    days, months = rollups.rebuild(user_id=job.user_id)
+    return {'days': days, 'months': months}
+
+
+@register('purge_deleted', max_attempts=3)
+def run_purge_deleted(job, context):
+    """
+    삭제된 지출내역 영구삭제. 일괄복원과 같은 대상 조건(ids 또는 필터)을 사용하며
+    chunk 단위 트랜잭션마다 가계부 버전을 올린다.
+    """
+
+    from . import bulk, ledger
+    from .models import DeletedExpense
+    from .views import get_bulk_queryset
+
+    queryset = get_bulk_queryset(DeletedExpense.objects.all(), job.user_id, job.params)
+    total = queryset.count() or 1
+    purged = 0
+    while True:
+        with sharding.atomic(job.user_id):
+            ids = list(queryset.values_list('id', flat=True)[:bulk.CHUNK_SIZE])
+            if not ids:
+                break
+            purged += DeletedExpense.objects.filter(user_id=job.user_id, id__in=ids).delete()[0]
+            ledger.bump_version(job.user_id)
+        context.report(purged * 100 / total)
+    return {'purged': purged}
@@ -0,0 +1,130 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import rollups, search, sharding
+from .models import LedgerVersion
+
+
+def get_version(user_id):
+    """
+    가계부 버전 조회 함수. (기본키 조회 1회)
+
+    returns
+    -------
+    (version, updated_at): (int, datetime or None)
+    """
+
+    return LedgerVersion.objects.filter(user_id=user_id).values_list('version', 'updated_at').first() or (0, None)
+
+
+def bump_version(user_id):
+    """
+    가계부 버전 증가 함수.
+
+    리스트 뷰의 ETag 가 바뀌도록 유저의 가계부 버전을 1 증가시킨다. 행이 없으면 version 1 로 생성한다.
+    버전 행을 잠근 뒤 유저가 다른 shard 로 이동하지 않았는지 확인한다. (`sharding.check_fence`)
+
+    parameters
+    ----------
+    user_id: int
+    """
+
+    db = sharding.db_for_user(user_id)
+    queryset = LedgerVersion.objects.using(db).filter(user_id=user_id)
+    values = {'version': F('version') + 1, 'updated_at': timezone.now()}
+    if not queryset.update(**values):
+        try:
+            with transaction.atomic(using=db):
+                LedgerVersion.objects.using(db).create(user_id=user_id, version=1)
+        except IntegrityError:
+            queryset.update(**values)
+    sharding.check_fence(user_id, db)
+
+
+def expenses_added(user_id, expenses):
+    """
+    생성･복원 기록 함수.
+
+    지출내역과 함께 갱신되어야 하는 부가 데이터(검색 색인, 일별･월별 집계, 가계부 버전)를 갱신한다.
+    이 모듈의 함수는 모두 원본 테이블을 변경한 트랜잭션 안에서 호출되어야 한다.
+
+    parameters
+    ----------
+    user_id: int
+    expenses: list of Expense (저장되어 id가 있는, `bulk.insert_expenses()` 참고)
+    """
+
+    search.index_expenses(expenses)
+    rollups.apply(user_id, [(expense.date, expense.amount, 1, expense.tag_id) for expense in expenses])
+    bump_version(user_id)
+
+
+def rows_added(user_id, rows):
+    """
+    대량 생성 기록 함수.
+
+    `expenses_added()`와 같으며 모델 객체 없이 INSERT 한 지출내역의 행을 받는다. (가져오기, 태그 없음)
+
+    parameters
+    ----------
+    user_id: int
+    rows: list of (id, title, description, date, amount)
+    """
+
+    search.index_rows(user_id, [row[:3] for row in rows])
+    rollups.apply(user_id, [(date, amount, 1, None) for _, _, _, date, amount in rows])
+    bump_version(user_id)
+
+
+def expense_edited(user_id, expense, old_date, old_amount, old_tag_id=None):
+    """
+    수정 기록 함수.
+
+    parameters
+    ----------
+    user_id: int
+    expense: Expense (수정 후)
+    old_date: date
+    old_amount: int
+    old_tag_id: int or None
+    """
+
+    search.index_expenses([expense])
+    rollups.apply(user_id, [(old_date, -old_amount, -1, old_tag_id),
+                            (expense.date, expense.amount, 1, expense.tag_id)])
+    bump_version(user_id)
+
+
+def expenses_removed(user_id, ids, deltas):
+    """
+    삭제 기록 함수.
+
+    parameters
+    ----------
+    user_id: int
+    ids: list of int (삭제되는 expenses id)
+    deltas: list of (date, amount, count, tag_id) (음수 증감분)
+    """
+
+    search.remove_expenses(ids)
+    rollups.apply(user_id, deltas)
+    bump_version(user_id)
+
+
+def expenses_restored(user_id, rows, deltas):
+    """
+    일괄 복원 기록 함수.
+
+    INSERT … SELECT 로 복원된 행을 받아 색인한다. (`bulk.restore()`가 새 id를 조회한다)
+
+    parameters
+    ----------
+    user_id: int
+    rows: list of (id, title, description) (복원된 expenses 행)
+    deltas: list of (date, amount, count, tag_id)
+    """
+
+    search.index_rows(user_id, rows)
+    rollups.apply(user_id, deltas)
+    bump_version(user_id)
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import statistics
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import jwt
+import my_settings
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    WSGI･ASGI 처리량 비교 벤치마크 커맨드.
+
+    같은 경로를 같은 동시성(concurrency)으로 WSGI(동기 뷰, 스레드)와 ASGI(비동기 뷰, 이벤트 루프) 핸들러에
+    프로세스 내부에서 요청하여 처리량(req/s)과 지연시간(p50･p95)을 비교한다.
+    `--db-latency` 옵션으로 원격 DB 왕복 시간을 흉내 낼 수 있다.
+    """
+
+    help = 'Compare in-process WSGI and ASGI throughput for an API path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, required=True, help='user id used for the Authorization token.')
+        parser.add_argument('--path', default='/expenses/')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--db-latency', type=float, default=0.0, help='simulated DB round trip (ms).')
+        parser.add_argument('--json', action='store_true', help='print results as JSON.')
+
+    def handle(self, *args, **options):
+        if not User.objects.filter(id=options['user']).exists():
+            raise CommandError("user '%d' does not exist." % options['user'])
+        self.token = jwt.encode(payload={'user_id': options['user']}, key=my_settings.SECRET_KEY,
+                                algorithm=my_settings.ALGORITHM)
+
+        latency = options['db_latency'] / 1000
+
+        def add_latency(sender, connection, **kwargs):
+            def wrapper(execute, sql, params, many, context):
+                time.sleep(latency)
+                return execute(sql, params, many, context)
+            connection.execute_wrappers.append(wrapper)
+
+        if latency:
+            connection_created.connect(add_latency, weak=False)
+        try:
+            results = {
+                'wsgi': self.run_wsgi(options['path'], options['requests'], options['concurrency']),
+                'asgi': self.run_asgi(options['path'], options['requests'], options['concurrency']),
+            }
+        finally:
+            connection_created.disconnect(add_latency)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results.items():
+            self.stdout.write('%-4s %8.1f req/s  p50 %7.2f ms  p95 %7.2f ms  errors %d' % (
+                name, result['throughput'], result['p50_ms'], result['p95_ms'], result['errors']))
+
+    @staticmethod
+    def summarize(latencies, statuses, elapsed):
+        latencies = sorted(latencies)
+        return {
+            'requests'  : len(latencies),
+            'throughput': len(latencies) / elapsed,
+            'p50_ms'    : statistics.median(latencies) * 1000,
+            'p95_ms'    : latencies[int(len(latencies) * 0.95) - 1] * 1000,
+            'errors'    : sum(1 for status in statuses if status >= 400),
+        }
+
+    def run_wsgi(self, path, requests, concurrency):
+        def call(_):
+            started = time.perf_counter()
+            response = Client().get(path, HTTP_Authorization=self.token)
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(call, range(requests)))
+        elapsed = time.perf_counter() - started
+        return self.summarize([latency for latency, _ in results], [status for _, status in results], elapsed)
+
+    def run_asgi(self, path, requests, concurrency):
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+            client = AsyncClient()
+
+            async def call():
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.get(path, authorization=self.token)
+                    return time.perf_counter() - started, response.status_code
+
+            return await asyncio.gather(*(call() for _ in range(requests)))
+
+        with override_settings(ROOT_URLCONF='config.asgi_urls'):
+            started = time.perf_counter()
+            results = asyncio.run(main())
+            elapsed = time.perf_counter() - started
+        return self.summarize([latency for latency, _ in results], [status for _, status in results], elapsed)
@@ -0,0 +1,66 @@
+import datetime
+import json
+import random
+import timeit
+
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from expenses.models import Expense
+from utils import responses
+
+FIELDS = ('id', 'date', 'title', 'amount')
+
+
+class Command(BaseCommand):
+    """
+    JSON 인코더 벤치마크 커맨드.
+
+    지출내역 리스트 응답을 기존 방식(`.values()` dict + DjangoJSONEncoder)과
+    빠른 인코더(`.values_list()` 행 + `utils.responses.dumps`, 표준 json 경로･orjson 경로)로 직렬화하여 비교한다.
+    `--user`를 지정하면 해당 유저의 지출내역을 DB 에서 조회하여 조회 시간까지 포함하고, 아니면 합성 데이터를 사용한다.
+    """
+
+    help = 'Compare DjangoJSONEncoder and the fast JSON encoder on expense lists.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--user', type=int, default=None, help='fetch rows of this user from the database.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if options['user'] is None:
+            rng = random.Random(42)
+            titles = ['아파트관리비', '점심 식사', '커피', '택시비', 'Coffee "beans"']
+            tuples = [(i, datetime.date(2020, 1, 1) + datetime.timedelta(days=rng.randrange(730)),
+                       rng.choice(titles), rng.randrange(100, 200000, 100)) for i in range(options['rows'])]
+            fetch_dicts = lambda: [dict(zip(FIELDS, row)) for row in tuples]  # noqa: E731
+            fetch_tuples = lambda: tuples  # noqa: E731
+        else:
+            queryset = Expense.objects.filter(user_id=options['user']).order_by('date', 'id')[:options['rows']]
+            if not queryset.exists():
+                raise CommandError("user '%d' has no expenses." % options['user'])
+            fetch_dicts = lambda: list(queryset.values(*FIELDS))  # noqa: E731
+            fetch_tuples = lambda: list(queryset.values_list(*FIELDS))  # noqa: E731
+
+        def django_encoder():
+            return json.dumps({"expenses": fetch_dicts(), "next": None}, cls=DjangoJSONEncoder).encode('utf-8')
+
+        def fast_encoder():
+            return responses.dumps({"expenses": responses.Rows(FIELDS, fetch_tuples()), "next": None})
+
+        def measure(func):
+            return min(timeit.repeat(func, number=1, repeat=options['repeat'])) * 1000
+
+        results = {'django': measure(django_encoder)}
+        with mock.patch.object(responses, 'orjson', None):
+            results['fast (json)'] = measure(fast_encoder)
+        if responses.orjson is not None:
+            results['fast (orjson)'] = measure(fast_encoder)
+
+        rows = len(fetch_tuples())
+        self.stdout.write('%d rows%s' % (rows, ' (from database)' if options['user'] is not None else ''))
+        for name, elapsed in results.items():
+            self.stdout.write('%-14s %8.2f ms  x%.2f' % (name, elapsed, results['django'] / elapsed))
@@ -0,0 +1,154 @@
+import datetime
+import random
+import re
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from utils.exceptions import DataTooLongException, DataTypeException, InvalidValueException
+from utils.validators import EMAIL_REGEX_PATTERN, EXPENSE_SCHEMA, check_email
+
+ERRORS = (DataTypeException, DataTooLongException, InvalidValueException, KeyError)
+
+
+def validate_datatype(data, field):
+    """
+    유효성 검사 하위 함수. (자료형 검사)
+    스키마(`utils.schema.Field`) 도입 이전의 검사 함수이며 비교용으로만 사용한다.
+
+    parameters
+    ----------
+    data: dynamic (str OR int)
+    field: str
+
+    return
+    ------
+    True: bool
+    """
+
+    type_dict = {'email': str, 'password': str, 'title': str,
+                 'date': str, 'amount': int, 'description': str}
+    if type(data) != type_dict[field]:
+        raise DataTypeException(message="%s datatype must be %s." % (field, type_dict[field]))
+    return True
+
+
+def validate_length(data, field):
+    """
+    유효성 검사 하위 함수. (데이터 크기 검사)
+    스키마(`utils.schema.Field`) 도입 이전의 검사 함수이며 비교용으로만 사용한다.
+
+    Parameters
+    ----------
+    data: dynamic (str OR int)
+    field: str
+
+    Returns
+    -------
+    True: bool
+    """
+
+    length_dict = {'email': 60, 'password': 24, 'title': 255, 'description': 255}
+    if field == 'amount' or field == 'date':
+        return True
+    if len(data) > length_dict[field]:
+        raise DataTooLongException(message="'%s' too long. (max: %d)" % (field, length_dict[field]))
+    return True
+
+
+def legacy_clean_expense(data):
+    """스키마 도입 이전의 검사 경로. (필드별 `validate_datatype`･`validate_length` 호출 후 날짜･금액 검사)"""
+
+    for key, value in data.items():
+        validate_datatype(data=value, field=key)
+        validate_length(data=value, field=key)
+    try:
+        date = datetime.date.fromisoformat(data['date'])
+    except ValueError:
+        raise InvalidValueException(message="date format must be 'yyyy-mm-dd'.")
+    if data['amount'] < 0:
+        raise InvalidValueException(message="amount must be positive.")
+    return {'title': data['title'], 'date': date, 'amount': data['amount'], 'description': data['description']}
+
+
+def legacy_validate_email(email):
+    if validate_datatype(data=email, field='email'):
+        if validate_length(data=email, field='email'):
+            if re.match(EMAIL_REGEX_PATTERN, email):
+                return email
+            raise InvalidValueException(message="invalid email address.")
+
+
+class Command(BaseCommand):
+    """
+    입력값 검사 벤치마크 커맨드.
+
+    지출내역 일괄등록 항목을 기존 필드별 검사 함수(`validate_datatype`･`validate_length` + 날짜･금액 검사)와
+    컴파일된 스키마(`EXPENSE_SCHEMA.validate_many`)로 검사하여 비교한다. 이메일 검사도 함께 비교한다.
+    `--invalid` 비율만큼 오류 항목(자료형･길이･날짜 형식･필수 키)을 섞는다.
+    """
+
+    help = 'Compare the per-field validators and the compiled expense schema on synthetic batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--invalid', type=float, default=0.1, help='ratio of invalid rows.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        titles = ['아파트관리비', '점심 식사', '커피', '택시비', 'Coffee "beans"']
+        broken = [
+            lambda row: dict(row, amount=str(row['amount'])),
+            lambda row: dict(row, description='x' * 256),
+            lambda row: dict(row, date=row['date'].replace('-', '.')),
+            lambda row: {key: value for key, value in row.items() if key != 'amount'},
+        ]
+        rows, emails = [], []
+        for i in range(options['rows']):
+            row = {'title': rng.choice(titles), 'amount': rng.randrange(100, 200000, 100), 'description': '',
+                   'date': (datetime.date(2020, 1, 1) + datetime.timedelta(days=rng.randrange(730))).isoformat()}
+            if rng.random() < options['invalid']:
+                row = rng.choice(broken)(row)
+            rows.append(row)
+            emails.append('user%d@example.com' % i if rng.random() >= options['invalid'] else 'user%d@example' % i)
+
+        def legacy_expenses():
+            valid = 0
+            for row in rows:
+                try:
+                    legacy_clean_expense(row)
+                    valid += 1
+                except ERRORS:
+                    pass
+            return valid
+
+        def schema_expenses():
+            return len(EXPENSE_SCHEMA.validate_many(rows)[0])
+
+        def run_emails(validate):
+            def run():
+                valid = 0
+                for email in emails:
+                    try:
+                        validate(email)
+                        valid += 1
+                    except ERRORS:
+                        pass
+                return valid
+            return run
+
+        def measure(func):
+            return min(timeit.repeat(func, number=1, repeat=options['repeat'])) * 1000
+
+        if legacy_expenses() != schema_expenses():
+            self.stderr.write('valid row counts differ.')
+
+        cases = [
+            ('expenses', measure(legacy_expenses), measure(schema_expenses)),
+            ('emails', measure(run_emails(legacy_validate_email)), measure(run_emails(check_email))),
+        ]
+        self.stdout.write('%d rows, %.0f%% invalid' % (options['rows'], options['invalid'] * 100))
+        for name, legacy, schema in cases:
+            self.stdout.write('%-9s legacy %8.2f ms  schema %8.2f ms  x%.2f  (%.0f rows/s)' % (
+                name, legacy, schema, legacy / schema, options['rows'] / schema * 1000))
@@ -0,0 +1,102 @@
+import datetime
+import random
+import time
+
+from collections import defaultdict
+
+import bcrypt
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from expenses import ledger, rollups, search, sharding
+from expenses.models import Expense
+from users.models import User
+
+# 합성 지출내역 제목･메모 후보
+TITLES = ['아파트관리비', '점심 식사', '저녁 식사', '커피', '택시비', '버스비', '지하철', '편의점', '마트 장보기',
+          '통신비', '전기요금', '가스요금', '월세', '병원비', '약국', '영화', '도서 구입', '헬스장', '주유', '주차비']
+DESCRIPTIONS = [None, '', '카드 결제', '현금', '회사 근처', '주말', '정기 결제', '할인 적용']
+
+
+class Command(BaseCommand):
+    """
+    합성(synthetic) 가계부 데이터 생성 커맨드.
+
+    부하 테스트용 유저와 지출내역을 seed 값에 따라 재현 가능하게 생성한다.
+    유저 이메일은 `<prefix>NNNNNN@example.com` 형식이며 비밀번호는 모두 같다.
+    지출내역은 chunk 단위 `bulk_create`로 저장하므로 수백만 건도 일정한 메모리로 생성할 수 있다.
+    새 유저는 shard 를 배정하고 지출내역은 유저 shard 에 저장한다.
+    생성 후 가계부 버전(ETag)을 올리고 검색 색인과 집계 테이블을 갱신한다.
+    """
+
+    help = 'Generate reproducible synthetic users and expenses for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--expenses', type=int, default=1000, help='expenses per user.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--password', default='abc135!!')
+        parser.add_argument('--rounds', type=int, default=4, help='bcrypt cost factor of the shared password.')
+        parser.add_argument('--start-date', default='2020-01-01')
+        parser.add_argument('--days', type=int, default=730)
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument('--skip-derived', action='store_true', help='do not rebuild search index and rollups.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+
+        password = bcrypt.hashpw(options['password'].encode('utf-8'),
+                                 bcrypt.gensalt(rounds=options['rounds'])).decode('utf-8')
+        emails = ['%s%06d@example.com' % (options['prefix'], i) for i in range(options['users'])]
+        existing = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+        User.objects.bulk_create([User(email=email, password=password) for email in emails if email not in existing],
+                                 batch_size=options['chunk_size'])
+        users = list(User.objects.filter(email__in=emails).order_by('email').values_list('id', 'email'))
+        user_ids = [user_id for user_id, _ in users]
+        if len(sharding.get_shards()) > 1:
+            for user_id, email in users:
+                if email not in existing:
+                    sharding.assign(user_id)
+
+        start_date = datetime.date.fromisoformat(options['start_date'])
+        total = 0
+        chunk = []
+        for user_id in user_ids:
+            for _ in range(options['expenses']):
+                chunk.append(Expense(user_id=user_id,
+                                     title=rng.choice(TITLES),
+                                     date=start_date + datetime.timedelta(days=rng.randrange(options['days'])),
+                                     amount=rng.randrange(100, 200000, 100),
+                                     description=rng.choice(DESCRIPTIONS)))
+                if len(chunk) >= options['chunk_size']:
+                    total += self.flush(chunk)
+                    self.stdout.write('\r%d expenses' % total, ending='')
+            self.stdout.flush()
+        total += self.flush(chunk)
+        self.stdout.write('\r%d expenses for %d users generated.' % (total, len(user_ids)))
+
+        for user_id in user_ids:
+            with sharding.use_shard(sharding.get_shard(user_id)):
+                ledger.bump_version(user_id)
+                if not options['skip_derived']:
+                    search.index_missing(user_id=user_id, chunk_size=options['chunk_size'])
+                    rollups.rebuild(user_id=user_id)
+        if not options['skip_derived']:
+            self.stdout.write('search index and rollups rebuilt.')
+
+        self.stdout.write(self.style.SUCCESS('done in %.1fs.' % (time.perf_counter() - started)))
+
+    @staticmethod
+    def flush(chunk):
+        count = len(chunk)
+        shards = defaultdict(list)
+        for expense in chunk:
+            shards[sharding.get_shard(expense.user_id)].append(expense)
+        for alias, expenses in shards.items():
+            with transaction.atomic(using=alias):
+                Expense.objects.using(alias).bulk_create(expenses, batch_size=1000)
+        chunk.clear()
+        return count
@@ -0,0 +1,358 @@
+import datetime
+import itertools
+import json
+import random
+import subprocess
+import threading
+import time
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+
+import jwt
+import my_settings
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
+
+from expenses import urls as expense_urls
+from expenses.models import Tag, Expense, DeletedExpense, ExpenseImport, Job
+from users import urls as user_urls
+from users.models import User
+from utils import admission
+
+
+def percentile(values, rank):
+    """정렬된 값 리스트의 nearest-rank 백분위수를 반환한다."""
+
+    if not values:
+        return 0.0
+    return values[max(0, min(len(values) - 1, int(round(rank / 100 * len(values))) - 1))]
+
+
+class Scenario:
+    """
+    시나리오 실행 컨텍스트.
+
+    가상 유저(virtual user)별 token 과 난수 생성기로 각 URL 의 요청을 만든다.
+    """
+
+    def __init__(self, user_id, email, password, rng):
+        self.user_id = user_id
+        self.email = email
+        self.password = password
+        self.rng = rng
+        self.run_id = uuid.uuid4().hex[:8]
+        self.client = Client()
+        self.header = {'HTTP_Authorization': jwt.encode(payload={'user_id': user_id}, key=my_settings.SECRET_KEY,
+                                                        algorithm=my_settings.ALGORITHM)}
+
+    def json(self, method, path, data):
+        return getattr(self.client, method)(path, json.dumps(data), content_type='application/json', **self.header)
+
+    def random_date(self):
+        return (datetime.date(2020, 1, 1) + datetime.timedelta(days=self.rng.randrange(730))).isoformat()
+
+    def random_expense_id(self):
+        return Expense.objects.filter(user_id=self.user_id).order_by('?').values_list('id', flat=True).first() or 0
+
+    def random_deleted_id(self):
+        return DeletedExpense.objects.filter(user_id=self.user_id).order_by('-id').values_list('id', flat=True) \
+                                     .first() or 0
+
+    def last_import_id(self):
+        return ExpenseImport.objects.filter(user_id=self.user_id).order_by('-id').values_list('id', flat=True) \
+                                    .first() or 0
+
+    def random_tag_id(self):
+        return Tag.objects.filter(user_id=self.user_id).order_by('?').values_list('id', flat=True).first() or 0
+
+    def last_job_id(self):
+        return Job.objects.filter(user_id=self.user_id).order_by('-id').values_list('id', flat=True).first() or 0
+
+    def new_expense(self):
+        return {'title': '부하 테스트', 'date': self.random_date(), 'amount': self.rng.randrange(100, 100000, 100),
+                'description': 'load'}
+
+    # 경로(route)별 요청 함수. 반환값은 HttpResponse.
+    def expenses_list(self):
+        return self.client.get('/expenses/', {'limit': 100}, **self.header)
+
+    def expenses_new(self):
+        expense = self.new_expense()
+        if self.rng.random() < 0.5:
+            expense['tag'] = self.random_tag_id() or None
+        return self.json('post', '/expenses/new/', expense)
+
+    def expenses_bulk(self):
+        return self.json('post', '/expenses/bulk/', [self.new_expense() for _ in range(20)])
+
+    def expenses_bulk_delete(self):
+        return self.json('post', '/expenses/bulk-delete/', {'date': self.random_date()})
+
+    def expenses_search(self):
+        return self.client.get('/expenses/search/', {'keyword': self.rng.choice(['식사', '커피', '관리비'])},
+                               **self.header)
+
+    def expenses_summary(self):
+        return self.client.get('/expenses/summary/', {'period': 'monthly'}, **self.header)
+
+    def expenses_aggregate(self):
+        period = self.rng.choice(['day', 'week', 'month', 'year'])
+        params = {'period': period, 'percentiles': '50,90'} if self.rng.random() < 0.5 else {'period': period}
+        return self.client.get('/expenses/aggregate/', params, **self.header)
+
+    def tags_list(self):
+        if self.rng.random() < 0.1:
+            return self.json('post', '/expenses/tags/', {'name': 'tag-%s-%d' % (self.run_id, self.rng.randrange(50))})
+        return self.client.get('/expenses/tags/', {'month': self.random_date()[:7]}, **self.header)
+
+    def tags_detail(self):
+        tag_id = self.random_tag_id()
+        if self.rng.random() < 0.05:
+            return self.client.delete('/expenses/tags/%d/' % tag_id, **self.header)
+        if tag_id and self.rng.random() < 0.5:
+            return self.client.get('/expenses/', {'tag': tag_id, 'limit': 100}, **self.header)
+        return self.json('put', '/expenses/tags/%d/' % tag_id, {'name': 'tag-%s-%d' % (self.run_id, tag_id)})
+
+    def expenses_export(self):
+        month = self.random_date()[:8]
+        response = self.client.get('/expenses/export/', {'start-date': month + '01', 'end-date': month + '28'},
+                                   HTTP_ACCEPT_ENCODING='gzip', **self.header)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def expenses_import(self):
+        lines = ['date,title,amount,description']
+        for _ in range(200):
+            expense = self.new_expense()
+            lines.append('%(date)s,%(title)s,%(amount)d,%(description)s' % expense)
+        lines.append('%s,부하 테스트,invalid,load' % self.random_date())
+        upload = SimpleUploadedFile('load.csv', '\n'.join(lines).encode(), content_type='text/csv')
+        return self.client.post('/expenses/imports/', {'file': upload}, **self.header)
+
+    def expenses_import_detail(self):
+        return self.client.get('/expenses/imports/%d/' % self.last_import_id(), **self.header)
+
+    def expenses_import_errors(self):
+        response = self.client.get('/expenses/imports/%d/errors/' % self.last_import_id(), **self.header)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def jobs_list(self):
+        if self.rng.random() < 0.1:
+            return self.json('post', '/expenses/jobs/', {'kind': 'export', 'params': {'format': 'columnar'}})
+        return self.client.get('/expenses/jobs/', {'limit': 20}, **self.header)
+
+    def jobs_detail(self):
+        return self.client.get('/expenses/jobs/%d/' % self.last_job_id(), **self.header)
+
+    def jobs_cancel(self):
+        return self.client.post('/expenses/jobs/%d/cancel/' % self.last_job_id(), **self.header)
+
+    def jobs_file(self):
+        response = self.client.get('/expenses/jobs/%d/file/' % self.last_job_id(), **self.header)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def expenses_detail(self):
+        expense_id = self.random_expense_id()
+        if self.rng.random() < 0.2:
+            return self.json('put', '/expenses/%d/' % expense_id, {'amount': self.rng.randrange(100, 100000, 100)})
+        if self.rng.random() < 0.05:
+            return self.client.delete('/expenses/%d/' % expense_id, **self.header)
+        return self.client.get('/expenses/%d/' % expense_id, **self.header)
+
+    def deleted_list(self):
+        return self.client.get('/expenses/deleted/', {'limit': 100}, **self.header)
+
+    def deleted_bulk_restore(self):
+        return self.json('post', '/expenses/deleted/bulk-restore/', {'date': self.random_date()})
+
+    def deleted_detail(self):
+        d_expense_id = self.random_deleted_id()
+        if self.rng.random() < 0.2:
+            return self.client.delete('/expenses/deleted/%d/' % d_expense_id, **self.header)
+        return self.client.get('/expenses/deleted/%d/' % d_expense_id, **self.header)
+
+    def user_sign_up(self):
+        email = 'load-%s-%06d@example.com' % (self.run_id, self.rng.randrange(1000000))
+        return self.client.post('/user/sign-up/', json.dumps({'email': email, 'password': self.password}),
+                                content_type='application/json')
+
+    def user_sign_in(self):
+        return self.client.post('/user/sign-in/', json.dumps({'email': self.email, 'password': self.password}),
+                                content_type='application/json')
+
+
+# URL 패턴 → 시나리오 함수 이름
+ROUTES = {
+    ('expenses', ''): 'expenses_list',
+    ('expenses', 'new/'): 'expenses_new',
+    ('expenses', 'bulk/'): 'expenses_bulk',
+    ('expenses', 'bulk-delete/'): 'expenses_bulk_delete',
+    ('expenses', 'search/'): 'expenses_search',
+    ('expenses', 'summary/'): 'expenses_summary',
+    ('expenses', 'aggregate/'): 'expenses_aggregate',
+    ('expenses', 'tags/'): 'tags_list',
+    ('expenses', 'tags/<int:tag_id>/'): 'tags_detail',
+    ('expenses', 'export/'): 'expenses_export',
+    ('expenses', 'imports/'): 'expenses_import',
+    ('expenses', 'imports/<int:import_id>/'): 'expenses_import_detail',
+    ('expenses', 'imports/<int:import_id>/errors/'): 'expenses_import_errors',
+    ('expenses', 'jobs/'): 'jobs_list',
+    ('expenses', 'jobs/<int:job_id>/'): 'jobs_detail',
+    ('expenses', 'jobs/<int:job_id>/cancel/'): 'jobs_cancel',
+    ('expenses', 'jobs/<int:job_id>/file/'): 'jobs_file',
+    ('expenses', '<int:expense_id>/'): 'expenses_detail',
+    ('expenses', 'deleted/'): 'deleted_list',
+    ('expenses', 'deleted/bulk-restore/'): 'deleted_bulk_restore',
+    ('expenses', 'deleted/<int:d_expense_id>/'): 'deleted_detail',
+    ('user', 'sign-up/'): 'user_sign_up',
+    ('user', 'sign-in/'): 'user_sign_in',
+}
+
+
+class Command(BaseCommand):
+    """
+    전 구간(end-to-end) 부하 벤치마크 커맨드.
+
+    `expenses.urls`와 `users.urls`의 모든 URL 을 `generate_ledger`로 생성한 유저들로 동시에 요청한다.
+    요청은 프로세스 내부 WSGI 핸들러(test Client)로 보내며 로컬 DB를 사용한다.
+    URL 별 p50･p95･p99 지연시간, 처리량, 요청당 쿼리 수를 측정하여 JSON 으로 저장하고,
+    `--compare`로 이전 결과(다른 커밋)와 비교할 수 있다.
+    """
+
+    help = 'Drive every expenses/users URL concurrently and record latency, throughput and queries per request.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help='email prefix used by generate_ledger.')
+        parser.add_argument('--password', default='abc135!!')
+        parser.add_argument('--users', type=int, default=20, help='number of virtual users.')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=30.0, help='seconds.')
+        parser.add_argument('--routes', nargs='*', default=None, help='run only these scenario names.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default=None, help='result JSON path.')
+        parser.add_argument('--compare', default=None, help='previous result JSON to compare with.')
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(email__startswith=options['prefix']).order_by('email')
+                                 .values_list('id', 'email')[:options['users']])
+        if not users:
+            raise CommandError("no users with prefix '%s'. run generate_ledger first." % options['prefix'])
+
+        routes = self.collect_routes(options['routes'])
+        rng = random.Random(options['seed'])
+        scenarios = [Scenario(user_id, email, options['password'], random.Random(rng.random()))
+                     for user_id, email in users]
+        samples = {name: [] for name in routes}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+        counter = itertools.count()
+
+        def worker(index):
+            local = {name: [] for name in routes}
+            while time.perf_counter() < deadline:
+                step = next(counter)
+                scenario = scenarios[step % len(scenarios)]
+                name = routes[step % len(routes)]
+                queries = [0]
+
+                def count_queries(execute, sql, params, many, context):
+                    queries[0] += 1
+                    return execute(sql, params, many, context)
+
+                started = time.perf_counter()
+                with connection.execute_wrapper(count_queries):
+                    status = getattr(scenario, name)().status_code
+                local[name].append((time.perf_counter() - started, status, queries[0]))
+            with lock:
+                for name, values in local.items():
+                    samples[name].extend(values)
+            connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            list(executor.map(worker, range(options['concurrency'])))
+        elapsed = time.perf_counter() - started
+
+        result = {
+            'meta'     : {
+                'commit'     : self.git_commit(),
+                'created_at' : datetime.datetime.now().isoformat(timespec='seconds'),
+                'vendor'     : connection.vendor,
+                'users'      : len(users),
+                'concurrency': options['concurrency'],
+                'duration'   : elapsed,
+            },
+            'routes'   : {name: self.summarize(values, elapsed) for name, values in samples.items()},
+            'total'    : self.summarize([value for values in samples.values() for value in values], elapsed),
+            'admission': admission.stats(),
+        }
+
+        self.print_result(result, self.load(options['compare']))
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, indent=2)
+            self.stdout.write('results written to %s' % options['output'])
+
+    def collect_routes(self, only):
+        """URL 설정의 모든 패턴에 시나리오가 있는지 확인하고 실행할 시나리오 이름 리스트를 반환한다."""
+
+        patterns = [('expenses', str(pattern.pattern)) for pattern in expense_urls.urlpatterns] + \
+                   [('user', str(pattern.pattern)) for pattern in user_urls.urlpatterns]
+        missing = [pattern for pattern in patterns if pattern not in ROUTES]
+        if missing:
+            raise CommandError('no scenario for %s.' % ', '.join('/%s/%s' % pattern for pattern in missing))
+        names = [ROUTES[pattern] for pattern in patterns]
+        return [name for name in names if not only or name in only]
+
+    @staticmethod
+    def summarize(values, elapsed):
+        latencies = sorted(latency for latency, _, _ in values)
+        count = len(values)
+        return {
+            'requests'           : count,
+            'errors'             : sum(1 for _, status, _ in values if status >= 500),
+            'client_errors'      : sum(1 for _, status, _ in values if 400 <= status < 500),
+            'shed'               : sum(1 for _, status, _ in values if status in (429, 503)),
+            'throughput'         : count / elapsed if elapsed else 0.0,
+            'p50_ms'             : percentile(latencies, 50) * 1000,
+            'p95_ms'             : percentile(latencies, 95) * 1000,
+            'p99_ms'             : percentile(latencies, 99) * 1000,
+            'queries_per_request': sum(queries for _, _, queries in values) / count if count else 0.0,
+        }
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL) \
+                             .decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    @staticmethod
+    def load(path):
+        if not path:
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def print_result(self, result, previous):
+        self.stdout.write('%-22s %8s %9s %9s %9s %9s %7s %6s %6s' % (
+            'route', 'requests', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'errors', 'shed'))
+        rows = list(result['routes'].items()) + [('total', result['total'])]
+        for name, row in rows:
+            line = '%-22s %8d %9.1f %9.2f %9.2f %9.2f %7.1f %6d %6d' % (
+                name, row['requests'], row['throughput'], row['p50_ms'], row['p95_ms'], row['p99_ms'],
+                row['queries_per_request'], row['errors'], row['shed'])
+            before = (previous or {}).get('routes', {}).get(name) if name != 'total' else (previous or {}).get('total')
+            if before and before['p95_ms']:
+                line += '  p95 %+.1f%%' % ((row['p95_ms'] / before['p95_ms'] - 1) * 100)
+            self.stdout.write(line)
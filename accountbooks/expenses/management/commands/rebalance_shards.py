@@ -0,0 +1,77 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count
+
+from expenses import sharding
+from expenses.models import Expense, ShardMap
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    가계부 shard 재배치 커맨드.
+
+    `--user`의 가계부(지출내역･삭제내역･검색 색인･집계･가계부 버전)를 `--to` shard 로 서비스 중에 옮긴다.
+    (`expenses.sharding.move_user`) 모든 유저를 옮긴 뒤 `--grace` 초(다른 프로세스의 shard 캐시 TTL)를 기다려
+    이전 shard 의 행을 지운다. `--status`는 shard 별 유저･지출내역 수를 출력한다.
+    """
+
+    help = 'Move users\' ledgers between database shards online, or show the shard distribution.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, nargs='+', dest='users', default=[], help='user ids to move.')
+        parser.add_argument('--to', default=None, help='target shard alias.')
+        parser.add_argument('--grace', type=float, default=None,
+                            help='seconds to wait before purging the source shard. (default: SHARD_MAP_CACHE_TTL + 1)')
+        parser.add_argument('--keep-source', action='store_true', help='do not purge the source shard.')
+        parser.add_argument('--chunk-size', type=int, default=sharding.CHUNK_SIZE)
+        parser.add_argument('--status', action='store_true', help='show users and expenses per shard.')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.show_status()
+            return
+        if not options['users'] or not options['to']:
+            raise CommandError('--user and --to are required.')
+        if options['to'] not in sharding.get_shards():
+            raise CommandError("'%s' is not in DATABASE_SHARDS %s." % (options['to'], sharding.get_shards()))
+
+        moved = []
+        for user_id in options['users']:
+            if not User.objects.filter(id=user_id).exists():
+                raise CommandError("user '%d' does not exist." % user_id)
+            started = time.perf_counter()
+            try:
+                source = sharding.move_user(user_id, options['to'], chunk_size=options['chunk_size'])
+            except sharding.ShardMoveError as e:
+                raise CommandError(str(e))
+            if source == options['to']:
+                self.stdout.write("user %d is already in '%s'." % (user_id, source))
+                continue
+            moved.append((user_id, source))
+            self.stdout.write("user %d moved '%s' → '%s' in %.2fs." % (user_id, source, options['to'],
+                                                                    time.perf_counter() - started))
+
+        if not moved or options['keep_source']:
+            return
+        grace = options['grace']
+        if grace is None:
+            grace = getattr(settings, 'SHARD_MAP_CACHE_TTL', 10) + 1
+        self.stdout.write('waiting %.0fs for shard caches to expire.' % grace)
+        time.sleep(grace)
+        for user_id, source in moved:
+            count = sharding.purge(user_id, source, chunk_size=options['chunk_size'])
+            self.stdout.write("user %d: %d rows purged from '%s'." % (user_id, count, source))
+        self.stdout.write(self.style.SUCCESS('%d users moved.' % len(moved)))
+
+    def show_status(self):
+        mapped = dict(ShardMap.objects.using(DEFAULT_DB_ALIAS).values('alias').annotate(users=Count('user'))
+                                      .values_list('alias', 'users'))
+        unmapped = User.objects.using(DEFAULT_DB_ALIAS).count() - sum(mapped.values())
+        for alias in sharding.get_shards():
+            users = mapped.get(alias, 0) + (unmapped if alias == DEFAULT_DB_ALIAS else 0)
+            expenses = Expense.objects.using(alias).count()
+            self.stdout.write('%-16s %8d users %12d expenses' % (alias, users, expenses))
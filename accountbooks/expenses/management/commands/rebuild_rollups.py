@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from expenses import sharding
+from expenses.rollups import rebuild
+
+
+class Command(BaseCommand):
+    """
+    일별･월별 지출 집계 테이블 재구성 커맨드.
+
+    원본 지출내역으로부터 집계 테이블을 다시 계산하여 증감분 반영 누락 등으로 생긴 차이를 바로잡는다.
+    shard 마다 차례로 재구성한다. (`--user`는 유저의 shard 만)
+    """
+
+    help = 'Rebuild daily/monthly spending rollup tables from expenses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, default=None, help='rebuild only this user id.')
+
+    def handle(self, *args, **options):
+        user_id = options['user']
+        aliases = sharding.get_shards() if user_id is None else [sharding.get_shard(user_id)]
+        days = months = 0
+        for alias in aliases:
+            with sharding.use_shard(alias):
+                counts = rebuild(user_id=user_id)
+            days, months = days + counts[0], months + counts[1]
+        self.stdout.write(self.style.SUCCESS('%d daily and %d monthly rollups rebuilt.' % (days, months)))
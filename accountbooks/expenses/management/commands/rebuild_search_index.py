@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from expenses import sharding
+from expenses.models import ExpenseSearchToken
+from expenses.search import index_missing, use_fulltext
+
+
+class Command(BaseCommand):
+    """
+    지출내역 검색 역색인 재구성 커맨드.
+
+    n-gram 역색인이 없는 지출내역을 색인한다. `--reset` 옵션은 전체 역색인을 지우고 다시 만든다.
+    MySQL FULLTEXT 백엔드는 DB가 색인을 관리하므로 동작하지 않는다. shard 마다 차례로 색인한다.
+    """
+
+    help = 'Rebuild the n-gram search index of expenses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, default=None, help='rebuild only this user id.')
+        parser.add_argument('--reset', action='store_true', help='drop existing tokens first.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if use_fulltext():
+            self.stdout.write('MySQL FULLTEXT backend in use. nothing to do.')
+            return
+
+        user_id = options['user']
+        aliases = sharding.get_shards() if user_id is None else [sharding.get_shard(user_id)]
+        count = 0
+        for alias in aliases:
+            with sharding.use_shard(alias):
+                if options['reset']:
+                    tokens = ExpenseSearchToken.objects.all()
+                    if user_id is not None:
+                        tokens = tokens.filter(user_id=user_id)
+                    tokens.delete()
+                count += index_missing(user_id=user_id, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS('%d expenses indexed.' % count))
@@ -0,0 +1,100 @@
+import multiprocessing
+import signal
+import threading
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from expenses import jobs
+from expenses.models import Job
+
+
+class Command(BaseCommand):
+    """
+    백그라운드 작업 실행 커맨드.
+
+    `expenses.jobs` 대기열의 작업을 `--processes`개의 작업자 프로세스(ProcessPoolExecutor)에서 실행한다.
+    메인 프로세스는 작업을 점유(claim)하여 작업자 프로세스에 넘기고, 실행 중인 작업의 점유 시각을 갱신(heartbeat)하며,
+    점유 시각이 JOB_LOCK_TIMEOUT 초 이상 갱신되지 않은 작업(종료된 작업자의 작업)을 다시 대기열에 넣는다.
+    같은 DB를 사용하는 여러 서버에서 동시에 실행할 수 있다.
+    `--processes 0`은 현재 프로세스에서 차례로 실행하고, `--burst`는 대기열이 비면 종료한다.
+    SIGINT･SIGTERM 을 받으면 새 작업을 점유하지 않고 실행 중인 작업이 끝난 뒤 종료한다.
+    """
+
+    help = 'Run queued background jobs (imports, exports, rollup rebuilds, purges) in a local process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=getattr(settings, 'JOB_WORKER_PROCESSES', 2),
+                            help='worker processes. 0 runs jobs in this process.')
+        parser.add_argument('--poll', type=float, default=getattr(settings, 'JOB_POLL_INTERVAL', 1),
+                            help='seconds between queue polls.')
+        parser.add_argument('--burst', action='store_true', help='exit when the queue is empty.')
+
+    def handle(self, *args, **options):
+        if options['processes'] < 0:
+            raise CommandError('--processes must be 0 or more.')
+        self.worker_id = jobs.make_worker_id()
+        self.stopping = threading.Event()
+        handlers = {signum: signal.signal(signum, lambda *_: self.stopping.set())
+                    for signum in (signal.SIGINT, signal.SIGTERM)}
+
+        self.stdout.write('worker %s started. (processes: %d)' % (self.worker_id, options['processes']))
+        try:
+            if options['processes'] == 0:
+                self.run_inline(options)
+            else:
+                self.run_pool(options)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS('worker %s stopped.' % self.worker_id))
+
+    def run_inline(self, options):
+        while not self.stopping.is_set():
+            jobs.requeue_stale()
+            job = jobs.claim(self.worker_id)
+            if job is None:
+                if options['burst']:
+                    return
+                self.stopping.wait(options['poll'])
+                continue
+            self.report(job.id, jobs.execute(job.id, self.worker_id))
+
+    def run_pool(self, options):
+        # 작업자 프로세스가 부모의 DB 연결을 공유하지 않도록 fork 전에 닫는다.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        running = {}
+        with ProcessPoolExecutor(max_workers=options['processes'], mp_context=context) as pool:
+            while True:
+                jobs.requeue_stale()
+                while not self.stopping.is_set() and len(running) < options['processes']:
+                    job = jobs.claim(self.worker_id)
+                    if job is None:
+                        break
+                    running[pool.submit(jobs.execute, job.id, self.worker_id)] = job.id
+                if not running:
+                    if self.stopping.is_set() or options['burst']:
+                        return
+                    self.stopping.wait(options['poll'])
+                    continue
+
+                done, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        self.report(job_id, future.result())
+                    except BrokenProcessPool:
+                        for job_id in [job_id, *running.values()]:
+                            jobs.fail(Job.objects.get(id=job_id), self.worker_id, 'worker process terminated.')
+                        raise CommandError('a worker process terminated abruptly.')
+                    except Exception as e:
+                        self.stderr.write('job %d: %s' % (job_id, e))
+                jobs.heartbeat(list(running.values()), self.worker_id)
+
+    def report(self, job_id, status):
+        self.stdout.write('job %d %s.' % (job_id, status))
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0002_auto_20220121_1252'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'date', 'id', 'amount', 'title'], name='expenses_user_date_cover'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedexpense',
+            index=models.Index(fields=['user', 'date', 'id', 'amount', 'title'], name='d_expenses_user_date_cover'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedexpense',
+            index=models.Index(fields=['user', 'deleted_at'], name='d_expenses_user_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def add_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE `expenses` ADD FULLTEXT INDEX `expenses_fulltext` '
+                              '(`title`, `description`) WITH PARSER ngram')
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE `expenses` DROP INDEX `expenses_fulltext`')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('expenses', '0003_expense_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=2)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('expense', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='expenses.expense')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.user')),
+            ],
+            options={
+                'db_table': 'expense_search_tokens',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='expensesearchtoken',
+            index=models.Index(fields=['user', 'gram', 'expense', 'weight'], name='search_tokens_user_gram_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='expensesearchtoken',
+            constraint=models.UniqueConstraint(fields=('expense', 'gram'), name='search_tokens_expense_gram_uniq'),
+        ),
+        migrations.RunPython(add_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('expenses', '0004_expense_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySpending',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total', models.BigIntegerField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.user')),
+            ],
+            options={
+                'db_table': 'daily_spendings',
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlySpending',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('total', models.BigIntegerField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.user')),
+            ],
+            options={
+                'db_table': 'monthly_spendings',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyspending',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='daily_spendings_user_date_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlyspending',
+            constraint=models.UniqueConstraint(fields=('user', 'month'), name='monthly_spendings_user_month_uniq'),
+        ),
+    ]
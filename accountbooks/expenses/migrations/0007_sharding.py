@@ -0,0 +1,41 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def user_field(**kwargs):
+    return models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='users.user',
+                             **kwargs)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('expenses', '0006_ledger_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardMap',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True,
+                                              serialize=False, to='users.user')),
+                ('alias', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'shard_map',
+            },
+        ),
+        migrations.AlterField(model_name='expense', name='user', field=user_field()),
+        migrations.AlterField(model_name='deletedexpense', name='user', field=user_field()),
+        migrations.AlterField(model_name='expensesearchtoken', name='user', field=user_field()),
+        migrations.AlterField(model_name='dailyspending', name='user', field=user_field()),
+        migrations.AlterField(model_name='monthlyspending', name='user', field=user_field()),
+        migrations.AlterField(
+            model_name='ledgerversion',
+            name='user',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE,
+                                       primary_key=True, serialize=False, to='users.user'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('expenses', '0007_sharding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField(default=0)),
+                ('status', models.CharField(default='pending', max_length=16)),
+                ('processed_bytes', models.BigIntegerField(default=0)),
+                ('lines', models.IntegerField(default=0)),
+                ('imported', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.user')),
+            ],
+            options={
+                'db_table': 'expense_imports',
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('expenses', '0009_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE,
+                                           to='users.user')),
+            ],
+            options={
+                'db_table': 'tags',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='tags_user_name_uniq'),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='tag',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True,
+                                    on_delete=django.db.models.deletion.SET_NULL, related_name='+',
+                                    to='expenses.tag'),
+        ),
+        migrations.AddField(
+            model_name='deletedexpense',
+            name='tag',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True,
+                                    on_delete=django.db.models.deletion.SET_NULL, related_name='+',
+                                    to='expenses.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'tag', 'date', 'id'], name='expenses_user_tag_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedexpense',
+            index=models.Index(fields=['user', 'tag', 'date', 'id'], name='d_expenses_user_tag_date_idx'),
+        ),
+        migrations.CreateModel(
+            name='TagMonthlySpending',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('total', models.BigIntegerField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('tag', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE,
+                                          related_name='+', to='expenses.tag')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE,
+                                           to='users.user')),
+            ],
+            options={
+                'db_table': 'tag_monthly_spendings',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tagmonthlyspending',
+            constraint=models.UniqueConstraint(fields=('user', 'tag', 'month'),
+                                               name='tag_spendings_user_tag_month_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='tagmonthlyspending',
+            index=models.Index(fields=['user', 'month'], name='tag_spendings_user_month_idx'),
+        ),
+    ]
@@ -1,21 +1,52 @@
 import datetime
 
 from django.db import models
+from django.utils import timezone
 
 from users.models import User
 
 
+class Tag(models.Model):
+    """
+    유저별 지출 분류(카테고리･태그) 모델 클래스이다.
+    지출내역은 태그를 하나 가질 수 있으며 삭제내역도 태그를 유지하여 복원 시 그대로 돌아온다.
+    이름은 유저별로 유일하다. 지출내역과 같은 shard 에 저장된다.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    name = models.CharField(max_length=30)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def get_tag(self):
+        return {
+            'id'  : self.id,
+            'name': self.name
+        }
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        db_table = 'tags'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='tags_user_name_uniq'),
+        ]
+
+
 class AbstractExpense(models.Model):
     """
     가계부 지출 객체를 정의하는 추상화 모델 클래스이다.
     각 모델 클래스는 본 추상화 클래스를 상속받는다.
+    유저 테이블과 다른 DB(shard)에 저장될 수 있으므로 user 외래키 제약은 두지 않는다.
     """
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
     title = models.CharField(max_length=255)
     date = models.DateField(default=datetime.date.today())
     amount = models.PositiveIntegerField()
     description = models.CharField(max_length=255, blank=True, null=True)
+    tag = models.ForeignKey(Tag, on_delete=models.SET_NULL, blank=True, null=True, db_constraint=False,
+                            related_name='+')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -32,6 +63,7 @@ class AbstractExpense(models.Model):
             'title'      : self.title,
             'amount'     : self.amount,
             'description': self.description,
+            'tag_id'     : self.tag_id,
             'created_at' : self.created_at,
             'updated_at' : self.updated_at
         }
@@ -46,6 +78,7 @@ class AbstractExpense(models.Model):
         self.title       = request['title'] if 'title' in request else self.title
         self.amount      = request['amount'] if 'amount' in request else self.amount
         self.description = request['description'] if 'description' in request else self.description
+        self.tag_id      = request['tag'] if 'tag' in request else self.tag_id
         self.save()
 
     def __str__(self):
@@ -65,6 +98,12 @@ class Expense(AbstractExpense):
 
     class Meta:
         db_table = 'expenses'
+        indexes = [
+            # 리스트 뷰 커버링 인덱스: (user_id, date, id) 탐색･정렬 + (amount, title) 프로젝션
+            models.Index(fields=['user', 'date', 'id', 'amount', 'title'], name='expenses_user_date_cover'),
+            # 태그 필터: (user_id, tag_id, date) 탐색･정렬
+            models.Index(fields=['user', 'tag', 'date', 'id'], name='expenses_user_tag_date_idx'),
+        ]
 
 
 class DeletedExpense(AbstractExpense):
@@ -87,6 +126,7 @@ class DeletedExpense(AbstractExpense):
             'title'      : self.title,
             'amount'     : self.amount,
             'description': self.description,
+            'tag_id'     : self.tag_id,
             'created_at' : self.created_at,
             'updated_at' : self.updated_at,
             'deleted_at' : self.deleted_at
@@ -94,3 +134,187 @@ class DeletedExpense(AbstractExpense):
 
     class Meta:
         db_table = 'deleted_expenses'
+        indexes = [
+            models.Index(fields=['user', 'date', 'id', 'amount', 'title'], name='d_expenses_user_date_cover'),
+            models.Index(fields=['user', 'deleted_at'], name='d_expenses_user_deleted_idx'),
+            models.Index(fields=['user', 'tag', 'date', 'id'], name='d_expenses_user_tag_date_idx'),
+        ]
+
+
+class ExpenseSearchToken(models.Model):
+    """
+    지출내역 검색용 n-gram 역색인(inverted index) 모델 클래스이다.
+    제목(title)･메모(description)를 bi-gram 으로 분해하여 저장하며 `search` 모듈이 관리한다.
+    MySQL FULLTEXT(ngram parser) 검색을 사용하는 경우에는 사용되지 않는다.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    expense = models.ForeignKey(Expense, on_delete=models.CASCADE)
+    gram = models.CharField(max_length=2)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        db_table = 'expense_search_tokens'
+        constraints = [
+            models.UniqueConstraint(fields=['expense', 'gram'], name='search_tokens_expense_gram_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'gram', 'expense', 'weight'], name='search_tokens_user_gram_idx'),
+        ]
+
+
+class DailySpending(models.Model):
+    """
+    유저별 일별 지출 합계 집계(rollup) 모델 클래스이다.
+    지출내역 생성･수정･삭제･복원 시 `rollups` 모듈이 증감분(delta)을 반영한다.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    date = models.DateField()
+    total = models.BigIntegerField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'daily_spendings'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='daily_spendings_user_date_uniq'),
+        ]
+
+
+class MonthlySpending(models.Model):
+    """
+    유저별 월별 지출 합계 집계(rollup) 모델 클래스이다.
+    월(month)은 해당 월의 1일로 저장한다.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    month = models.DateField()
+    total = models.BigIntegerField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'monthly_spendings'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month'], name='monthly_spendings_user_month_uniq'),
+        ]
+
+
+class TagMonthlySpending(models.Model):
+    """
+    유저별 태그별 월별 지출 합계 집계(rollup) 모델 클래스이다.
+    태그가 있는 지출내역의 증감분만 `rollups` 모듈이 반영한다. (태그 없는 지출은 월별 합계에만 포함된다)
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, db_constraint=False, related_name='+')
+    month = models.DateField()
+    total = models.BigIntegerField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'tag_monthly_spendings'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'tag', 'month'], name='tag_spendings_user_tag_month_uniq'),
+        ]
+        indexes = [
+            # 한 달의 태그별 합계 조회
+            models.Index(fields=['user', 'month'], name='tag_spendings_user_month_idx'),
+        ]
+
+
+class LedgerVersion(models.Model):
+    """
+    유저별 가계부 버전 모델 클래스이다.
+    지출내역 생성･수정･삭제･복원 시 `ledger` 모듈이 version 을 1 증가시키며,
+    리스트 뷰의 ETag･Last-Modified 값으로 사용한다. (행이 없으면 version 0)
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, db_constraint=False)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'ledger_versions'
+
+
+class ShardMap(models.Model):
+    """
+    유저별 가계부 shard 모델 클래스이다. (shard map)
+    유저의 지출내역 데이터(SHARDED_MODELS)가 저장된 DB alias 를 기록하며 항상 default DB 에 저장한다.
+    행이 없는 유저의 shard 는 default 이다. `sharding` 모듈이 관리한다.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    alias = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'shard_map'
+
+
+class ExpenseImport(models.Model):
+    """
+    지출내역 가져오기(import) 작업 모델 클래스이다.
+    업로드된 CSV 파일의 처리 상태와 진행률(읽은 바이트･줄 수, 등록･실패 건수)을 기록하며 `imports` 모듈이 갱신한다.
+    실패한 줄은 오류 파일(EXPENSE_IMPORT_DIR/<id>.errors.csv)에 기록한다.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=16, default=STATUS_PENDING)
+    processed_bytes = models.BigIntegerField(default=0)
+    lines = models.IntegerField(default=0)
+    imported = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'expense_imports'
+
+
+class Job(models.Model):
+    """
+    백그라운드 작업 모델 클래스이다.
+    가져오기･내보내기･집계 재구성･일괄 영구삭제 등 요청 스레드에서 실행하기 무거운 작업의 대기열로,
+    `jobs` 모듈이 관리하며 작업자(`run_jobs` 커맨드)가 조건부 UPDATE 로 점유(claim)하여 실행한다.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True)
+    kind = models.CharField(max_length=32)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=16, default=STATUS_QUEUED)
+    progress = models.FloatField(default=0)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=1)
+    run_at = models.DateTimeField(default=timezone.now)
+    cancel_requested = models.BooleanField(default=False)
+    locked_by = models.CharField(max_length=64, blank=True, null=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'jobs'
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='jobs_status_run_at_idx'),
+            models.Index(fields=['user', 'created_at'], name='jobs_user_created_idx'),
+        ]
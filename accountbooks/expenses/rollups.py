@@ -0,0 +1,175 @@
+import datetime
+
+from collections import defaultdict
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from . import sharding
+from .models import Expense, DailySpending, MonthlySpending, TagMonthlySpending
+
+# 증감분 키(일･월)가 이보다 많으면 `upsert_many()`로 한 번에 반영한다. (가져오기 등 대량 생성)
+BATCH_THRESHOLD = 16
+
+
+def to_date(value):
+    """문자열(yyyy-mm-dd) 또는 date 값을 date 로 변환한다."""
+
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    return value
+
+
+def collect_deltas(queryset, sign=1):
+    """
+    증감분 계산 함수.
+
+    queryset 에 해당하는 지출내역을 날짜･태그별 (date, total, count, tag_id)로 묶어 반환한다.
+    삭제 대상이면 sign=-1 로 음수 증감분을 만든다.
+    """
+
+    rows = queryset.order_by().values('date', 'tag_id').annotate(total=Sum('amount'), count=Count('id'))
+    return [(row['date'], sign * row['total'], sign * row['count'], row['tag_id']) for row in rows]
+
+
+def upsert(model, user_id, keys, total, count):
+    """
+    집계 행에 증감분을 더한다. 행이 없으면 만든다.
+
+    parameters
+    ----------
+    keys: dict (집계 키 필드 → 값, 예: {'date': date} 또는 {'tag_id': 1, 'month': month})
+    """
+
+    queryset = model.objects.filter(user_id=user_id, **keys)
+    if queryset.update(total=F('total') + total, count=F('count') + count):
+        return
+    try:
+        with sharding.atomic(user_id):
+            model.objects.create(user_id=user_id, total=total, count=count, **keys)
+    except IntegrityError:
+        queryset.update(total=F('total') + total, count=F('count') + count)
+
+
+def upsert_many(model, user_id, key_field, buckets):
+    """
+    집계 행 일괄 증감 함수.
+
+    기존 행을 잠가 조회한 뒤 UPDATE 한 번(executemany)으로 증감분을 더하고, 없는 행은 `bulk_create`로 만든다.
+    그 사이 다른 트랜잭션이 같은 행을 만든 경우(IntegrityError)에는 없던 행마다 `upsert()`로 반영한다.
+
+    parameters
+    ----------
+    model: DailySpending or MonthlySpending
+    user_id: int
+    key_field: str (date or month)
+    buckets: dict (key → [total, count])
+    """
+
+    db = router.db_for_write(model)
+    connection = connections[db]
+    queryset = model.objects.using(db).filter(user_id=user_id)
+    if connection.in_atomic_block:
+        queryset = queryset.select_for_update()
+    keys, existing = list(buckets), set()
+    for start in range(0, len(keys), 500):
+        existing.update(queryset.filter(**{'%s__in' % key_field: keys[start:start + 500]})
+                                .values_list(key_field, flat=True))
+
+    qn = connection.ops.quote_name
+    adapt = connection.ops.adapt_datefield_value
+    sql = 'UPDATE %(table)s SET %(total)s = %(total)s + %%s, %(count)s = %(count)s + %%s ' \
+          'WHERE %(user)s = %%s AND %(key)s = %%s' % {'table': qn(model._meta.db_table), 'total': qn('total'),
+                                                     'count': qn('count'), 'user': qn('user_id'),
+                                                     'key': qn(model._meta.get_field(key_field).column)}
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [(total, count, user_id, adapt(key))
+                                 for key, (total, count) in buckets.items() if key in existing])
+
+    missing = [(key, total, count) for key, (total, count) in buckets.items() if key not in existing]
+    try:
+        with transaction.atomic(using=db):
+            model.objects.using(db).bulk_create(model(user_id=user_id, total=total, count=count, **{key_field: key})
+                                                for key, total, count in missing)
+    except IntegrityError:
+        for key, total, count in missing:
+            upsert(model, user_id, {key_field: key}, total, count)
+
+
+def apply(user_id, deltas):
+    """
+    집계 테이블 갱신 함수.
+
+    (date, amount, count, tag_id) 증감분을 일별･월별로 합산하여 집계 테이블에 반영한다.
+    태그가 있는 증감분은 태그별 월별 집계에도 반영한다.
+    호출하는 쪽의 트랜잭션 안에서 실행되어야 원본 테이블과 일관성이 유지된다.
+
+    parameters
+    ----------
+    user_id: int
+    deltas: iterable of (date, amount, count, tag_id) (tag_id 는 None 일 수 있다)
+    """
+
+    days, months, tags = defaultdict(lambda: [0, 0]), defaultdict(lambda: [0, 0]), defaultdict(lambda: [0, 0])
+    for date, amount, count, tag_id in deltas:
+        date = to_date(date)
+        buckets = (days[date], months[date.replace(day=1)])
+        if tag_id is not None:
+            buckets += (tags[(tag_id, date.replace(day=1))],)
+        for bucket in buckets:
+            bucket[0] += amount
+            bucket[1] += count
+
+    for model, key_field, buckets in ((DailySpending, 'date', days), (MonthlySpending, 'month', months)):
+        changed = {key: bucket for key, bucket in buckets.items() if bucket[0] or bucket[1]}
+        if len(changed) > BATCH_THRESHOLD:
+            upsert_many(model, user_id, key_field, changed)
+        else:
+            for key, (total, count) in changed.items():
+                upsert(model, user_id, {key_field: key}, total, count)
+        model.objects.filter(user_id=user_id, count__lte=0, **{'%s__in' % key_field: list(buckets)}).delete()
+
+    # 태그 변경은 한 요청에 태그･월 조합이 적으므로 행마다 반영한다.
+    for (tag_id, month), (total, count) in tags.items():
+        if total or count:
+            upsert(TagMonthlySpending, user_id, {'tag_id': tag_id, 'month': month}, total, count)
+    if tags:
+        TagMonthlySpending.objects.filter(user_id=user_id, count__lte=0, tag_id__in={key[0] for key in tags},
+                                          month__in={key[1] for key in tags}).delete()
+
+
+def rebuild(user_id=None):
+    """
+    집계 테이블 재구성 함수.
+
+    원본 테이블(expenses)에서 일별･월별･태그별 월별 합계를 다시 계산하여 집계 테이블을 덮어쓴다.
+    증감분 반영 누락 등으로 생긴 차이(drift)를 바로잡는다.
+
+    returns
+    -------
+    (days, months): (int, int)
+    """
+
+    expenses = Expense.objects.order_by()
+    days, months = DailySpending.objects.all(), MonthlySpending.objects.all()
+    tag_months = TagMonthlySpending.objects.all()
+    if user_id is not None:
+        expenses = expenses.filter(user_id=user_id)
+        days, months = days.filter(user_id=user_id), months.filter(user_id=user_id)
+        tag_months = tag_months.filter(user_id=user_id)
+
+    with transaction.atomic(using=router.db_for_write(DailySpending)):
+        days.delete()
+        months.delete()
+        tag_months.delete()
+        daily = expenses.values('user_id', 'date').annotate(total=Sum('amount'), count=Count('id'))
+        DailySpending.objects.bulk_create((DailySpending(**row) for row in daily.iterator()), batch_size=1000)
+        monthly = expenses.annotate(month=TruncMonth('date')).values('user_id', 'month') \
+                          .annotate(total=Sum('amount'), count=Count('id'))
+        MonthlySpending.objects.bulk_create((MonthlySpending(**row) for row in monthly.iterator()), batch_size=1000)
+        tagged = expenses.filter(tag__isnull=False).annotate(month=TruncMonth('date')) \
+                         .values('user_id', 'tag_id', 'month').annotate(total=Sum('amount'), count=Count('id'))
+        TagMonthlySpending.objects.bulk_create((TagMonthlySpending(**row) for row in tagged.iterator()),
+                                               batch_size=1000)
+    return days.count(), months.count()
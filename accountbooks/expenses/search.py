@@ -0,0 +1,240 @@
+import re
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, connections, router
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+from django.db.models.expressions import RawSQL
+
+from .models import Expense, ExpenseSearchToken
+
+# 검색 백엔드 설정값
+# auto: MySQL 이면 FULLTEXT, 그 외에는 n-gram 역색인 테이블
+# fulltext: MySQL FULLTEXT(ngram parser)
+# ngram: n-gram 역색인 테이블 (SQLite 등 로컬 테스트용)
+SEARCH_BACKEND = getattr(settings, 'EXPENSE_SEARCH_BACKEND', 'auto')
+
+# 제목에 포함된 gram 의 가중치 (메모는 1)
+TITLE_WEIGHT = 2
+
+WORD_PATTERN = re.compile(r'\w+')
+FULLTEXT_MATCH = 'MATCH (`expenses`.`title`, `expenses`.`description`) AGAINST (%s IN BOOLEAN MODE)'
+
+
+def use_fulltext():
+    """MySQL FULLTEXT 검색 사용 여부를 반환한다."""
+
+    if SEARCH_BACKEND == 'ngram':
+        return False
+    return connection.vendor == 'mysql'
+
+
+def tokenize(text):
+    """
+    n-gram 분해 함수.
+
+    텍스트를 소문자 단어로 나눈 뒤 단어별 bi-gram 으로 분해한다.
+    한 글자 단어는 그대로 gram 이 된다. (MySQL ngram_token_size=2 와 동일한 규칙)
+
+    parameters
+    ----------
+    text: str
+
+    returns
+    -------
+    grams: list of str
+    """
+
+    grams = []
+    for word in WORD_PATTERN.findall((text or '').lower()):
+        if len(word) == 1:
+            grams.append(word)
+        else:
+            grams.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return grams
+
+
+def weigh_grams(title, description):
+    """제목･메모의 gram 별 가중치(Counter)를 반환한다."""
+
+    weights = Counter()
+    for gram in tokenize(title):
+        weights[gram] += TITLE_WEIGHT
+    for gram in tokenize(description):
+        weights[gram] += 1
+    return weights
+
+
+def build_tokens(expense):
+    """지출내역 하나에 대한 역색인 객체 리스트를 반환한다."""
+
+    return [ExpenseSearchToken(user_id=expense.user_id, expense_id=expense.id, gram=gram, weight=min(weight, 32767))
+            for gram, weight in weigh_grams(expense.title, expense.description).items()]
+
+
+def index_expenses(expenses):
+    """
+    역색인 갱신 함수.
+
+    생성･수정･복원된 지출내역의 기존 gram 을 지우고 다시 저장한다.
+    FULLTEXT 백엔드는 DB가 색인을 관리하므로 아무 동작도 하지 않는다.
+
+    parameters
+    ----------
+    expenses: iterable of Expense
+    """
+
+    if use_fulltext():
+        return
+    expenses = list(expenses)
+    ExpenseSearchToken.objects.filter(expense_id__in=[expense.id for expense in expenses]).delete()
+    ExpenseSearchToken.objects.bulk_create(
+        [token for expense in expenses for token in build_tokens(expense)], batch_size=1000)
+
+
+def index_rows(user_id, rows, chunk_size=1000):
+    """
+    역색인 저장 함수. (대량 생성)
+
+    새로 생성된 지출내역 행의 gram 을 모델 객체를 만들지 않고 바로 INSERT 한다.
+    기존 gram 을 지우지 않으므로 색인이 없는 지출내역에만 사용한다. (가져오기 등)
+
+    parameters
+    ----------
+    user_id: int
+    rows: iterable of (id, title, description)
+    chunk_size: int
+    """
+
+    if use_fulltext():
+        return
+    db = connections[router.db_for_write(ExpenseSearchToken)]
+    qn = db.ops.quote_name
+    sql = 'INSERT INTO %s (%s, %s, %s, %s) VALUES (%%s, %%s, %%s, %%s)' % (
+        qn(ExpenseSearchToken._meta.db_table), qn('user_id'), qn('expense_id'), qn('gram'), qn('weight'))
+    params = [(user_id, expense_id, gram, min(weight, 32767)) for expense_id, title, description in rows
+              for gram, weight in weigh_grams(title, description).items()]
+    with db.cursor() as cursor:
+        for start in range(0, len(params), chunk_size):
+            cursor.executemany(sql, params[start:start + chunk_size])
+
+
+def index_missing(user_id=None, chunk_size=1000):
+    """
+    역색인 보충 함수.
+
+    역색인이 없는 지출내역(bulk_create 로 생성되어 id를 알 수 없는 경우 등)을 찾아 색인한다.
+
+    parameters
+    ----------
+    user_id: int (None 이면 전체)
+    chunk_size: int
+
+    returns
+    -------
+    count: int
+    """
+
+    if use_fulltext():
+        return 0
+    queryset = Expense.objects.filter(~Exists(ExpenseSearchToken.objects.filter(expense_id=OuterRef('id'))))
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    queryset = queryset.only('id', 'user_id', 'title', 'description').order_by('id')
+
+    count, last_id = 0, 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return count
+        index_expenses(chunk)
+        count += len(chunk)
+        last_id = chunk[-1].id
+
+
+def remove_expenses(expense_ids):
+    """삭제된 지출내역의 역색인을 삭제한다."""
+
+    if use_fulltext():
+        return
+    ExpenseSearchToken.objects.filter(expense_id__in=list(expense_ids)).delete()
+
+
+def fulltext_query(keyword):
+    """키워드를 FULLTEXT boolean mode 검색어(단어별 필수 phrase)로 변환한다."""
+
+    words = WORD_PATTERN.findall(keyword.lower())
+    return ' '.join('+"%s"' % word for word in words)
+
+
+def filter_keyword(queryset, user_id, keyword):
+    """
+    키워드 검색 필터 함수.
+
+    키워드의 모든 gram 을 포함하는 지출내역만 남긴다.
+    gram 을 만들 수 없는 한 글자 키워드는 기존 방식(LIKE)으로 검색한다.
+
+    parameters
+    ----------
+    queryset: QuerySet (Expense)
+    user_id: int
+    keyword: str
+
+    returns
+    -------
+    queryset: QuerySet
+    """
+
+    grams = set(tokenize(keyword))
+    if len(keyword.strip()) < 2 or not grams:
+        return queryset.filter(Q(title__contains=keyword) | Q(description__contains=keyword))
+
+    if use_fulltext():
+        return queryset.extra(where=[FULLTEXT_MATCH], params=[fulltext_query(keyword)])
+
+    matches = ExpenseSearchToken.objects.filter(user_id=user_id, gram__in=grams).values('expense_id') \
+                                        .annotate(hits=Count('gram')).filter(hits=len(grams)).values('expense_id')
+    return queryset.filter(id__in=matches)
+
+
+def search(user_id, keyword, limit):
+    """
+    순위(rank) 검색 함수.
+
+    키워드와 일치하는 지출내역을 관련도(score) 내림차순으로 반환한다.
+    n-gram 백엔드의 score 는 일치한 gram 가중치의 합이다. (제목 일치가 메모 일치보다 높다)
+
+    parameters
+    ----------
+    user_id: int
+    keyword: str
+    limit: int
+
+    returns
+    -------
+    expenses: list of dict
+        id, date, title, amount, score
+    """
+
+    queryset = Expense.objects.filter(user_id=user_id)
+    fields = ('id', 'date', 'title', 'amount')
+
+    grams = set(tokenize(keyword))
+    if len(keyword.strip()) < 2 or not grams:
+        rows = filter_keyword(queryset, user_id, keyword).order_by('-date', '-id').values(*fields)[:limit]
+        return [dict(row, score=1) for row in rows]
+
+    if use_fulltext():
+        score = RawSQL(FULLTEXT_MATCH, [fulltext_query(keyword)])
+        rows = filter_keyword(queryset, user_id, keyword).annotate(score=score) \
+                                                         .order_by('-score', '-date', '-id') \
+                                                         .values(*fields, 'score')[:limit]
+        return list(rows)
+
+    scores = list(ExpenseSearchToken.objects.filter(user_id=user_id, gram__in=grams).values('expense_id')
+                                            .annotate(hits=Count('gram'), score=Sum('weight'))
+                                            .filter(hits=len(grams)).order_by('-score', '-expense_id')
+                                            .values_list('expense_id', 'score')[:limit])
+    expenses = {row['id']: row for row in queryset.filter(id__in=[pk for pk, _ in scores]).values(*fields)}
+    return [dict(expenses[pk], score=score) for pk, score in scores if pk in expenses]
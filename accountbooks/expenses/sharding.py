@@ -0,0 +1,263 @@
+import contextlib
+import contextvars
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from utils.cache import TTLCache
+from utils.exceptions import ServiceUnavailableException
+
+from .models import Tag, Expense, DeletedExpense, ExpenseSearchToken, DailySpending, MonthlySpending, \
+    TagMonthlySpending, LedgerVersion, ShardMap
+
+# 한 번에 복사･삭제하는 행 수
+CHUNK_SIZE = getattr(settings, 'EXPENSE_BULK_CHUNK_SIZE', 500)
+
+# 유저 id → shard alias 캐시
+# shard 이동 시 이동한 프로세스의 항목만 무효화되므로 TTL 이 다른 프로세스의 최대 지연 시간이 된다.
+# (지연된 프로세스의 쓰기는 `check_fence()`가 거부한다)
+shard_cache = TTLCache(max_size=100000, ttl=getattr(settings, 'SHARD_MAP_CACHE_TTL', 10))
+
+# `use_shard()`로 지정한 shard (관리 커맨드 등 요청 밖에서 사용)
+_override = contextvars.ContextVar('shard_override', default=None)
+
+
+class ShardMoveError(Exception):
+    pass
+
+
+def get_shards():
+    return getattr(settings, 'DATABASE_SHARDS', [DEFAULT_DB_ALIAS])
+
+
+def is_sharded(model):
+    return model._meta.label in getattr(settings, 'SHARDED_MODELS', [])
+
+
+def choose_shard(user_id):
+    """새 유저의 shard 를 정한다. (유저 id 해시)"""
+
+    shards = get_shards()
+    return shards[user_id % len(shards)]
+
+
+def lookup(user_id):
+    """shard map 에서 유저의 shard 를 조회한다. (캐시 미사용, 없으면 default)"""
+
+    return ShardMap.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id) \
+                           .values_list('alias', flat=True).first() or DEFAULT_DB_ALIAS
+
+
+def get_shard(user_id):
+    """
+    유저 shard 조회 함수.
+
+    shard 가 하나이면 조회 없이 default 를 반환한다.
+
+    parameters
+    ----------
+    user_id: int
+
+    returns
+    -------
+    alias: str
+    """
+
+    if len(get_shards()) == 1:
+        return DEFAULT_DB_ALIAS
+    alias = shard_cache.get(user_id)
+    if alias is None:
+        alias = lookup(user_id)
+        shard_cache.set(user_id, alias, tag=user_id)
+    return alias
+
+
+def assign(user_id, alias=None):
+    """
+    새 유저 shard 배정 함수.
+
+    alias 가 없으면 `choose_shard()`로 정한다. default 배정은 기록하지 않는다.
+
+    returns
+    -------
+    alias: str
+    """
+
+    alias = alias or choose_shard(user_id)
+    if alias != DEFAULT_DB_ALIAS:
+        ShardMap.objects.using(DEFAULT_DB_ALIAS).update_or_create(user_id=user_id, defaults={'alias': alias})
+        shard_cache.invalidate_tag(user_id)
+    return alias
+
+
+def get_override():
+    return _override.get()
+
+
+@contextlib.contextmanager
+def use_shard(alias):
+    """블록 안의 SHARDED_MODELS 쿼리를 alias shard 로 보낸다."""
+
+    token = _override.set(alias)
+    try:
+        yield alias
+    finally:
+        _override.reset(token)
+
+
+def db_for_user(user_id):
+    """유저 가계부 데이터의 DB alias 를 반환한다. (`use_shard()` 블록 안에서는 지정한 shard)"""
+
+    return _override.get() or get_shard(user_id)
+
+
+def atomic(user_id):
+    """유저 shard 의 트랜잭션(`transaction.atomic`)을 반환한다."""
+
+    return transaction.atomic(using=db_for_user(user_id))
+
+
+def check_fence(user_id, alias):
+    """
+    shard 쓰기 확인 함수.
+
+    쓰기 트랜잭션이 가계부 버전 행을 잠근 뒤 호출하여, 그 사이 유저가 다른 shard 로 이동했으면
+    캐시를 무효화하고 `ServiceUnavailableException`(503)을 발생시켜 트랜잭션을 되돌린다.
+    default 의 트랜잭션 안에서는 최신 값을 읽도록 잠금 읽기(SELECT … FOR UPDATE)를 사용한다.
+    """
+
+    if len(get_shards()) == 1:
+        return
+    queryset = ShardMap.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id)
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        queryset = queryset.select_for_update()
+    current = queryset.values_list('alias', flat=True).first() or DEFAULT_DB_ALIAS
+    if current != alias:
+        shard_cache.invalidate_tag(user_id)
+        raise ServiceUnavailableException(message="ledger is being moved. try again later.", retry_after=1)
+
+
+def chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def sync_rows(model, user_id, source, target, chunk_size=CHUNK_SIZE):
+    """
+    shard 간 행 동기화 함수.
+
+    source 의 유저 행과 target 의 유저 행을 비교하여 target 에만 있거나 값이 다른 행은 지우고,
+    target 에 없거나 값이 다른 행은 id와 생성･수정일시를 그대로 INSERT 한다.
+    다른 유저의 행과 id가 겹치면 `ShardMoveError`를 발생시킨다.
+
+    returns
+    -------
+    (copied, removed): (list of int, list of int) (id)
+    """
+
+    fields = model._meta.concrete_fields
+    names = [field.attname for field in fields]
+    pk_index = names.index(model._meta.pk.attname)
+
+    def snapshot(alias):
+        rows = model.objects.using(alias).filter(user_id=user_id).values_list(*names)
+        return {row[pk_index]: row for row in rows.iterator(chunk_size=chunk_size)}
+
+    rows, existing = snapshot(source), snapshot(target)
+    removed = [pk for pk, row in existing.items() if rows.get(pk) != row]
+    copied = [pk for pk, row in rows.items() if existing.get(pk) != row]
+
+    for ids in chunks(copied, chunk_size):
+        if model.objects.using(target).filter(pk__in=ids).exclude(user_id=user_id).exists():
+            raise ShardMoveError("%s ids of user '%d' already exist in '%s'." % (model.__name__, user_id, target))
+    for ids in chunks(removed, chunk_size):
+        model.objects.using(target).filter(user_id=user_id, pk__in=ids).delete()
+
+    connection = connections[target]
+    qn = connection.ops.quote_name
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (qn(model._meta.db_table),
+                                              ', '.join(qn(field.column) for field in fields),
+                                              ', '.join(['%s'] * len(fields)))
+    for ids in chunks(copied, chunk_size):
+        params = [[field.get_db_prep_value(value, connection) for field, value in zip(fields, rows[pk])]
+                  for pk in ids]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+    return copied, removed
+
+
+def move_user(user_id, target, chunk_size=CHUNK_SIZE):
+    """
+    유저 가계부 shard 이동 함수. (online)
+
+    1. 복사: 쓰기를 막지 않고 태그･지출내역･삭제내역을 target 으로 복사하고 검색 색인을 만든다.
+    2. 전환: source 의 가계부 버전 행을 잠가(SELECT … FOR UPDATE) 쓰기를 멈추고, 복사 이후 바뀐 행을 다시 동기화한 뒤
+       집계･가계부 버전을 target 에 만들고 shard map 을 바꾼다. 잠금을 기다리던 쓰기는 `check_fence()`에서 거부된다.
+    복사 중 id가 겹치면 target 에 복사한 행을 지우고 `ShardMoveError`를 발생시킨다.
+    source 의 행은 지우지 않는다. 다른 프로세스의 shard 캐시가 만료된 뒤 `purge()`로 지운다.
+
+    parameters
+    ----------
+    user_id: int
+    target: str (DB alias)
+    chunk_size: int
+
+    returns
+    -------
+    source: str (이동 전 DB alias)
+    """
+
+    from . import rollups, search
+
+    if target not in get_shards():
+        raise ShardMoveError("'%s' is not a shard." % target)
+    source = lookup(user_id)
+    if source == target:
+        return source
+
+    try:
+        for model in (Tag, Expense, DeletedExpense):
+            sync_rows(model, user_id, source, target, chunk_size)
+        with use_shard(target), transaction.atomic(using=target):
+            search.index_missing(user_id=user_id, chunk_size=chunk_size)
+    except ShardMoveError:
+        purge(user_id, target, chunk_size)
+        raise
+
+    with transaction.atomic(using=source):
+        LedgerVersion.objects.using(source).get_or_create(user_id=user_id)
+        version = LedgerVersion.objects.using(source).select_for_update().get(user_id=user_id).version
+        with use_shard(target), transaction.atomic(using=target):
+            for model in (Tag, Expense, DeletedExpense):
+                sync_rows(model, user_id, source, target, chunk_size)
+            search.index_missing(user_id=user_id, chunk_size=chunk_size)
+            rollups.rebuild(user_id=user_id)
+            LedgerVersion.objects.using(target).update_or_create(user_id=user_id,
+                                                                 defaults={'version': version + 1})
+        ShardMap.objects.using(DEFAULT_DB_ALIAS).update_or_create(user_id=user_id, defaults={'alias': target})
+    shard_cache.invalidate_tag(user_id)
+    return source
+
+
+def purge(user_id, alias, chunk_size=CHUNK_SIZE):
+    """
+    shard 데이터 삭제 함수.
+
+    이동 전 shard 또는 삭제된 유저의 shard 에서 유저의 SHARDED_MODELS 행을 chunk 단위로 지운다.
+
+    returns
+    -------
+    count: int
+    """
+
+    count = 0
+    for model in (ExpenseSearchToken, Expense, DeletedExpense, TagMonthlySpending, Tag, DailySpending, MonthlySpending,
+                  LedgerVersion):
+        queryset = model.objects.using(alias).filter(user_id=user_id)
+        while True:
+            ids = list(queryset.values_list('pk', flat=True)[:chunk_size])
+            if not ids:
+                break
+            count += queryset.filter(pk__in=ids).delete()[1].get(model._meta.label, 0)
+    return count
@@ -0,0 +1,29 @@
+import functools
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from users.models import User
+
+from . import sharding
+
+
+@receiver(post_save, sender=User)
+def assign_shard(sender, instance, created, **kwargs):
+    """새 유저의 가계부 shard 를 배정한다. (shard 가 하나이면 default 이므로 기록하지 않는다)"""
+
+    if created and len(sharding.get_shards()) > 1:
+        sharding.assign(instance.id)
+
+
+@receiver(pre_delete, sender=User)
+def purge_shard(sender, instance, **kwargs):
+    """
+    유저가 삭제되면 default 가 아닌 shard 의 가계부 데이터를 지운다.
+    (default 의 데이터는 외래키 CASCADE 로 함께 삭제된다)
+    """
+
+    alias = sharding.get_shard(instance.id)
+    if alias != DEFAULT_DB_ALIAS:
+        transaction.on_commit(functools.partial(sharding.purge, instance.id, alias))
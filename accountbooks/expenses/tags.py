@@ -0,0 +1,134 @@
+import datetime
+
+from django.db import IntegrityError
+from django.utils import timezone
+
+from utils.exceptions import DataTooLongException, DataTypeException, DuplicationException, InvalidValueException
+
+from . import ledger, sharding
+from .models import Tag, Expense, DeletedExpense, TagMonthlySpending
+
+# 유저별 최대 태그 수
+MAX_TAGS = 100
+
+
+def clean_name(name):
+    if type(name) != str:
+        raise DataTypeException(message="name datatype must be %s." % str)
+    name = name.strip()
+    if not name:
+        raise InvalidValueException(message="'name' is required.")
+    if len(name) > Tag._meta.get_field('name').max_length:
+        raise DataTooLongException(message="'name' too long. (max: %d)" % Tag._meta.get_field('name').max_length)
+    return name
+
+
+def check_tags(user_id, tag_ids):
+    """
+    태그 소유 확인 함수.
+
+    지출내역에 지정된 태그가 모두 유저의 태그인지 한 번의 조회로 확인한다.
+
+    parameters
+    ----------
+    user_id: int
+    tag_ids: iterable of int (None 은 태그 없음)
+
+    returns
+    -------
+    missing: set of int (유저의 태그가 아닌 id)
+    """
+
+    tag_ids = {tag_id for tag_id in tag_ids if tag_id is not None}
+    if not tag_ids:
+        return set()
+    return tag_ids - set(Tag.objects.filter(user_id=user_id, id__in=tag_ids).values_list('id', flat=True))
+
+
+def check_tag(user_id, tag_id):
+    """단건 태그 소유 확인 함수. 유저의 태그가 아니면 `InvalidValueException`."""
+
+    if check_tags(user_id, [tag_id]):
+        raise InvalidValueException(message="tag 'id: %d' does not exist." % tag_id)
+
+
+def create_tag(user_id, name):
+    """
+    태그 생성 함수.
+
+    같은 이름의 태그가 있으면 `DuplicationException`, 태그 수가 `MAX_TAGS`이면 `InvalidValueException`.
+
+    returns
+    -------
+    tag: Tag
+    """
+
+    name = clean_name(name)
+    if Tag.objects.filter(user_id=user_id).count() >= MAX_TAGS:
+        raise InvalidValueException(message="too many tags. (max: %d)" % MAX_TAGS)
+    try:
+        with sharding.atomic(user_id):
+            return Tag.objects.create(user_id=user_id, name=name)
+    except IntegrityError:
+        raise DuplicationException(message="'%s' is already." % name)
+
+
+def rename_tag(tag, name):
+    name = clean_name(name)
+    tag.name = name
+    try:
+        with sharding.atomic(tag.user_id):
+            tag.save(update_fields=['name'])
+    except IntegrityError:
+        raise DuplicationException(message="'%s' is already." % name)
+
+
+def delete_tag(tag):
+    """
+    태그 삭제 함수.
+
+    지출내역･삭제내역의 태그를 비우고((user_id, tag_id) 인덱스 범위 UPDATE) 태그별 집계 행과 태그를 지운다.
+    상세 뷰의 ETag 가 바뀌도록 같은 UPDATE 에서 수정일시(updated_at)도 갱신한다.
+    지출 합계(일별･월별)는 바뀌지 않으며 리스트 필터 결과가 바뀌므로 가계부 버전을 올린다.
+    """
+
+    user_id = tag.user_id
+    now = timezone.now()
+    with sharding.atomic(user_id):
+        for model in (Expense, DeletedExpense):
+            model.objects.filter(user_id=user_id, tag_id=tag.id).update(tag_id=None, updated_at=now)
+        TagMonthlySpending.objects.filter(user_id=user_id, tag_id=tag.id).delete()
+        Tag.objects.filter(id=tag.id).delete()
+        ledger.bump_version(user_id)
+
+
+def monthly_totals(user_id, month):
+    """
+    태그별 월 지출 합계 조회 함수.
+
+    태그별 월별 집계 테이블의 (user_id, month) 인덱스 범위 조회 한 번으로 태그 수만큼의 행을 읽는다.
+
+    parameters
+    ----------
+    user_id: int
+    month: date (해당 월의 1일)
+
+    returns
+    -------
+    totals: dict (tag_id → (total, count))
+    """
+
+    rows = TagMonthlySpending.objects.filter(user_id=user_id, month=month, count__gt=0) \
+                                     .values_list('tag_id', 'total', 'count')
+    return {tag_id: (total, count) for tag_id, total, count in rows}
+
+
+def parse_month(value):
+    """yyyy-mm 문자열을 해당 월의 1일(date)로 바꾼다. 없으면 이번 달."""
+
+    if not value:
+        return datetime.date.today().replace(day=1)
+    try:
+        return datetime.date.fromisoformat('%s-01' % value)
+    except ValueError:
+        raise InvalidValueException(message="month format must be 'yyyy-mm'.")
@@ -1,13 +1,38 @@
+import csv
+import datetime
+import gzip
+import io
 import json
+import os
+import re
+import tempfile
+import threading
+
+from unittest import mock
 
 import bcrypt
 import jwt
 
-from django.test import TestCase, Client
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, SimpleTestCase, Client, AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 import my_settings
 from users.models import User
-from .models import Expense, DeletedExpense
+from utils import admission, responses, routers
+from utils.db.pool import ConnectionPool, PoolTimeout
+from utils.db.sqlite3.base import DatabaseWrapper as PooledSQLiteWrapper
+from utils.exceptions import DataTooLongException, DataTypeException
+from utils.timing import route_metrics
+from utils.validators import EXPENSE_SCHEMA
+from . import aggregates, imports, jobs, rollups, search, sharding, views
+from .models import Tag, Expense, DeletedExpense, ExpenseSearchToken, DailySpending, MonthlySpending, \
+    TagMonthlySpending, LedgerVersion, ShardMap, Job
 
 
 class ExpenseTest(TestCase):
@@ -18,6 +43,7 @@ class ExpenseTest(TestCase):
     def setUp(self):
         """Mock 데이터 세팅."""
 
+        admission.reset()
         User.objects.create(id=1, email='test1@example.com',
                             password=bcrypt.hashpw('abc135!!'.encode('utf-8'), bcrypt.gensalt()).decode())
 
@@ -62,11 +88,71 @@ class ExpenseTest(TestCase):
                     "title": "아파트관리비",
                     "amount": 2000000
                 }
-            ]
+            ],
+            "next": None
         }
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), expenses)
 
+    def test_get_expenses_pagination(self):
+        """
+        get_expense_list: success case 2.
+
+        커서 페이지네이션.
+        """
+
+        header = {"HTTP_Authorization": self.token}
+        response = self.client.get('/expenses/', {'limit': 1}, **header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([expense['id'] for expense in response.json()['expenses']], [1])
+
+        cursor = response.json()['next']
+        response = self.client.get('/expenses/', {'limit': 1, 'cursor': cursor}, **header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([expense['id'] for expense in response.json()['expenses']], [2])
+        self.assertIsNone(response.json()['next'])
+
+    def test_get_expenses_invalid_cursor(self):
+        """
+        get_expense_list: failure case 2.
+
+        잘못된 커서･페이지 크기.
+        """
+
+        header = {"HTTP_Authorization": self.token}
+        response = self.client.get('/expenses/', {'cursor': 'invalid'}, **header)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "invalid cursor."})
+
+        response = self.client.get('/expenses/', {'limit': 0}, **header)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "'limit' must be between 1 and 1000."})
+
+    def test_get_expenses_stream(self):
+        """
+        get_expense_list: success case 3.
+
+        스트리밍 응답은 페이지 응답과 같은 JSON 을 반환한다.
+        """
+
+        Expense.objects.bulk_create(
+            Expense(title='점심' * 100, date='2022-02-01', user_id=1, amount=i) for i in range(1, 501))
+
+        header = {"HTTP_Authorization": self.token}
+        response = self.client.get('/expenses/', {'stream': 'true'}, **header)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+
+        expenses = json.loads(b''.join(chunks))
+        self.assertEqual(len(expenses['expenses']), 502)
+        self.assertEqual(expenses['expenses'][0], {"id": 1, "date": "2022-01-01", "title": "아파트관리비", "amount": 1000000})
+        self.assertIsNone(expenses['next'])
+
+        response = self.client.get('/expenses/deleted/', {'stream': '1'}, **header)
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), {"deleted_expenses": [], "next": None})
+
     def test_get_expenses_unauthorized(self):
         """
         get_expense_list: failure case 1.
@@ -168,6 +254,77 @@ class ExpenseTest(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json(), {"error": "'amount' is required."})
 
+    def test_create_expense_invalid_value(self):
+        """
+        create_expense: failure case 5.
+
+        날짜 형식･음수 금액 에러.
+        """
+
+        header = {"HTTP_Authorization": self.token, "content_type": "application/json"}
+        data = {'title': 'test', 'date': '2022-13-01', 'amount': 1000, 'description': ''}
+        response = self.client.post('/expenses/new/', data, **header)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "date format must be 'yyyy-mm-dd'."})
+
+        data = {'title': 'test', 'date': '2022-01-01', 'amount': -1000, 'description': ''}
+        response = self.client.post('/expenses/new/', data, **header)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "amount must be positive."})
+
+    def test_bulk_create_success(self):
+        """
+        bulk_create_expense: success case.
+        """
+
+        header = {"HTTP_Authorization": self.token, "content_type": "application/json"}
+        data = [{'title': '점심', 'date': '2022-01-%02d' % i, 'amount': 9000, 'description': ''} for i in range(1, 6)]
+        response = self.client.post('/expenses/bulk/', data, **header)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 5)
+        self.assertEqual(Expense.objects.filter(title='점심').count(), 5)
+
+    def test_bulk_create_partial_failure(self):
+        """
+        bulk_create_expense: failure case 1.
+
+        항목별 에러는 index 와 함께 반환되며 유효한 항목만 저장된다.
+        """
+
+        header = {"HTTP_Authorization": self.token, "content_type": "application/json"}
+        data = [
+            {'title': '점심', 'date': '2022-01-01', 'amount': 9000, 'description': ''},
+            {'title': '점심', 'date': '2022-01-01', 'amount': '9000', 'description': ''},
+            {'title': '점심', 'date': '2022-13-01', 'amount': 9000, 'description': ''},
+            {'title': '점심', 'date': '2022-01-01', 'description': ''},
+        ]
+        response = self.client.post('/expenses/bulk/', data, **header)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {
+            "created": 1,
+            "failed": 3,
+            "results": [
+                {"index": 0, "status": 201},
+                {"index": 1, "status": 400, "error": "amount datatype must be <class 'int'>."},
+                {"index": 2, "status": 400, "error": "date format must be 'yyyy-mm-dd'."},
+                {"index": 3, "status": 400, "error": "'amount' is required."},
+            ]
+        })
+        self.assertEqual(Expense.objects.filter(title='점심').count(), 1)
+
+    def test_bulk_create_too_many(self):
+        """
+        bulk_create_expense: failure case 2.
+
+        최대 항목 수 초과.
+        """
+
+        header = {"HTTP_Authorization": self.token, "content_type": "application/json"}
+        data = [{'title': '점심', 'date': '2022-01-01', 'amount': 9000, 'description': ''}] * 1001
+        response = self.client.post('/expenses/bulk/', data, **header)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json(), {"error": "too many expenses. (max: 1000)"})
+
     def test_get_expense_success(self):
         """
         get_expense: success case.
@@ -181,6 +338,7 @@ class ExpenseTest(TestCase):
                 "title": "아파트관리비",
                 "amount": 1000000,
                 "description": "활성화 테이블",
+                "tag_id": None,
                 "created_at": "2022-01-18T07:51:14.414Z",
                 "updated_at": "2022-01-18T09:36:54.147Z"
             }
@@ -190,3 +348,1436 @@ class ExpenseTest(TestCase):
         response = self.client.get('/expenses/1/', **header)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), expense)
+
+
+class ExpenseSchemaTest(SimpleTestCase):
+    """
+    지출내역 입력값 스키마(`EXPENSE_SCHEMA`) 테스트.
+    """
+
+    def test_validate(self):
+        data = {'title': '점심', 'date': '2022-01-01', 'amount': 9000, 'description': ''}
+        self.assertEqual(EXPENSE_SCHEMA.validate(data), dict(data, date=datetime.date(2022, 1, 1)))
+        self.assertEqual(EXPENSE_SCHEMA.validate({'amount': 1}, partial=True), {'amount': 1})
+        with self.assertRaises(DataTypeException):
+            EXPENSE_SCHEMA.validate(dict(data, amount=True))
+        with self.assertRaises(KeyError):
+            EXPENSE_SCHEMA.validate(dict(data, unknown=1))
+
+    def test_validate_checks_every_field(self):
+        data = {'title': '점심', 'date': '2022-01-01', 'amount': 9000, 'description': 'x' * 256}
+        with self.assertRaises(DataTooLongException) as cm:
+            EXPENSE_SCHEMA.validate(data)
+        self.assertEqual(cm.exception.message, "'description' too long. (max: 255)")
+
+    def test_validate_many(self):
+        items = [
+            {'title': '점심', 'date': '2022-01-01', 'amount': 9000, 'description': ''},
+            [],
+            {'title': '점심', 'date': '2022-01-01', 'amount': 9000},
+            {'title': '점심', 'date': '2022-01-02', 'amount': 9000, 'description': '', 'memo': ''},
+            {'title': '저녁', 'date': '2022-01-03', 'amount': 12000, 'description': ''},
+        ]
+        valid, errors = EXPENSE_SCHEMA.validate_many(items)
+        self.assertEqual([index for index, _ in valid], [0, 4])
+        self.assertEqual([(index, e.message) for index, e in errors], [
+            (1, "expense datatype must be <class 'dict'>."),
+            (2, "'description' is required."),
+            (3, "'memo' is required."),
+        ])
+
+
+class ExpenseBulkMoveTest(TestCase):
+    """
+    지출내역 일괄삭제･복원 테스트 클래스.
+    """
+
+    def setUp(self):
+        """Mock 데이터 세팅."""
+
+        User.objects.create(id=1, email='test1@example.com', password='-')
+        User.objects.create(id=2, email='test2@example.com', password='-')
+
+        Expense.objects.bulk_create(
+            Expense(id=i, user_id=1, title='점심 식사' if i % 2 else '택시비', date='2022-01-%02d' % i,
+                    amount=i * 1000, description='메모') for i in range(1, 11))
+        Expense.objects.create(id=11, user_id=2, title='점심 식사', date='2022-01-01', amount=8000)
+        search.index_missing()
+
+        self.client = Client()
+        self.header = {
+            "HTTP_Authorization": jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY,
+                                             algorithm=my_settings.ALGORITHM),
+            "content_type": "application/json"
+        }
+
+    def test_bulk_delete_ids(self):
+        """타인의 지출내역 id는 무시된다."""
+
+        response = self.client.post('/expenses/bulk-delete/', {'ids': [1, 2, 3, 11]}, **self.header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"message": "3 expenses removed successfully.", "count": 3})
+        self.assertFalse(Expense.objects.filter(id__in=[1, 2, 3]).exists())
+        self.assertTrue(Expense.objects.filter(id=11).exists())
+
+        d_expense = DeletedExpense.objects.get(user_id=1, amount=2000)
+        self.assertEqual((d_expense.title, str(d_expense.date)), ('택시비', '2022-01-02'))
+        self.assertIsNotNone(d_expense.deleted_at)
+
+    def test_bulk_delete_filter(self):
+        data = {'start-date': '2022-01-03', 'end-date': '2022-01-06', 'keyword': '점심'}
+        response = self.client.post('/expenses/bulk-delete/', data, **self.header)
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(sorted(DeletedExpense.objects.values_list('amount', flat=True)), [3000, 5000])
+
+    def test_bulk_delete_requires_selector(self):
+        response = self.client.post('/expenses/bulk-delete/', {}, **self.header)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "'ids' or filter is required."})
+        self.assertEqual(Expense.objects.count(), 11)
+
+    def test_bulk_restore(self):
+        self.client.post('/expenses/bulk-delete/', {'date': '2022-01-01'}, **self.header)
+        self.client.post('/expenses/bulk-delete/', {'date': '2022-01-02'}, **self.header)
+        response = self.client.post('/expenses/deleted/bulk-restore/', {'keyword': '점심'}, **self.header)
+        self.assertEqual(response.json(), {"message": "1 expenses recovered successfully.", "count": 1})
+
+        self.assertEqual(list(DeletedExpense.objects.values_list('title', flat=True)), ['택시비'])
+        response = self.client.get('/expenses/', {'date': '2022-01-01', 'keyword': '점심'}, **self.header)
+        self.assertEqual([row['amount'] for row in response.json()['expenses']], [1000])
+
+    def test_bulk_writes_index_only_new_rows(self):
+        """bulk_create 가 id를 반환하지 않는 DB(MySQL)에서도 새 행만 조회하여 색인한다. (전체 보충 색인 없음)"""
+
+        data = [{'title': '저녁 식사', 'date': '2022-02-01', 'amount': 9000, 'description': ''}] * 3
+        with mock.patch.object(connection.features, 'can_return_rows_from_bulk_insert', False), \
+                mock.patch.object(search, 'index_missing', side_effect=AssertionError):
+            self.client.post('/expenses/bulk/', data, **self.header)
+            self.client.post('/expenses/bulk-delete/', {'date': '2022-01-01'}, **self.header)
+            self.client.post('/expenses/deleted/bulk-restore/', {'date': '2022-01-01'}, **self.header)
+
+        self.assertEqual(search.index_missing(), 0)
+        response = self.client.get('/expenses/', {'keyword': '저녁'}, **self.header)
+        self.assertEqual(len(response.json()['expenses']), 3)
+
+
+class ExpenseRollupTest(TestCase):
+    """
+    일별･월별 지출 집계 테스트 클래스.
+
+    각 변경 후 증감분으로 갱신된 집계가 원본으로부터 재구성한 집계와 같은지 확인한다.
+    """
+
+    def setUp(self):
+        """Mock 데이터 세팅."""
+
+        User.objects.create(id=1, email='test1@example.com', password='-')
+        self.client = Client()
+        self.header = {
+            "HTTP_Authorization": jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY,
+                                             algorithm=my_settings.ALGORITHM),
+            "content_type": "application/json"
+        }
+        data = [{'title': '점심', 'date': '2022-01-%02d' % (i % 3 + 1), 'amount': i * 1000, 'description': ''}
+                for i in range(1, 7)] + [{'title': '월세', 'date': '2022-02-01', 'amount': 500000, 'description': ''}]
+        self.client.post('/expenses/bulk/', data, **self.header)
+
+    def snapshot(self):
+        return (list(DailySpending.objects.order_by('date').values_list('date', 'total', 'count')),
+                list(MonthlySpending.objects.order_by('month').values_list('month', 'total', 'count')))
+
+    def assertRollupsConsistent(self):
+        incremental = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_summary(self):
+        response = self.client.get('/expenses/summary/', {'period': 'monthly'}, **self.header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "period": "monthly",
+            "summary": [
+                {"month": "2022-01", "total": 21000, "count": 6},
+                {"month": "2022-02", "total": 500000, "count": 1},
+            ]
+        })
+        response = self.client.get('/expenses/summary/', {'start-date': '2022-01-02', 'end-date': '2022-01-31'},
+                                   **self.header)
+        self.assertEqual(response.json()['summary'], [
+            {"date": "2022-01-02", "total": 5000, "count": 2},
+            {"date": "2022-01-03", "total": 7000, "count": 2},
+        ])
+        self.assertRollupsConsistent()
+
+    def test_edit_and_delete(self):
+        expense = Expense.objects.get(amount=1000)
+        self.client.put('/expenses/%d/' % expense.id, {'date': '2022-03-01', 'amount': 3000}, **self.header)
+        self.assertRollupsConsistent()
+
+        self.client.delete('/expenses/%d/' % expense.id, **self.header)
+        self.assertFalse(MonthlySpending.objects.filter(month='2022-03-01').exists())
+        self.assertRollupsConsistent()
+
+        d_expense = DeletedExpense.objects.get()
+        self.client.delete('/expenses/deleted/%d/' % d_expense.id, **self.header)
+        self.assertRollupsConsistent()
+
+    def test_bulk_delete_and_restore(self):
+        self.client.post('/expenses/bulk-delete/', {'start-date': '2022-01-01', 'end-date': '2022-01-02'},
+                         **self.header)
+        self.assertRollupsConsistent()
+        self.client.post('/expenses/deleted/bulk-restore/', {'date': '2022-01-02'}, **self.header)
+        self.assertRollupsConsistent()
+
+
+class ExpenseAggregateTest(TestCase):
+    """
+    지출 기간별 집계(`aggregates`) 테스트 클래스.
+    """
+
+    def setUp(self):
+        """Mock 데이터 세팅."""
+
+        User.objects.create(id=1, email='test1@example.com', password='-')
+        User.objects.create(id=2, email='test2@example.com', password='-')
+        Expense.objects.bulk_create([
+            Expense(user_id=1, title='점심', date='2022-01-03', amount=9000, description=''),
+            Expense(user_id=1, title='커피', date='2022-01-04', amount=4500, description=''),
+            Expense(user_id=1, title='점심', date='2022-01-10', amount=12000, description=''),
+            Expense(user_id=1, title='관리비', date='2022-01-31', amount=100000, description=''),
+            Expense(user_id=1, title='점심', date='2022-02-01', amount=8000, description=''),
+            Expense(user_id=2, title='점심', date='2022-01-03', amount=7000, description=''),
+        ])
+        search.index_missing()
+
+        self.header = {"HTTP_Authorization": jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY,
+                                                        algorithm=my_settings.ALGORITHM)}
+
+    def test_month(self):
+        response = Client().get('/expenses/aggregate/', {'percentiles': '50,90'}, **self.header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "period": "month",
+            "fields": ["bucket", "total", "count", "avg", "min", "max", "p50", "p90"],
+            "buckets": [
+                ["2022-01-01", 125500, 4, 31375.0, 4500, 100000, 10500.0, 73600.0],
+                ["2022-02-01", 8000, 1, 8000.0, 8000, 8000, 8000.0, 8000.0],
+            ]
+        })
+
+        with mock.patch.object(aggregates, 'numpy', None):
+            fallback = Client().get('/expenses/aggregate/', {'percentiles': '50,90'}, **self.header)
+        self.assertEqual(fallback.json(), response.json())
+
+    def test_week_range_and_keyword(self):
+        params = {'period': 'week', 'start-date': '2022-01-04', 'end-date': '2022-01-31', 'keyword': '점심'}
+        response = Client().get('/expenses/aggregate/', params, **self.header)
+        self.assertEqual(response.json()['buckets'], [["2022-01-10", 12000, 1, 12000.0, 12000, 12000]])
+
+        response = Client().get('/expenses/aggregate/', {'period': 'year'}, **self.header)
+        self.assertEqual(response.json()['buckets'], [["2022-01-01", 133500, 5, 26700.0, 4500, 100000]])
+
+    def test_percentiles_match_numpy(self):
+        """bucket 단위 벡터 계산과 파이썬 구현이 `numpy.percentile`과 같은 값을 반환한다."""
+
+        if aggregates.numpy is None:
+            self.skipTest('numpy is not installed.')
+        numpy = aggregates.numpy
+        rng = numpy.random.default_rng(42)
+        counts = [1, 2, 7, 30]
+        amounts = rng.integers(0, 100000, sum(counts))
+        percentiles = [0, 25, 50, 99.9, 100]
+
+        expected = [numpy.percentile(part, percentiles) for part in numpy.split(amounts, numpy.cumsum(counts)[:-1])]
+        numpy.testing.assert_allclose(aggregates.compute_percentiles(amounts, counts, percentiles), expected)
+        numpy.testing.assert_allclose(aggregates.compute_percentiles_python(amounts.tolist(), counts, percentiles),
+                                      expected)
+
+    def test_invalid_options(self):
+        for params, message in [
+            ({'period': 'hour'}, "'period' must be one of day, week, month, year."),
+            ({'percentiles': '50,101'}, "'percentiles' must be numbers between 0 and 100."),
+            ({'start-date': '2022-02-01', 'end-date': '2022-01-01'}, "'end-date' must greater than 'start-date'."),
+            ({'start-date': '2022.02.01'}, "date format must be 'yyyy-mm-dd'."),
+        ]:
+            response = Client().get('/expenses/aggregate/', params, **self.header)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {"error": message})
+
+
+class ExpenseTagTest(TestCase):
+    """
+    지출 태그와 태그별 월별 집계 테스트 클래스.
+    """
+
+    def setUp(self):
+        """Mock 데이터 세팅."""
+
+        User.objects.create(id=1, email='test1@example.com', password='-')
+        User.objects.create(id=2, email='test2@example.com', password='-')
+        self.client = Client()
+        self.header = {
+            "HTTP_Authorization": jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY,
+                                             algorithm=my_settings.ALGORITHM),
+            "content_type": "application/json"
+        }
+        self.food = self.client.post('/expenses/tags/', {'name': '식비'}, **self.header).json()['tag']['id']
+        self.house = self.client.post('/expenses/tags/', {'name': '주거'}, **self.header).json()['tag']['id']
+        self.other = Tag.objects.create(user_id=2, name='식비').id
+        data = [
+            {'title': '점심', 'date': '2022-01-03', 'amount': 9000, 'description': '', 'tag': self.food},
+            {'title': '저녁', 'date': '2022-01-20', 'amount': 15000, 'description': '', 'tag': self.food},
+            {'title': '관리비', 'date': '2022-01-31', 'amount': 100000, 'description': '', 'tag': self.house},
+            {'title': '점심', 'date': '2022-02-01', 'amount': 8000, 'description': '', 'tag': self.food},
+            {'title': '택시', 'date': '2022-01-05', 'amount': 7000, 'description': ''},
+        ]
+        self.client.post('/expenses/bulk/', data, **self.header)
+
+    def totals(self, month='2022-01'):
+        response = self.client.get('/expenses/tags/', {'month': month}, **self.header)
+        return {tag['name']: (tag['total'], tag['count']) for tag in response.json()['tags']}
+
+    def assertTagRollupsConsistent(self):
+        def snapshot():
+            return list(TagMonthlySpending.objects.order_by('tag_id', 'month')
+                                                  .values_list('tag_id', 'month', 'total', 'count'))
+        incremental = snapshot()
+        rollups.rebuild()
+        self.assertEqual(incremental, snapshot())
+
+    def test_totals_and_filter(self):
+        self.assertEqual(self.totals(), {'식비': (24000, 2), '주거': (100000, 1)})
+        self.assertEqual(self.totals('2022-02'), {'식비': (8000, 1), '주거': (0, 0)})
+
+        response = self.client.get('/expenses/', {'tag': self.food, 'start-date': '2022-01-01',
+                                                  'end-date': '2022-01-31'}, **self.header)
+        self.assertEqual([expense['amount'] for expense in response.json()['expenses']], [9000, 15000])
+        response = self.client.get('/expenses/', {'tag': 'food'}, **self.header)
+        self.assertEqual(response.json(), {"error": "'tag' must be an integer."})
+        self.assertTagRollupsConsistent()
+
+    def test_other_users_tag(self):
+        data = {'title': '점심', 'date': '2022-01-01', 'amount': 9000, 'description': '', 'tag': self.other}
+        response = self.client.post('/expenses/new/', data, **self.header)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "tag 'id: %d' does not exist." % self.other})
+
+        response = self.client.post('/expenses/bulk/', [dict(data, tag=self.food), data], **self.header)
+        self.assertEqual(response.json()['results'], [
+            {"index": 0, "status": 201},
+            {"index": 1, "status": 400, "error": "tag 'id: %d' does not exist." % self.other},
+        ])
+
+        response = self.client.post('/expenses/tags/', {'name': '식비'}, **self.header)
+        self.assertEqual(response.json(), {"error": "'식비' is already."})
+
+    def test_edit_delete_and_restore(self):
+        expense = Expense.objects.get(amount=9000)
+        self.client.put('/expenses/%d/' % expense.id, {'tag': self.house}, **self.header)
+        self.assertEqual(self.totals(), {'식비': (15000, 1), '주거': (109000, 2)})
+        self.assertTagRollupsConsistent()
+
+        self.client.delete('/expenses/%d/' % expense.id, **self.header)
+        d_expense = DeletedExpense.objects.get()
+        self.assertEqual(d_expense.tag_id, self.house)
+        self.assertEqual(self.totals()['주거'], (100000, 1))
+
+        self.client.delete('/expenses/deleted/%d/' % d_expense.id, **self.header)
+        self.assertEqual(Expense.objects.get(amount=9000).tag_id, self.house)
+        self.assertEqual(self.totals()['주거'], (109000, 2))
+
+        self.client.post('/expenses/bulk-delete/', {'tag': self.food}, **self.header)
+        self.assertEqual(self.totals()['식비'], (0, 0))
+        self.client.post('/expenses/deleted/bulk-restore/', {'tag': self.food}, **self.header)
+        self.assertEqual(self.totals()['식비'], (15000, 1))
+        self.assertTagRollupsConsistent()
+
+    def test_delete_tag(self):
+        response = self.client.delete('/expenses/tags/%d/' % self.food, **self.header)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Expense.objects.filter(tag_id=self.food).exists())
+        self.assertEqual(self.totals(), {'주거': (100000, 1)})
+        self.assertTagRollupsConsistent()
+
+        response = self.client.delete('/expenses/tags/%d/' % self.other, **self.header)
+        self.assertEqual(response.status_code, 404)
+
+    def test_delete_tag_refreshes_detail_etags(self):
+        lunch, dinner = Expense.objects.filter(user_id=1, tag_id=self.food).order_by('date')[:2]
+        self.client.delete('/expenses/%d/' % dinner.id, **self.header)
+        d_expense_id = DeletedExpense.objects.get(user_id=1, tag_id=self.food).id
+        urls = {'/expenses/%d/' % lunch.id: 'expense', '/expenses/deleted/%d/' % d_expense_id: 'deleted_expense'}
+        etags = {url: self.client.get(url, **self.header)['ETag'] for url in urls}
+        for url, etag in etags.items():
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.header).status_code, 304)
+
+        self.client.delete('/expenses/tags/%d/' % self.food, **self.header)
+        for url, key in urls.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url], **self.header)
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(response.json()[key]['tag_id'])
+            self.assertNotEqual(response['ETag'], etags[url])
+
+
+class ExpenseSearchTest(TestCase):
+    """
+    지출내역 키워드 검색 테스트 클래스.
+    """
+
+    def setUp(self):
+        """Mock 데이터 세팅."""
+
+        User.objects.create(id=1, email='test1@example.com', password='-')
+        User.objects.create(id=2, email='test2@example.com', password='-')
+
+        Expense.objects.bulk_create([
+            Expense(id=1, user_id=1, title='아파트관리비', date='2022-01-01', amount=100000, description='1월분'),
+            Expense(id=2, user_id=1, title='점심 식사', date='2022-01-02', amount=9000, description='회사 근처'),
+            Expense(id=3, user_id=1, title='커피', date='2022-01-03', amount=4500, description='점심 후 커피'),
+            Expense(id=4, user_id=2, title='점심 식사', date='2022-01-02', amount=8000, description=None),
+        ])
+        search.index_missing()
+
+        self.client = Client()
+        self.token = jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+
+    def test_tokenize(self):
+        self.assertEqual(search.tokenize('아파트 관리비'), ['아파', '파트', '관리', '리비'])
+        self.assertEqual(search.tokenize('A 커피!'), ['a', '커피'])
+
+    def test_list_keyword(self):
+        """제목･메모 모두 검색되며 타인의 지출내역은 제외된다."""
+
+        header = {"HTTP_Authorization": self.token}
+        response = self.client.get('/expenses/', {'keyword': '점심'}, **header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([expense['id'] for expense in response.json()['expenses']], [2, 3])
+
+        response = self.client.get('/expenses/', {'keyword': '관리'}, **header)
+        self.assertEqual([expense['id'] for expense in response.json()['expenses']], [1])
+
+    def test_search_rank(self):
+        """제목 일치가 메모 일치보다 높은 순위를 가진다."""
+
+        header = {"HTTP_Authorization": self.token}
+        response = self.client.get('/expenses/search/', {'keyword': '점심'}, **header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([expense['id'] for expense in response.json()['expenses']], [2, 3])
+
+        response = self.client.get('/expenses/search/', **header)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "'keyword' is required."})
+
+    def test_index_sync(self):
+        """생성･수정･삭제･복원 시 역색인이 갱신된다."""
+
+        header = {"HTTP_Authorization": self.token, "content_type": "application/json"}
+        data = {'title': '택시비', 'date': '2022-01-04', 'amount': 12000, 'description': '야근'}
+        self.client.post('/expenses/new/', data, **header)
+        expense = Expense.objects.get(title='택시비')
+        response = self.client.get('/expenses/', {'keyword': '택시'}, **header)
+        self.assertEqual([row['id'] for row in response.json()['expenses']], [expense.id])
+
+        self.client.put('/expenses/%d/' % expense.id, {'title': '버스비'}, **header)
+        response = self.client.get('/expenses/', {'keyword': '택시'}, **header)
+        self.assertEqual(response.json()['expenses'], [])
+        response = self.client.get('/expenses/', {'keyword': '버스'}, **header)
+        self.assertEqual([row['id'] for row in response.json()['expenses']], [expense.id])
+
+        self.client.delete('/expenses/%d/' % expense.id, **header)
+        self.assertFalse(ExpenseSearchToken.objects.filter(expense_id=expense.id).exists())
+
+        d_expense = DeletedExpense.objects.get(title='버스비')
+        self.client.delete('/expenses/deleted/%d/' % d_expense.id, **header)
+        response = self.client.get('/expenses/', {'keyword': '버스'}, **header)
+        self.assertEqual([row['title'] for row in response.json()['expenses']], ['버스비'])
+
+
+@override_settings(ROOT_URLCONF='config.asgi_urls', ASYNC_DB_POOL_SIZE=0)
+class ExpenseExportTest(TestCase):
+    """
+    지출내역 내보내기(CSV･열 단위 형식) 테스트 클래스.
+    """
+
+    def setUp(self):
+        User.objects.create(id=1, email='test1@example.com', password='-')
+        User.objects.create(id=2, email='test2@example.com', password='-')
+        Expense.objects.bulk_create(
+            Expense(id=i, user_id=1, title='점심 식사' if i % 2 else '택시비, "심야"', date='2022-01-%02d' % i,
+                    amount=i * 1000, description=None if i == 1 else '메모') for i in range(1, 7))
+        Expense.objects.create(id=100, user_id=2, title='다른 유저', date='2022-01-01', amount=1000)
+        DeletedExpense.objects.create(id=7, user_id=1, title='삭제된 지출', date='2022-01-07', amount=7000)
+        search.index_missing()
+        self.client = Client()
+        self.token = jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+
+    def export(self, **params):
+        headers = {'HTTP_Authorization': self.token}
+        if params.pop('gzip', False):
+            headers['HTTP_ACCEPT_ENCODING'] = 'gzip, deflate'
+        return self.client.get('/expenses/export/', params, **headers)
+
+    @staticmethod
+    def content(response):
+        return b''.join(response.streaming_content)
+
+    def read_csv(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        return list(csv.reader(io.StringIO(self.content(response).decode('utf-8-sig'))))
+
+    def test_export_csv(self):
+        response = self.export()
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="expenses-active.csv"')
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0], ['id', 'date', 'title', 'amount', 'description', 'created_at', 'updated_at'])
+        self.assertEqual([row[0] for row in rows[1:]], ['1', '2', '3', '4', '5', '6'])
+        self.assertEqual(rows[1][:5], ['1', '2022-01-01', '점심 식사', '1000', ''])
+        self.assertEqual(rows[2][2], '택시비, "심야"')
+        self.assertRegex(rows[1][5], r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d{3})?Z$')
+
+    def test_export_filters_and_scope(self):
+        rows = self.read_csv(self.export(**{'start-date': '2022-01-02', 'end-date': '2022-01-04'}))
+        self.assertEqual([row[0] for row in rows[1:]], ['2', '3', '4'])
+        rows = self.read_csv(self.export(keyword='식사'))
+        self.assertEqual([row[0] for row in rows[1:]], ['1', '3', '5'])
+
+        rows = self.read_csv(self.export(scope='all', date='2022-01-06'))
+        self.assertEqual(rows[0][0], 'status')
+        self.assertEqual(rows[0][-1], 'deleted_at')
+        self.assertEqual([(row[0], row[1]) for row in rows[1:]], [('active', '6')])
+        rows = self.read_csv(self.export(scope='all'))
+        self.assertEqual([(row[0], row[1]) for row in rows[1:]][-2:], [('active', '6'), ('deleted', '7')])
+        self.assertEqual(rows[-2][-1], '')
+        self.assertNotEqual(rows[-1][-1], '')
+        rows = self.read_csv(self.export(scope='deleted'))
+        self.assertEqual([row[2] for row in rows[1:]], ['삭제된 지출'])
+
+    def test_export_columnar(self):
+        response = self.export(format='columnar')
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in self.content(response).decode('utf-8').splitlines()]
+        fields = lines[0]['fields']
+        self.assertEqual(fields[:4], ['id', 'date', 'title', 'amount'])
+        self.assertEqual(lines[1]['rows'], 6)
+        columns = dict(zip(fields, lines[1]['columns']))
+        self.assertEqual(columns['id'], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(columns['date'][0], '2022-01-01')
+        self.assertEqual(columns['title'], {'values': ['점심 식사', '택시비, "심야"'], 'codes': [0, 1, 0, 1, 0, 1]})
+        self.assertEqual(columns['description'][:2], [None, '메모'])
+
+    def test_export_gzip(self):
+        plain = self.content(self.export())
+        response = self.export(gzip=True)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(self.content(response)), plain)
+
+    def test_export_invalid(self):
+        self.assertEqual(self.export(format='xlsx').status_code, 400)
+        self.assertEqual(self.export(scope='trash').status_code, 400)
+        self.assertEqual(self.export(date='2022-13-01').status_code, 400)
+        self.assertEqual(self.client.get('/expenses/export/').status_code, 401)
+
+
+class ExpenseImportTest(TestCase):
+    """
+    지출내역 가져오기(CSV 업로드) 테스트 클래스.
+    """
+
+    def setUp(self):
+        User.objects.create(id=1, email='test1@example.com', password='-')
+        User.objects.create(id=2, email='test2@example.com', password='-')
+        self.client = Client()
+        self.token = jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+        self.directory = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(imports, 'IMPORT_DIR', self.directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def upload(self, text, charset='utf-8', **params):
+        params['file'] = SimpleUploadedFile('ledger.csv', text.encode(charset), content_type='text/csv')
+        return self.client.post('/expenses/imports/', params, HTTP_Authorization=self.token)
+
+    def run_import(self, text, charset='utf-8', **params):
+        """업로드 후 가져오기 작업을 현재 프로세스에서 실행하고 진행률을 반환한다."""
+
+        response = self.upload(text, charset, **params)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['import']['status'], 'pending')
+        self.assertEqual(jobs.run_pending(), 1)
+        response = self.client.get('/expenses/imports/%d/' % response.json()['import']['id'],
+                                   HTTP_Authorization=self.token)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['import']
+
+    def test_import_success(self):
+        rows = ['date,title,amount,description'] + ['2022-01-%02d,지출 %d,%d,메모' % (i % 28 + 1, i, i * 100)
+                                                     for i in range(1, 51)]
+        with mock.patch.object(imports, 'CHUNK_SIZE', 20), \
+                mock.patch.object(imports, 'report', wraps=imports.report) as report:
+            result = self.run_import('\n'.join(rows) + '\n')
+        self.assertEqual(report.call_count, 2)
+        self.assertEqual((result['status'], result['lines'], result['imported'], result['failed']), ('done', 50, 50, 0))
+        self.assertEqual(result['progress'], 100.0)
+        self.assertIsNone(result['errors'])
+        self.assertEqual(Expense.objects.filter(user_id=1).count(), 50)
+        self.assertEqual(MonthlySpending.objects.get(user_id=1).total, sum(i * 100 for i in range(1, 51)))
+        matches = search.filter_keyword(Expense.objects.all(), 1, '지출 7')
+        self.assertEqual(sorted(matches.values_list('title', flat=True)), ['지출 7'])
+        self.assertFalse(os.path.exists(imports.upload_path(result['id'])))
+
+        self.assertEqual(self.run_import('\n'.join(rows))['imported'], 50)
+        daily = {row.date.day: (row.total, row.count) for row in DailySpending.objects.filter(user_id=1)}
+        self.assertEqual(len(daily), 28)
+        self.assertEqual(daily[2], (2 * (100 + 2900), 4))
+        self.assertEqual(MonthlySpending.objects.get(user_id=1).count, 100)
+
+    def test_import_bank_statement(self):
+        text = '거래일자;적요;출금액\n2022.01.05;편의점;"3,500원"\n20220106;택시;12000\n'
+        result = self.run_import(text, charset='cp949', delimiter=';', encoding='cp949', **{
+            'date-column': '거래일자', 'title-column': '적요', 'amount-column': '출금액'})
+        self.assertEqual(result['status'], 'done')
+        expenses = Expense.objects.filter(user_id=1).order_by('date')
+        self.assertEqual([(str(e.date), e.title, e.amount, e.description) for e in expenses],
+                         [('2022-01-05', '편의점', 3500, ''), ('2022-01-06', '택시', 12000, '')])
+
+    def test_import_error_file(self):
+        text = 'date,title,amount\n2022-01-01,점심,8000\n2022-13-01,오류 날짜,1000\n2022-01-02,,1000\n' \
+               '2022-01-03,오류 금액,abc\n2022-01-04,저녁,-1\n2022-01-05,커피,4500\n'
+        result = self.run_import(text)
+        self.assertEqual((result['lines'], result['imported'], result['failed']), (6, 2, 4))
+        self.assertEqual(result['errors'], '/expenses/imports/%d/errors/' % result['id'])
+
+        response = self.client.get(result['errors'], HTTP_Authorization=self.token)
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(rows[0], ['line', 'error', 'date', 'title', 'amount'])
+        self.assertEqual([row[0] for row in rows[1:]], ['3', '4', '5', '6'])
+        self.assertEqual(rows[2][1:3], ["'title' is required.", '2022-01-02'])
+
+    def test_import_failure(self):
+        result = self.run_import('date,name,amount\n2022-01-01,점심,8000\n')
+        self.assertEqual((result['status'], result['error']), ('failed', "'title' column not found in header."))
+        result = self.run_import('date,title,amount\n2022-01-01,점심,8000\n', charset='cp949')
+        self.assertEqual(result['status'], 'failed')
+        self.assertIn('cannot decode', result['error'])
+        self.assertEqual(self.upload('date,title,amount\n', delimiter='/').status_code, 400)
+        self.assertEqual(self.upload('date,title,amount\n', encoding='nope').status_code, 400)
+        self.assertEqual(self.client.post('/expenses/imports/', {}, HTTP_Authorization=self.token).status_code, 400)
+        with mock.patch.object(views.ExpenseImportView, 'max_size', 10):
+            self.assertEqual(self.upload('date,title,amount\n2022-01-01,점심,8000\n').status_code, 413)
+        self.assertEqual(Expense.objects.count(), 0)
+
+    def test_import_permission(self):
+        result = self.run_import('date,title,amount\n2022-01-01,점심,8000\n')
+        other = jwt.encode(payload={'user_id': 2}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+        self.assertEqual(self.client.get('/expenses/imports/%d/' % result['id'],
+                                         HTTP_Authorization=other).status_code, 404)
+        self.assertEqual(self.client.get('/expenses/imports/%d/errors/' % result['id'],
+                                         HTTP_Authorization=self.token).status_code, 404)
+        self.assertEqual(self.client.get('/expenses/imports/999/', HTTP_Authorization=self.token).status_code, 404)
+        self.assertEqual(self.client.get('/expenses/imports/%d/' % result['id']).status_code, 401)
+
+
+class JobTest(TestCase):
+    """
+    백그라운드 작업(대기열･작업자･재시도･취소) 테스트 클래스.
+    """
+
+    def setUp(self):
+        User.objects.create(id=1, email='test1@example.com', password='-')
+        User.objects.create(id=2, email='test2@example.com', password='-')
+        Expense.objects.bulk_create(
+            Expense(id=i, user_id=1, title='점심 식사', date='2022-01-%02d' % i, amount=i * 1000) for i in range(1, 6))
+        DeletedExpense.objects.bulk_create(
+            DeletedExpense(id=i, user_id=1, title='삭제된 지출', date='2022-01-%02d' % i, amount=1000)
+            for i in range(10, 15))
+        self.client = Client()
+        self.token = jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+        self.directory = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(jobs, 'OUTPUT_DIR', self.directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def enqueue(self, kind, params=None):
+        response = self.client.post('/expenses/jobs/', json.dumps({'kind': kind, 'params': params or {}}),
+                                    content_type='application/json', HTTP_Authorization=self.token)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['job']['status'], 'queued')
+        return response.json()['job']['id']
+
+    def get_job(self, job_id):
+        response = self.client.get('/expenses/jobs/%d/' % job_id, HTTP_Authorization=self.token)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['job']
+
+    def test_rebuild_and_purge(self):
+        rebuild = self.enqueue('rebuild_rollups')
+        purge = self.enqueue('purge_deleted', {'start-date': '2022-01-10', 'end-date': '2022-01-12'})
+        self.assertEqual(jobs.run_pending(), 2)
+
+        job = self.get_job(rebuild)
+        self.assertEqual((job['status'], job['progress'], job['attempts']), ('done', 100, 1))
+        self.assertEqual(job['result'], {'days': 5, 'months': 1})
+        self.assertEqual(MonthlySpending.objects.get(user_id=1).total, 15000)
+        self.assertEqual(self.get_job(purge)['result'], {'purged': 3})
+        self.assertEqual(sorted(DeletedExpense.objects.values_list('id', flat=True)), [13, 14])
+
+        response = self.client.get('/expenses/jobs/', HTTP_Authorization=self.token)
+        self.assertEqual([job['id'] for job in response.json()['jobs']], [purge, rebuild])
+
+    def test_export_job(self):
+        job_id = self.enqueue('export', {'start-date': '2022-01-02', 'end-date': '2022-01-04'})
+        jobs.run_pending()
+        job = self.get_job(job_id)
+        self.assertEqual(job['result']['rows'], 3)
+        response = self.client.get(job['result']['file'], HTTP_Authorization=self.token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual([row[0] for row in rows[1:]], ['2', '3', '4'])
+
+    def test_claim_is_exclusive(self):
+        job = jobs.enqueue('rebuild_rollups', user_id=1)
+        self.assertEqual(jobs.claim('worker-a').id, job.id)
+        self.assertIsNone(jobs.claim('worker-b'))
+        self.assertEqual(jobs.finish(job, 'worker-b', status=Job.STATUS_DONE), 0)
+
+        Job.objects.filter(id=job.id).update(locked_at=timezone.now() - datetime.timedelta(seconds=600))
+        with mock.patch.dict(jobs.HANDLERS, {'rebuild_rollups': (jobs.HANDLERS['rebuild_rollups'][0], 2)}):
+            Job.objects.filter(id=job.id).update(max_attempts=2)
+            self.assertEqual(jobs.requeue_stale(timeout=300), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Job.STATUS_QUEUED, None))
+        self.assertIn('worker lost', job.error)
+
+    def test_retry_with_backoff(self):
+        failing = mock.Mock(side_effect=RuntimeError('disk full'))
+        with mock.patch.dict(jobs.HANDLERS, {'flaky': (failing, 2)}):
+            job = jobs.enqueue('flaky', user_id=1)
+            with self.assertLogs('accountbooks.jobs', 'ERROR'):
+                self.assertEqual(jobs.run_pending(), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts, job.error), ('queued', 1, 'RuntimeError: disk full'))
+            self.assertGreater(job.run_at, timezone.now() + datetime.timedelta(seconds=jobs.RETRY_BACKOFF - 1))
+            self.assertEqual(jobs.run_pending(), 0)
+
+            Job.objects.filter(id=job.id).update(run_at=timezone.now())
+            with self.assertLogs('accountbooks.jobs', 'ERROR'):
+                self.assertEqual(jobs.run_pending(), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertEqual([jobs.retry_delay(attempts) for attempts in (1, 2, 3)],
+                         [jobs.RETRY_BACKOFF, jobs.RETRY_BACKOFF * 2, jobs.RETRY_BACKOFF * 4])
+
+    def test_cancel(self):
+        job_id = self.enqueue('rebuild_rollups')
+        response = self.client.post('/expenses/jobs/%d/cancel/' % job_id, HTTP_Authorization=self.token)
+        self.assertEqual(response.json()['job']['status'], 'cancelled')
+        self.assertEqual(jobs.run_pending(), 0)
+        self.assertEqual(self.client.post('/expenses/jobs/%d/cancel/' % job_id,
+                                          HTTP_Authorization=self.token).status_code, 400)
+
+        def long_running(job, context):
+            jobs.cancel(job)
+            context.reported_at = None
+            context.report(50)
+            return {}
+
+        with mock.patch.dict(jobs.HANDLERS, {'long': (long_running, 3)}):
+            job = jobs.enqueue('long', user_id=1)
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('cancelled', 1, None))
+
+    def test_invalid_and_permission(self):
+        def post(data):
+            return self.client.post('/expenses/jobs/', json.dumps(data), content_type='application/json',
+                                    HTTP_Authorization=self.token).status_code
+
+        self.assertEqual(post({'kind': 'import'}), 400)
+        self.assertEqual(post({'kind': 'export', 'params': {'format': 'xlsx'}}), 400)
+        self.assertEqual(post({'kind': 'export', 'params': {'date': '2022-13-01'}}), 400)
+        self.assertEqual(post({'kind': 'purge_deleted'}), 400)
+        self.assertEqual(post({'kind': 'rebuild_rollups', 'params': []}), 400)
+
+        job_id = self.enqueue('rebuild_rollups')
+        other = jwt.encode(payload={'user_id': 2}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+        for path in ('/expenses/jobs/%d/', '/expenses/jobs/%d/file/'):
+            self.assertEqual(self.client.get(path % job_id, HTTP_Authorization=other).status_code, 404)
+        self.assertEqual(self.client.post('/expenses/jobs/%d/cancel/' % job_id,
+                                          HTTP_Authorization=other).status_code, 404)
+        self.assertEqual(self.client.get('/expenses/jobs/%d/file/' % job_id,
+                                         HTTP_Authorization=self.token).status_code, 404)
+        self.assertEqual(self.client.get('/expenses/jobs/').status_code, 401)
+
+    def test_run_jobs_command(self):
+        self.enqueue('rebuild_rollups')
+        out = io.StringIO()
+        call_command('run_jobs', processes=0, burst=True, stdout=out)
+        self.assertIn('done.', out.getvalue())
+        self.assertFalse(Job.objects.exclude(status=Job.STATUS_DONE).exists())
+
+
+class AsyncExpenseTest(TestCase):
+    """
+    가계부 지출내역 비동기(ASGI) 뷰 테스트 클래스.
+    """
+
+    def setUp(self):
+        """Mock 데이터 세팅."""
+
+        User.objects.create(id=1, email='test1@example.com', password='-')
+        Expense.objects.create(id=1, user_id=1, title='아파트관리비', date='2022-01-01', amount=1000000)
+        self.client = AsyncClient()
+        self.token = jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+
+    async def test_list_and_detail(self):
+        response = await self.client.get('/expenses/', authorization=self.token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "expenses": [{"id": 1, "date": "2022-01-01", "title": "아파트관리비", "amount": 1000000}],
+            "next": None
+        })
+        response = await self.client.get('/expenses/1/', authorization=self.token)
+        self.assertEqual(response.json()['expense']['owner_id'], 1)
+
+    async def test_create(self):
+        data = {'title': 'test', 'date': '2022-01-02', 'amount': 1000, 'description': ''}
+        response = await self.client.post('/expenses/new/', data, content_type='application/json',
+                                          authorization=self.token)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {"message": "new expense created successfully."})
+
+    async def test_unauthorized(self):
+        response = await self.client.get('/expenses/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {"error": "login required."})
+
+    async def test_sync_fallback_route(self):
+        """비동기 뷰가 없는 경로는 동기 뷰로 처리된다."""
+
+        response = await self.client.get('/expenses/summary/', authorization=self.token)
+        self.assertEqual(response.status_code, 200)
+
+
+class RequestTimingTest(TestCase):
+    """
+    요청별 성능 계측(Server-Timing, 경로별 히스토그램) 테스트 클래스.
+    """
+
+    def setUp(self):
+        """Mock 데이터 세팅."""
+
+        User.objects.create(id=1, email='test1@example.com', password='-')
+        Expense.objects.create(id=1, user_id=1, title='아파트관리비', date='2022-01-01', amount=1000000)
+        self.token = jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+        route_metrics.clear()
+
+    @staticmethod
+    def parse(header):
+        return dict(re.match(r'(\w+);(?:dur=|desc=)"?([\d.]+)', entry.strip()).groups() for entry in header.split(','))
+
+    def test_server_timing_header(self):
+        response = Client().get('/expenses/', HTTP_Authorization=self.token)
+        timings = self.parse(response['Server-Timing'])
+        self.assertEqual(set(timings), {'db', 'auth', 'serialize', 'view', 'total', 'queries'})
+        self.assertGreaterEqual(int(timings['queries']), 1)
+        self.assertGreater(float(timings['total']), 0)
+
+    def test_route_metrics(self):
+        Client().get('/expenses/', HTTP_Authorization=self.token)
+        Client().get('/expenses/1/', HTTP_Authorization=self.token)
+        Client().get('/expenses/1/', HTTP_Authorization=self.token)
+        snapshot = route_metrics.snapshot()
+        self.assertEqual(snapshot['GET expenses/']['requests'], 1)
+        self.assertEqual(snapshot['GET expenses/<int:expense_id>/']['requests'], 2)
+        self.assertEqual(snapshot['GET expenses/<int:expense_id>/']['ms']['total']['count'], 2)
+
+    def test_metrics_view(self):
+        Client().get('/expenses/', HTTP_Authorization=self.token)
+        response = Client().get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {'routes', 'principal_cache', 'password_hasher', 'admission',
+                                                   'email_filter', 'db_pools', 'db_routing'})
+        self.assertIn('GET expenses/', response.json()['routes'])
+
+        response = Client().get('/metrics/', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(ROOT_URLCONF='config.asgi_urls', ASYNC_DB_POOL_SIZE=0)
+    async def test_async_server_timing(self):
+        response = await AsyncClient().get('/expenses/', authorization=self.token)
+        timings = self.parse(response['Server-Timing'])
+        self.assertGreaterEqual(int(timings['queries']), 1)
+
+
+class JsonEncoderTest(TestCase):
+    """
+    빠른 JSON 인코더(`utils.responses`) 테스트 클래스.
+    """
+
+    fields = ('id', 'date', 'title', 'amount', 'description', 'created_at')
+    rows = [
+        (1, datetime.date(2022, 1, 1), '아파트관리비', 1000000, None,
+         datetime.datetime(2022, 1, 1, 9, 30, 15, 123456, tzinfo=datetime.timezone.utc)),
+        (2, datetime.date(2022, 1, 2), 'say "hi" 100%', 5000, '메모',
+         datetime.datetime(2022, 1, 2, 0, 0, tzinfo=datetime.timezone.utc)),
+    ]
+
+    def expected(self, data):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode('utf-8')
+
+    def test_pure_python_path_matches_django_encoder(self):
+        data = {"expenses": responses.Rows(self.fields, self.rows), "next": None}
+        detail = {"expense": dict(zip(self.fields, self.rows[0]))}
+        with mock.patch.object(responses, 'orjson', None):
+            self.assertEqual(responses.dumps(data), self.expected({"expenses": list(data['expenses']), "next": None}))
+            self.assertEqual(responses.dumps(detail), self.expected(detail))
+            self.assertEqual(responses.dumps({"expenses": responses.Rows(self.fields, [])}), b'{"expenses": []}')
+
+    def test_orjson_path(self):
+        if responses.orjson is None:
+            self.skipTest('orjson is not installed.')
+        data = {"expenses": responses.Rows(self.fields, self.rows), "next": None}
+        content = responses.dumps(data)
+        self.assertEqual(json.loads(content),
+                         json.loads(self.expected({"expenses": list(data['expenses']), "next": None})))
+        # orjson 출력은 값만 같다. (공백 없는 구분자, UTF-8 그대로)
+        self.assertTrue(content.startswith(b'{"expenses":[{"id":1,'))
+        self.assertIn('아파트관리비'.encode('utf-8'), content)
+
+    def test_stream_matches_response(self):
+        User.objects.create(id=1, email='test1@example.com', password='-')
+        for day in range(1, 4):
+            Expense.objects.create(user_id=1, title='점심 식사', date='2022-01-%02d' % day, amount=day * 1000)
+        token = jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+
+        response = Client().get('/expenses/', HTTP_Authorization=token)
+        streamed = Client().get('/expenses/', {'stream': 1}, HTTP_Authorization=token)
+        self.assertEqual(json.loads(b''.join(streamed.streaming_content)), response.json())
+
+
+class ConnectionPoolTest(TestCase):
+    """
+    DB 연결 풀(`utils.db.pool`) 테스트 클래스.
+    """
+
+    class FakeConnection:
+        def __init__(self):
+            self.closed = False
+            self.healthy = True
+
+        def close(self):
+            self.closed = True
+
+    def setUp(self):
+        self.now = 0.0
+        self.connections = []
+
+    def make_pool(self, **kwargs):
+        def connect():
+            self.connections.append(self.FakeConnection())
+            return self.connections[-1]
+
+        def ping(connection):
+            if not connection.healthy:
+                raise OSError('gone away')
+
+        return ConnectionPool(connect=connect, close=lambda connection: connection.close(), ping=ping,
+                              clock=lambda: self.now, **kwargs)
+
+    def test_reuse(self):
+        pool = self.make_pool(max_size=2)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(pool.stats()['created'], 1)
+        self.assertEqual(pool.stats()['reused'], 1)
+
+    def test_warm(self):
+        pool = self.make_pool(min_size=2, max_size=4)
+        pool.warm()
+        self.assertEqual(pool.stats()['idle'], 2)
+
+    def test_pre_ping_discards_broken_connection(self):
+        pool = self.make_pool(max_size=2)
+        broken = pool.acquire()
+        pool.release(broken)
+        broken.healthy = False
+
+        connection = pool.acquire()
+        self.assertIsNot(connection, broken)
+        self.assertTrue(broken.closed)
+        self.assertEqual(pool.stats()['ping_failures'], 1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_max_lifetime(self):
+        pool = self.make_pool(max_size=2, max_lifetime=60)
+        old = pool.acquire()
+        pool.release(old)
+        self.now = 61
+        self.assertIsNot(pool.acquire(), old)
+        self.assertTrue(old.closed)
+
+    def test_timeout_when_exhausted(self):
+        pool = ConnectionPool(connect=object, close=lambda connection: None, max_size=1, timeout=0.05)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_wait_for_release(self):
+        pool = ConnectionPool(connect=object, close=lambda connection: None, max_size=1, timeout=5)
+        connection = pool.acquire()
+        threading.Timer(0.05, pool.release, args=(connection,)).start()
+        self.assertIs(pool.acquire(), connection)
+        self.assertEqual(pool.stats()['waits'], 1)
+        self.assertGreater(pool.stats()['wait_time'], 0)
+
+    def test_pooled_sqlite_backend(self):
+        """stand-in 백엔드는 close() 시 연결을 반납하고 다른 스레드의 DatabaseWrapper 가 재사용한다."""
+
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = {
+                'ENGINE': 'utils.db.sqlite3', 'NAME': os.path.join(directory, 'pool.sqlite3'), 'OPTIONS': {},
+                'TIME_ZONE': None, 'CONN_MAX_AGE': 0, 'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False,
+                'POOL': {'MAX_SIZE': 2},
+            }
+
+            def query():
+                database = PooledSQLiteWrapper(settings_dict, alias='pool-test')
+                with database.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    result = cursor.fetchone()
+                database.close()
+                return database, result
+
+            database, result = query()
+            self.assertEqual(result, (1,))
+            thread = threading.Thread(target=query)
+            thread.start()
+            thread.join()
+
+            stats = database.pool.stats()
+            self.assertEqual(stats['created'], 1)
+            self.assertEqual(stats['reused'], 1)
+            self.assertEqual(stats['in_use'], 0)
+            database.pool.close_all()
+
+
+class ConditionalGetTest(TestCase):
+    """
+    지출내역 조건부 요청(ETag / If-None-Match / Last-Modified) 테스트 클래스.
+    """
+
+    def setUp(self):
+        """Mock 데이터 세팅."""
+
+        User.objects.create(id=1, email='test1@example.com', password='-')
+        User.objects.create(id=2, email='test2@example.com', password='-')
+        Expense.objects.create(id=1, user_id=1, title='아파트관리비', date='2022-01-01', amount=1000000)
+        self.client = Client()
+        self.token = jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+
+    def get(self, path, etag=None, **kwargs):
+        if etag:
+            kwargs['HTTP_IF_NONE_MATCH'] = etag
+        return self.client.get(path, HTTP_Authorization=self.token, **kwargs)
+
+    def test_list_not_modified_without_query(self):
+        response = self.get('/expenses/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Authorization', response['Vary'])
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get('/expenses/', etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        self.assertFalse([query for query in queries.captured_queries if '"expenses"' in query['sql']])
+
+    def test_list_etag_changes_on_write(self):
+        etag = self.get('/expenses/')['ETag']
+        data = {'title': 'test', 'date': '2022-01-02', 'amount': 1000, 'description': ''}
+        self.client.post('/expenses/new/', data, content_type='application/json', HTTP_Authorization=self.token)
+        self.assertEqual(LedgerVersion.objects.get(user_id=1).version, 1)
+
+        response = self.get('/expenses/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['expenses']), 2)
+
+        etag = response['ETag']
+        deleted_etag = self.get('/expenses/deleted/')['ETag']
+        self.client.delete('/expenses/1/', HTTP_Authorization=self.token)
+        self.assertEqual(self.get('/expenses/', etag).status_code, 200)
+        self.assertEqual(self.get('/expenses/deleted/', deleted_etag).status_code, 200)
+
+    def test_etag_is_per_user(self):
+        etag = self.get('/expenses/')['ETag']
+        other = jwt.encode(payload={'user_id': 2}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+        response = self.client.get('/expenses/', HTTP_Authorization=other, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_not_modified(self):
+        response = self.get('/expenses/1/')
+        etag = response['ETag']
+        self.assertEqual(self.get('/expenses/1/', etag).status_code, 304)
+        self.assertEqual(self.get('/expenses/1/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        self.client.put('/expenses/1/', {'amount': 2000}, content_type='application/json',
+                        HTTP_Authorization=self.token)
+        response = self.get('/expenses/1/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'], READ_YOUR_WRITES_WINDOW=5, REPLICA_MAX_LAG=10,
+                   REPLICA_LAG_CHECK_INTERVAL=5)
+class ReplicaRouterTest(SimpleTestCase):
+    """
+    읽기 replica DB 라우터(`utils.routers`) 테스트 클래스.
+    """
+
+    def setUp(self):
+        self.now = 0.0
+        self.lag = {'replica1': 0.0, 'replica2': 0.0}
+
+        def measure(alias):
+            if isinstance(self.lag[alias], Exception):
+                raise self.lag[alias]
+            return self.lag[alias]
+
+        state = routers.ReplicaState(measure=measure, clock=lambda: self.now)
+        patchers = [mock.patch.object(routers, 'replica_state', state),
+                    mock.patch.object(routers, 'wrote_recently', return_value=False)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.state = state
+        self.router = routers.ReplicaRouter()
+
+    def read(self, user_id=1, primary=False):
+        token = routers.set_user(user_id, primary=primary)
+        try:
+            return self.router.db_for_read(Expense)
+        finally:
+            routers.reset_user(token)
+
+    def test_reads_replicas_and_writes_primary(self):
+        self.assertEqual({self.read(), self.read()}, {'replica1', 'replica2'})
+        self.assertEqual(self.router.db_for_write(Expense), 'default')
+        self.assertEqual(self.router.db_for_read(LedgerVersion), 'default')
+
+    def test_read_your_writes(self):
+        token = routers.set_user(1)
+        try:
+            self.assertTrue(self.router.db_for_read(Expense).startswith('replica'))
+            self.router.db_for_write(Expense)
+            self.assertEqual(self.router.db_for_read(Expense), 'default')
+        finally:
+            routers.reset_user(token)
+
+        self.assertEqual(self.read(user_id=1), 'default')
+        self.assertTrue(self.read(user_id=2).startswith('replica'))
+        self.now = 6
+        self.assertTrue(self.read(user_id=1).startswith('replica'))
+        self.assertEqual(self.state.stats()['pinned_reads'], 2)
+
+    def test_write_request_reads_primary(self):
+        self.assertEqual(self.read(primary=True), 'default')
+
+    def test_write_in_other_process(self):
+        with mock.patch.object(routers, 'wrote_recently', return_value=True):
+            self.assertEqual(self.read(), 'default')
+
+    def test_lagging_replica_excluded(self):
+        self.lag['replica1'] = 30.0
+        self.assertEqual({self.read(), self.read()}, {'replica2'})
+
+        self.lag['replica2'] = RuntimeError('replication is stopped.')
+        self.now = 6
+        self.assertEqual(self.read(), 'default')
+        stats = self.state.stats()
+        self.assertEqual(stats['fallback_reads'], 1)
+        self.assertEqual(stats['lag']['replica1']['seconds'], 30.0)
+        self.assertEqual(stats['lag']['replica2']['error'], 'replication is stopped.')
+
+
+class ReplicaRoutingIntegrationTest(TransactionTestCase):
+    """
+    읽기 replica 라우팅 통합 테스트 클래스.
+
+    DATABASES 에 'replica' alias 가 있고 DATABASE_REPLICAS 에 포함된 경우(예: 로컬 SQLite 두 개)에만 실행한다.
+    복제는 두 DB 에 직접 쓰는 것으로 흉내 낸다.
+    """
+
+    databases = {'default', 'replica'} if 'replica' in settings.DATABASES else {'default'}
+
+    def setUp(self):
+        if 'replica' not in settings.DATABASES or 'replica' not in settings.DATABASE_REPLICAS:
+            self.skipTest("'replica' database is not configured.")
+        for alias in ('default', 'replica'):
+            User.objects.using(alias).create(id=1, email='test1@example.com', password='-')
+        Expense.objects.using('default').create(user_id=1, title='복제 전', date='2022-01-01', amount=1000)
+        self.client = Client()
+        self.token = jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+        patcher = mock.patch.object(routers, 'replica_state', routers.ReplicaState())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def list_titles(self):
+        response = self.client.get('/expenses/', HTTP_Authorization=self.token)
+        return [expense['title'] for expense in response.json()['expenses']]
+
+    def test_read_your_writes(self):
+        self.assertEqual(self.list_titles(), [])
+
+        data = {'title': '새 지출', 'date': '2022-01-02', 'amount': 1000, 'description': ''}
+        response = self.client.post('/expenses/new/', data, content_type='application/json',
+                                    HTTP_Authorization=self.token)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.list_titles(), ['복제 전', '새 지출'])
+
+        with mock.patch.object(routers, 'replica_state', routers.ReplicaState()):
+            self.assertEqual(self.list_titles(), ['복제 전', '새 지출'])
+
+
+@override_settings(DATABASE_SHARDS=['default', 'shard1'])
+class ShardRouterTest(SimpleTestCase):
+    """
+    가계부 shard DB 라우터(`utils.routers.ShardRouter`) 테스트 클래스.
+    """
+
+    def setUp(self):
+        patcher = mock.patch.object(sharding, 'get_shard', side_effect=lambda user_id: {1: 'shard1'}.get(user_id,
+                                                                                                     'default'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = routers.ShardRouter()
+
+    def route(self, user_id, model=Expense, **hints):
+        token = routers.set_user(user_id)
+        try:
+            return self.router.db_for_read(model, **hints), self.router.db_for_write(model, **hints)
+        finally:
+            routers.reset_user(token)
+
+    def test_routes_user_shard(self):
+        self.assertEqual(self.route(1), ('shard1', 'shard1'))
+        self.assertEqual(self.route(1, model=LedgerVersion), ('shard1', 'shard1'))
+        self.assertEqual(self.route(2), (None, None))
+        self.assertEqual(self.route(1, model=User), (None, None))
+        self.assertEqual(self.route(1, model=ShardMap), (None, None))
+        self.assertIsNone(self.router.db_for_read(Expense))
+
+    def test_instance_hint(self):
+        self.assertEqual(self.router.db_for_write(Expense, instance=Expense(user_id=1)), 'shard1')
+        expense = Expense(user_id=2)
+        expense._state.db = 'shard1'
+        self.assertEqual(self.route(2, instance=expense), ('shard1', 'shard1'))
+        expense._state.db = 'replica1'
+        self.assertEqual(self.router.db_for_write(Expense, instance=expense), None)
+
+    def test_use_shard(self):
+        with sharding.use_shard('shard1'):
+            self.assertEqual(self.route(2), ('shard1', 'shard1'))
+            self.assertEqual(self.route(2, model=User), (None, None))
+            self.assertEqual(sharding.db_for_user(2), 'shard1')
+        self.assertEqual(sharding.db_for_user(2), 'default')
+
+    @override_settings(DATABASE_SHARDS=['default'])
+    def test_single_shard(self):
+        self.assertEqual(self.route(1), (None, None))
+
+
+class ShardingIntegrationTest(TransactionTestCase):
+    """
+    가계부 sharding 통합 테스트 클래스.
+
+    DATABASES 에 'shard1' alias 가 있고 DATABASE_SHARDS 에 포함된 경우(예: 로컬 SQLite 두 개)에만 실행한다.
+    유저 1은 'shard1', 유저 2는 default 에 배정된다. (유저 id 해시)
+    """
+
+    databases = {'default', 'shard1'} if 'shard1' in settings.DATABASES else {'default'}
+
+    def setUp(self):
+        if 'shard1' not in settings.DATABASES or 'shard1' not in settings.DATABASE_SHARDS:
+            self.skipTest("'shard1' database is not configured.")
+        sharding.shard_cache.clear()
+        self.addCleanup(sharding.shard_cache.clear)
+        for user_id in (1, 2):
+            User.objects.create(id=user_id, email='test%d@example.com' % user_id, password='-')
+        self.client = Client()
+        self.tokens = {user_id: jwt.encode(payload={'user_id': user_id}, key=my_settings.SECRET_KEY,
+                                           algorithm=my_settings.ALGORITHM) for user_id in (1, 2)}
+
+    def post(self, user_id, title):
+        data = {'title': title, 'date': '2022-01-02', 'amount': 1000, 'description': '메모'}
+        return self.client.post('/expenses/new/', data, content_type='application/json',
+                                HTTP_Authorization=self.tokens[user_id])
+
+    def list_titles(self, user_id):
+        response = self.client.get('/expenses/', HTTP_Authorization=self.tokens[user_id])
+        return [expense['title'] for expense in response.json()['expenses']]
+
+    def test_writes_and_reads_user_shard(self):
+        self.assertEqual(sharding.get_shard(1), 'shard1')
+        self.assertEqual(sharding.get_shard(2), 'default')
+        self.assertEqual(self.post(1, '유저1 지출').status_code, 201)
+        self.assertEqual(self.post(2, '유저2 지출').status_code, 201)
+
+        self.assertEqual(list(Expense.objects.using('shard1').values_list('user_id', flat=True)), [1])
+        self.assertEqual(list(Expense.objects.using('default').values_list('user_id', flat=True)), [2])
+        self.assertTrue(LedgerVersion.objects.using('shard1').filter(user_id=1).exists())
+        self.assertEqual(self.list_titles(1), ['유저1 지출'])
+        self.assertEqual(self.list_titles(2), ['유저2 지출'])
+
+    def test_move_user(self):
+        for title in ('점심 식사', '커피', '택시비'):
+            self.post(1, title)
+        expense_id = Expense.objects.using('shard1').get(title='택시비').id
+        response = self.client.delete('/expenses/%d/' % expense_id, HTTP_Authorization=self.tokens[1])
+        self.assertEqual(response.status_code, 204)
+        etag = self.client.get('/expenses/', HTTP_Authorization=self.tokens[1])['ETag']
+        before = list(Expense.objects.using('shard1').order_by('id').values_list('id', 'title', 'created_at'))
+
+        self.assertEqual(sharding.move_user(1, 'default'), 'shard1')
+        self.assertEqual(sharding.get_shard(1), 'default')
+        self.assertEqual(list(Expense.objects.using('default').order_by('id').values_list('id', 'title', 'created_at')),
+                         before)
+        self.assertEqual(DeletedExpense.objects.using('default').filter(user_id=1).count(), 1)
+        self.assertEqual(MonthlySpending.objects.using('default').get(user_id=1).total, 2000)
+        self.assertEqual([row['title'] for row in search.search(1, '식사', 10)], ['점심 식사'])
+        response = self.client.get('/expenses/', HTTP_Authorization=self.tokens[1], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.list_titles(1), ['점심 식사', '커피'])
+
+        sharding.purge(1, 'shard1')
+        self.assertFalse(Expense.objects.using('shard1').exists())
+        self.assertFalse(LedgerVersion.objects.using('shard1').exists())
+        self.assertEqual(self.post(1, '이동 후').status_code, 201)
+        self.assertEqual(Expense.objects.using('default').filter(user_id=1).count(), 3)
+
+    def test_stale_shard_write_rejected(self):
+        sharding.shard_cache.set(1, 'default', tag=1)
+        response = self.post(1, '지연된 쓰기')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(Expense.objects.using('default').exists())
+
+        self.assertEqual(self.post(1, '다시 쓰기').status_code, 201)
+        self.assertEqual(Expense.objects.using('shard1').get().title, '다시 쓰기')
+
+    def test_other_users_rows_not_found_on_any_shard(self):
+        User.objects.create(id=3, email='test3@example.com', password='-')
+        self.assertEqual(sharding.get_shard(3), sharding.get_shard(1))
+        self.assertNotEqual(sharding.get_shard(2), sharding.get_shard(1))
+        self.tokens[3] = jwt.encode(payload={'user_id': 3}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+        for title in ('점심 식사', '커피'):
+            self.post(1, title)
+        expense_id, deleted_id = Expense.objects.using('shard1').order_by('id').values_list('id', flat=True)
+        self.client.delete('/expenses/%d/' % deleted_id, HTTP_Authorization=self.tokens[1])
+        deleted_id = DeletedExpense.objects.using('shard1').get().id
+        tag_id = self.client.post('/expenses/tags/', {'name': '식비'}, content_type='application/json',
+                                  HTTP_Authorization=self.tokens[1]).json()['tag']['id']
+
+        requests = [
+            ('get', '/expenses/%d/' % expense_id), ('put', '/expenses/%d/' % expense_id),
+            ('delete', '/expenses/%d/' % expense_id), ('get', '/expenses/deleted/%d/' % deleted_id),
+            ('delete', '/expenses/deleted/%d/' % deleted_id), ('put', '/expenses/tags/%d/' % tag_id),
+            ('delete', '/expenses/tags/%d/' % tag_id),
+        ]
+        for user_id in (2, 3):
+            for method, path in requests:
+                response = getattr(self.client, method)(path, {'title': '수정', 'name': '수정'},
+                                                        content_type='application/json',
+                                                        HTTP_Authorization=self.tokens[user_id])
+                self.assertEqual(response.status_code, 404, (user_id, method, path))
+        self.assertEqual(self.client.get('/expenses/%d/' % expense_id,
+                                         HTTP_Authorization=self.tokens[1]).json()['expense']['title'], '점심 식사')
+        self.assertEqual(DeletedExpense.objects.using('shard1').count(), 1)
+        self.assertTrue(Tag.objects.using('shard1').filter(id=tag_id, name='식비').exists())
+
+
+class ExpenseQueryPlanTest(TestCase):
+    """
+    지출내역 뷰 쿼리 실행계획(EXPLAIN) 회귀 테스트 클래스.
+
+    각 뷰가 실행하는 SELECT 쿼리의 실행계획을 확인하여
+    인덱스 탐색이 테이블 전체 스캔(table scan)이나 filesort 로 바뀌면 실패한다.
+    SQLite(로컬)와 MySQL(운영) 실행계획 형식을 모두 해석한다.
+    """
+
+    def setUp(self):
+        """Mock 데이터 세팅."""
+
+        User.objects.create(id=1, email='test1@example.com',
+                            password=bcrypt.hashpw('abc135!!'.encode('utf-8'), bcrypt.gensalt()).decode())
+
+        Expense.objects.bulk_create(
+            Expense(title='아파트관리비', date='2022-01-%02d' % i, user_id=1, id=i,
+                    amount=i * 1000, description='활성화 테이블') for i in range(1, 29))
+        DeletedExpense.objects.bulk_create(
+            DeletedExpense(title='아파트관리비', date='2022-01-%02d' % i, user_id=1, id=i,
+                           amount=i * 1000, description='삭제 테이블') for i in range(1, 29))
+
+        self.client = Client()
+        self.token = jwt.encode(payload={'user_id': 1}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
+
+    def explain(self, sql):
+        """쿼리 실행계획을 vendor 공통 형식(문자열 리스트)으로 반환한다."""
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN %s' % sql)
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute('EXPLAIN %s' % sql)
+            columns = [column[0] for column in cursor.description]
+            return ['%(table)s type=%(type)s key=%(key)s extra=%(Extra)s' % dict(zip(columns, row))
+                    for row in cursor.fetchall()]
+
+    def assertIndexedQueries(self, path, **params):
+        """`path` 요청 중 실행된 모든 SELECT 쿼리가 인덱스를 사용하는지 검사한다."""
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, params, HTTP_Authorization=self.token)
+        self.assertEqual(response.status_code, 200)
+
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            for step in self.explain(sql):
+                message = '%s\n-> %s' % (sql, step)
+                if connection.vendor == 'sqlite':
+                    self.assertIsNone(re.match(r'^SCAN \S+$', step), message)
+                    self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', step, message)
+                else:
+                    self.assertNotIn('type=ALL', step, message)
+                    self.assertNotIn('Using filesort', step, message)
+
+    def test_expense_list_plan(self):
+        self.assertIndexedQueries('/expenses/')
+
+    def test_expense_list_cursor_plan(self):
+        cursor = self.client.get('/expenses/', {'limit': 5}, HTTP_Authorization=self.token).json()['next']
+        self.assertIndexedQueries('/expenses/', limit=5, cursor=cursor)
+
+    def test_expense_list_date_plan(self):
+        self.assertIndexedQueries('/expenses/', date='2022-01-03')
+
+    def test_expense_list_due_plan(self):
+        self.assertIndexedQueries('/expenses/', **{'start-date': '2022-01-10', 'end-date': '2022-01-20'})
+
+    def test_expense_detail_plan(self):
+        self.assertIndexedQueries('/expenses/1/')
+
+    def test_deleted_expense_list_plan(self):
+        self.assertIndexedQueries('/expenses/deleted/')
+
+    def test_deleted_expense_detail_plan(self):
+        self.assertIndexedQueries('/expenses/deleted/1/')
@@ -5,7 +5,23 @@ from . import views
 urlpatterns = [
     path('', views.ExpenseListView.as_view()),
     path('new/', views.ExpenseNewView.as_view()),
+    path('bulk/', views.ExpenseBulkView.as_view()),
+    path('bulk-delete/', views.ExpenseBulkDeleteView.as_view()),
+    path('search/', views.ExpenseSearchView.as_view()),
+    path('summary/', views.ExpenseSummaryView.as_view()),
+    path('aggregate/', views.ExpenseAggregateView.as_view()),
+    path('tags/', views.TagListView.as_view()),
+    path('tags/<int:tag_id>/', views.TagDetailView.as_view()),
+    path('export/', views.ExpenseExportView.as_view()),
+    path('imports/', views.ExpenseImportView.as_view()),
+    path('imports/<int:import_id>/', views.ExpenseImportDetailView.as_view()),
+    path('imports/<int:import_id>/errors/', views.ExpenseImportErrorsView.as_view()),
+    path('jobs/', views.JobListView.as_view()),
+    path('jobs/<int:job_id>/', views.JobDetailView.as_view()),
+    path('jobs/<int:job_id>/cancel/', views.JobCancelView.as_view()),
+    path('jobs/<int:job_id>/file/', views.JobFileView.as_view()),
     path('<int:expense_id>/', views.ExpenseDetailView.as_view()),
     path('deleted/', views.DeletedExpenseListView.as_view()),
+    path('deleted/bulk-restore/', views.DeletedBulkRestoreView.as_view()),
     path('deleted/<int:d_expense_id>/', views.DeletedDetailView.as_view()),
 ]
@@ -1,19 +1,108 @@
+import datetime
+import itertools
 import json
+import os
 
 from json import JSONDecodeError
+from operator import itemgetter
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import transaction
 from django.db.models import Q
-from django.http import JsonResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.views import View
 
-from .models import Expense, DeletedExpense
+from . import aggregates, bulk, imports, jobs, ledger, search, sharding, tags
+from .models import Tag, Expense, DeletedExpense, DailySpending, MonthlySpending, ExpenseImport, Job
 
+from utils.conditional import make_etag, not_modified, set_validators
+from utils import export
 from utils.decorators import login_decorator
-from utils.validators import validate_expense
-from utils.exceptions import PermissionException, DataTypeException, DataTooLongException, InvalidValueException
+from utils.pagination import get_page_size, paginate
+from utils.responses import JsonResponse
+from utils.streaming import gzip_stream, is_streaming, iterate_rows, streaming_json_response
+from utils.validators import EXPENSE_SCHEMA, validate_expense
+from utils.exceptions import DataTypeException, DataTooLongException, InvalidValueException, \
+    DuplicationException, ServiceUnavailableException
+
+
+def filter_expenses(queryset, user_id, params):
+    """
+    지출내역 필터 함수.
+
+    키워드(keyword), 날짜(date), 기간(start-date, end-date), 태그(tag) 조건을 queryset 에 적용한다.
+    리스트 뷰(쿼리 파라미터)와 일괄 삭제･복원 뷰(JSON)에서 공통으로 사용한다.
+    활성 지출내역의 키워드 검색은 n-gram 색인을, 태그 조건은 (user_id, tag_id, date) 인덱스를 사용한다.
+
+    parameters
+    ----------
+    queryset: QuerySet (Expense or DeletedExpense)
+    user_id: int
+    params: dict-like
+        keyword: str
+        date: str (yyyy-mm-dd)
+        start-date: str (yyyy-mm-dd)
+        end-date: str (yyyy-mm-dd)
+        tag: int or str (tag id)
+
+    returns
+    -------
+    queryset: QuerySet
+    """
+
+    query = Q()
+    keyword = params.get('keyword', None)
+    date = params.get('date', None)
+    due_stt = params.get('start-date', None)
+    due_end = params.get('end-date', None)
+    tag = params.get('tag', None)
+
+    if tag:
+        try:
+            queryset = queryset.filter(tag_id=int(tag))
+        except ValueError:
+            raise InvalidValueException(message="'tag' must be an integer.")
+
+    if keyword:
+        if queryset.model is Expense:
+            queryset = search.filter_keyword(queryset, user_id, keyword)
+        else:
+            queryset = queryset.filter(Q(title__contains=keyword) | Q(description__contains=keyword))
+    if date:
+        query = Q(date=date)
+    if due_stt and due_end:
+        if due_stt > due_end:
+            raise InvalidValueException(message="'end-date' must greater than 'start-date'.")
+        query = Q(date__gte=due_stt) & Q(date__lte=due_end)
+    return queryset.filter(query)
+
+
+def get_bulk_queryset(queryset, user_id, data):
+    """
+    일괄 삭제･복원 대상 조회 함수.
+
+    id 리스트(ids) 또는 필터 조건(keyword, date, start-date, end-date, tag)으로 대상을 정한다.
+    실수로 전체 내역이 이동되지 않도록 둘 중 하나는 반드시 있어야 한다.
+    """
+
+    if type(data) != dict:
+        raise DataTypeException(message="request datatype must be <class 'dict'>.")
+    filters = {key: data[key] for key in ('keyword', 'date', 'start-date', 'end-date', 'tag') if data.get(key)}
+    for key, value in filters.items():
+        datatype = int if key == 'tag' else str
+        if type(value) != datatype:
+            raise DataTypeException(message="%s datatype must be %s." % (key, datatype))
+
+    queryset = queryset.filter(user_id=user_id)
+    if 'ids' in data:
+        ids = data['ids']
+        if type(ids) != list or any(type(pk) != int for pk in ids):
+            raise DataTypeException(message="ids datatype must be list of <class 'int'>.")
+        queryset = queryset.filter(id__in=ids)
+    elif not filters:
+        raise InvalidValueException(message="'ids' or filter is required.")
+    return filter_expenses(queryset, user_id, filters)
 
 
 class ExpenseListView(View):
@@ -32,7 +121,12 @@ class ExpenseListView(View):
         token decoding 값에 포함된 `user_id`와 매칭되는 지출 내역을 반환한다.
         인가 확인 동작은 `login_decorator`가 수행한다.
 
-        쿼리 파마리터를 조합하여 키워드(keyword), 날짜(date), 기간조회(due)를 수행할 수 있다.
+        쿼리 파마리터를 조합하여 키워드(keyword), 날짜(date), 기간조회(due), 태그(tag)로 조회할 수 있다.
+        결과는 (date, id) 순으로 정렬되며 커서(cursor) 기반으로 페이지를 나눈다.
+        응답의 `next` 값을 다음 요청의 `cursor`로 전달하면 다음 페이지를 조회한다.
+        `stream` 파라미터를 주면 페이지 없이 전체 결과를 스트리밍 응답으로 반환한다.
+        ETag 는 유저의 가계부 버전(`ledger.get_version`)이며, If-None-Match 가 일치하면
+        리스트 조회 없이 304 를 반환한다.
 
         parameter
         ---------
@@ -42,6 +136,10 @@ class ExpenseListView(View):
             date: str (yyyy-mm-dd)
             start-date: str (yyyy-mm-dd)
             end-date: str (yyyy-mm-dd)
+            tag: int (tag id)
+            limit: int (default: 100, max: 1000)
+            cursor: str
+            stream: bool (1 or true)
 
         returns
         -------
@@ -50,33 +148,30 @@ class ExpenseListView(View):
             date: str (yyyy-mm-dd)
             title: str
             amount: int
+            next: str or null
             status code:
                 200: success
+                304: not modified (If-None-Match)
                 400: failure
                 401: authorization error
                 405: not allowed method
         """
 
         try:
-            query = Q()
-            queryset = Expense.objects.filter(user_id=request.user.id)
-            keyword = request.GET.get('keyword', None)
-            date = request.GET.get('date', None)
-            due_stt = request.GET.get('start-date', None)
-            due_end = request.GET.get('end-date', None)
+            version, last_modified = ledger.get_version(request.user.id)
+            etag = make_etag('expenses', request.user.id, version)
+            response = not_modified(request, etag, last_modified)
+            if response:
+                return response
 
-            if keyword:
-                query = Q(title__contains=keyword)
-            if date:
-                query = Q(date=date)
-            if due_stt and due_end:
-                if due_stt < due_end:
-                    raise InvalidValueException(message="'end-date' must greater than 'start-date'.")
-                query = Q(date__gte=due_stt) & Q(date__lte=due_end)
-
-            expenses = queryset.filter(query)
-            expenses = [expense for expense in expenses.values('id', 'date', 'title', 'amount')]
-            return JsonResponse({"expenses": expenses}, status=200)
+            queryset = filter_expenses(Expense.objects.filter(user_id=request.user.id), request.user.id, request.GET)
+            if is_streaming(request):
+                response = streaming_json_response('expenses', queryset.order_by('date', 'id'),
+                                                   ('id', 'date', 'title', 'amount'), extra={'next': None})
+            else:
+                expenses, next_cursor = paginate(queryset, request, ('id', 'date', 'title', 'amount'))
+                response = JsonResponse({"expenses": expenses, "next": next_cursor}, status=200)
+            return set_validators(response, etag, last_modified)
 
         except InvalidValueException as e:
             return JsonResponse({"error": e.message}, status=e.status)
@@ -106,6 +201,7 @@ class ExpenseNewView(View):
             title: str
             amount: int (positive)
             description: str
+            tag: int or null (tag id, optional)
 
         returns
         -------
@@ -117,32 +213,127 @@ class ExpenseNewView(View):
                 401: authorization error
                 405: not allowed method
                 413: data too long
+                503: ledger is being moved (Retry-After)
         """
 
         try:
             data = json.loads(request.body)
             data = validate_expense(data)
-            Expense.objects.create(user_id=request.user.id, title=data['title'], date=data['date'],
-                                   amount=data['amount'], description=data['description'])
+            if data.get('tag') is not None:
+                tags.check_tag(request.user.id, data['tag'])
+            with sharding.atomic(request.user.id):
+                expense = Expense.objects.create(user_id=request.user.id, title=data['title'], date=data['date'],
+                                                 amount=data['amount'], description=data['description'],
+                                                 tag_id=data.get('tag'))
+                ledger.expenses_added(request.user.id, [expense])
             return JsonResponse({"message": "new expense created successfully."}, status=201)
+        except ServiceUnavailableException as e:
+            response = JsonResponse({"error": e.message}, status=e.status)
+            response['Retry-After'] = e.retry_after
+            return response
         except JSONDecodeError:
             return JsonResponse({"error": "invalid json."}, status=400)
         except DataTypeException as e:
             return JsonResponse({"error": e.message}, status=e.status)
         except DataTooLongException as e:
             return JsonResponse({"error": e.message}, status=e.status)
-        except TypeError:
-            return JsonResponse({"error": "date format must be 'yyyy-mm-dd'."}, status=400)
+        except InvalidValueException as e:
+            return JsonResponse({"error": e.message}, status=e.status)
         except KeyError as e:
             return JsonResponse({"error": "%s is required." % e}, status=400)
 
 
+class ExpenseBulkView(View):
+    """
+    가계부 지출내역 일괄등록 뷰.
+
+    유효한 인가 token 보유자에 한하여 여러 지출내역을 한 번의 요청으로 등록할 수 있다.
+    오프라인에서 작성된 지출내역 동기화 등에 사용한다.
+    """
+
+    max_size = getattr(settings, 'EXPENSE_BULK_MAX_SIZE', 1000)
+    chunk_size = getattr(settings, 'EXPENSE_BULK_CHUNK_SIZE', 500)
+
+    @login_decorator
+    def post(self, request):
+        """
+        일괄등록 뷰 함수.
+
+        json 배열을 받아 모든 항목의 유효성을 검사한 뒤 유효한 항목을 하나의 트랜잭션에서
+        chunk 단위 `bulk_create`로 저장한다. 결과는 입력 순서(index)별로 반환한다.
+
+        parameters
+        ----------
+        request: list of JSON (max: 1000)
+            date: str (yyyy-mm-dd)
+            title: str
+            amount: int (positive)
+            description: str
+            tag: int or null (tag id, optional)
+
+        returns
+        -------
+        JsonResponse: JSON
+            created: int
+            failed: int
+            results: list of JSON
+                index: int
+                status: int (201 or 4xx)
+                error: str (failure only)
+            status code:
+                201: success (one or more created)
+                400: failure
+                401: authorization error
+                405: not allowed method
+                413: too many expenses
+                503: ledger is being moved (Retry-After)
+        """
+
+        try:
+            data = json.loads(request.body)
+            if type(data) != list:
+                raise DataTypeException(message="request datatype must be <class 'list'>.")
+            if len(data) > self.max_size:
+                raise DataTooLongException(message="too many expenses. (max: %d)" % self.max_size)
+
+            valid, errors = EXPENSE_SCHEMA.validate_many(data)
+            missing = tags.check_tags(request.user.id, (values.get('tag') for _, values in valid))
+            if missing:
+                errors += [(index, InvalidValueException(message="tag 'id: %d' does not exist." % values['tag']))
+                           for index, values in valid if values.get('tag') in missing]
+                valid = [(index, values) for index, values in valid if values.get('tag') not in missing]
+            expenses = [Expense(user_id=request.user.id, tag_id=values.pop('tag', None), **values)
+                        for _, values in valid]
+            results = [{"index": index, "status": 201} for index, _ in valid]
+            results += [{"index": index, "status": e.status, "error": e.message} for index, e in errors]
+            results.sort(key=itemgetter('index'))
+
+            if expenses:
+                with sharding.atomic(request.user.id):
+                    bulk.insert_expenses(request.user.id, expenses, self.chunk_size)
+
+            created = len(expenses)
+            return JsonResponse({"created": created, "failed": len(results) - created, "results": results},
+                                status=201 if created else 400)
+        except ServiceUnavailableException as e:
+            response = JsonResponse({"error": e.message}, status=e.status)
+            response['Retry-After'] = e.retry_after
+            return response
+        except JSONDecodeError:
+            return JsonResponse({"error": "invalid json."}, status=400)
+        except DataTypeException as e:
+            return JsonResponse({"error": e.message}, status=e.status)
+        except DataTooLongException as e:
+            return JsonResponse({"error": e.message}, status=e.status)
+
+
 class ExpenseDetailView(View):
     """
     가계부 지출내역 상세 뷰.
 
     유효한 인가 token 보유자에 한하여 본인이 작성한 지출 상세내역을
     조회(get)･수정(put)･삭제(delete) 할 수 있다.
+    다른 유저의 내역은 샤드 배치와 관계없이 없는 내역과 같이 404 를 반환한다.
     """
 
     @login_decorator
@@ -152,6 +343,7 @@ class ExpenseDetailView(View):
 
         지출내역 id(expense_id)를 path parameter로 한다.
         token decoding 값에 포함된 `user_id`와 매칭되는 경우에만 지출 내역을 반환한다.
+        ETag 는 `updated_at`으로 만들며, If-None-Match 가 일치하면 직렬화 없이 304 를 반환한다.
 
         parameters
         ----------
@@ -167,25 +359,25 @@ class ExpenseDetailView(View):
             title: str
             amount: int (positive)
             description: str
+            tag_id: int or null
             created_at: datetime
             updated_at: datetime
             status code:
                 200: success
+                304: not modified (If-None-Match)
                 400: failure
                 401: authorization error
-                403: permission error
-                404: page not found
+                404: page not found (다른 유저의 것 포함)
                 405: not allowed method
         """
 
-        try:
-            expense = get_object_or_404(Expense, id=expense_id)
-            if expense.user_id == request.user.id:
-                expense = expense.get_expense(request)
-                return JsonResponse({"expense": expense}, status=200)
-            raise PermissionException
-        except PermissionException as e:
-            return JsonResponse({"error": e.message}, status=e.status)
+        expense = get_object_or_404(Expense, id=expense_id, user_id=request.user.id)
+        etag = make_etag(expense.id, int(expense.updated_at.timestamp() * 1000000))
+        response = not_modified(request, etag, expense.updated_at)
+        if response:
+            return response
+        expense = expense.get_expense(request)
+        return set_validators(JsonResponse({"expense": expense}, status=200), etag, expense['updated_at'])
 
     @login_decorator
     def put(self, request, expense_id):
@@ -202,6 +394,7 @@ class ExpenseDetailView(View):
             title: str
             amount: int (positive)
             description: str
+            tag: int or null (tag id, null 이면 태그를 비운다)
         expense_id: int
 
         returns
@@ -212,31 +405,36 @@ class ExpenseDetailView(View):
                 200: success
                 400: failure
                 401: authorization error
-                403: permission error
-                404: page not found
+                404: page not found (다른 유저의 것 포함)
                 405: not allowed method
                 413: data too long
+                503: ledger is being moved (Retry-After)
             updated_at: datetime
         """
 
         try:
-            expense = get_object_or_404(Expense, id=expense_id)
-            if expense.user_id == request.user.id:
-                data = json.loads(request.body)
-                data = validate_expense(data)
+            expense = get_object_or_404(Expense, id=expense_id, user_id=request.user.id)
+            data = json.loads(request.body)
+            data = validate_expense(data, partial=True)
+            if data.get('tag') is not None:
+                tags.check_tag(request.user.id, data['tag'])
+            with sharding.atomic(request.user.id):
+                old_date, old_amount, old_tag_id = expense.date, expense.amount, expense.tag_id
                 expense.edit_expense(data)
-                return JsonResponse({"message": "'id: %d' modified successfully." % expense_id}, status=200)
-            raise PermissionException
+                ledger.expense_edited(request.user.id, expense, old_date, old_amount, old_tag_id)
+            return JsonResponse({"message": "'id: %d' modified successfully." % expense_id}, status=200)
+        except ServiceUnavailableException as e:
+            response = JsonResponse({"error": e.message}, status=e.status)
+            response['Retry-After'] = e.retry_after
+            return response
         except JSONDecodeError:
             return JsonResponse({"error": "invalid json."}, status=400)
-        except PermissionException as e:
-            return JsonResponse({"error": e.message}, status=e.status)
         except DataTypeException as e:
             return JsonResponse({"error": e.message}, status=e.status)
         except DataTooLongException as e:
             return JsonResponse({"error": e.message}, status=e.status)
-        except TypeError:
-            return JsonResponse({"error": "date format must be 'yyyy-mm-dd'."}, status=400)
+        except InvalidValueException as e:
+            return JsonResponse({"error": e.message}, status=e.status)
         except KeyError as e:
             return JsonResponse({"error": "%s is required." % e}, status=400)
 
@@ -260,52 +458,111 @@ class ExpenseDetailView(View):
         status_code:
             204: success (no content)
             401: authorization error
-            403: permission error
-            404: page not found
+            404: page not found (다른 유저의 것 포함)
             405: not allowed method
+            503: ledger is being moved (Retry-After)
+        """
+
+        try:
+            expense = get_object_or_404(Expense, id=expense_id, user_id=request.user.id)
+            with sharding.atomic(request.user.id):
+                d_expense = DeletedExpense(user_id=expense.user_id, title=expense.title, date=expense.date,
+                                           amount=expense.amount, description=expense.description,
+                                           tag_id=expense.tag_id, created_at=expense.created_at,
+                                           updated_at=expense.updated_at)
+                d_expense.save()
+                ledger.expenses_removed(request.user.id, [expense.id],
+                                        [(expense.date, -expense.amount, -1, expense.tag_id)])
+                expense.delete()
+                return JsonResponse({"message": "'id: %d' removed successfully." % expense_id}, status=204)
+        except ServiceUnavailableException as e:
+            response = JsonResponse({"error": e.message}, status=e.status)
+            response['Retry-After'] = e.retry_after
+            return response
+
+
+class ExpenseBulkDeleteView(View):
+    """
+    가계부 지출내역 일괄삭제 뷰.
+
+    유효한 인가 token 보유자에 한하여 본인이 작성한 지출내역을 id 리스트 또는 필터 조건으로 일괄 삭제한다.
+    삭제된 내역은 백업 테이블(deleted_expenses)로 이동한다.
+    """
+
+    @login_decorator
+    def post(self, request):
+        """
+        일괄삭제 뷰 함수.
+
+        parameters
+        ----------
+        request: JSON
+            ids: list of int
+            or
+            keyword: str
+            date: str (yyyy-mm-dd)
+            start-date: str (yyyy-mm-dd)
+            end-date: str (yyyy-mm-dd)
+            tag: int (tag id)
+
+        returns
+        -------
+        JsonResponse: JSON
+            message: str
+            count: int
+            status code:
+                200: success
+                400: failure
+                401: authorization error
+                405: not allowed method
+                503: ledger is being moved (Retry-After)
         """
 
         try:
-            expense = get_object_or_404(Expense, id=expense_id)
-            if expense.user_id == request.user.id:
-                with transaction.atomic():
-                    d_expense = DeletedExpense(user_id=expense.user_id, title=expense.title,
-                                               amount=expense.amount, description=expense.description,
-                                               created_at=expense.created_at, updated_at=expense.updated_at)
-                    d_expense.save()
-                    expense.delete()
-                    return JsonResponse({"message": "'id: %d' removed successfully." % expense_id}, status=204)
-            raise PermissionException
-        except PermissionException as e:
+            data = json.loads(request.body)
+            queryset = get_bulk_queryset(Expense.objects.all(), request.user.id, data)
+            count = bulk.soft_delete(request.user.id, queryset)
+            return JsonResponse({"message": "%d expenses removed successfully." % count, "count": count}, status=200)
+        except ServiceUnavailableException as e:
+            response = JsonResponse({"error": e.message}, status=e.status)
+            response['Retry-After'] = e.retry_after
+            return response
+        except JSONDecodeError:
+            return JsonResponse({"error": "invalid json."}, status=400)
+        except (DataTypeException, InvalidValueException) as e:
             return JsonResponse({"error": e.message}, status=e.status)
+        except ValidationError as e:
+            return JsonResponse({"error": "%s" % e}, status=400)
 
 
-class DeletedExpenseListView(View):
+class ExpenseSearchView(View):
     """
-    삭제된 지출내역 리스트 뷰.
+    가계부 지출내역 검색 뷰.
 
-    유효한 인가 token 보유자에 한하여 본인이 삭제한 지출내역을 출력한다.
+    유효한 인가 token 보유자에 한하여 본인이 작성한 지출내역을 키워드로 검색한다.
+    제목(title)･메모(description)의 n-gram 색인을 사용하며 관련도 순으로 출력한다.
     """
 
     @login_decorator
     def get(self, request):
         """
-        삭제 리스트 뷰 함수.
-
-        token decoding 값에 포함된 `user_id`와 매칭되는 삭제된 지출 내역을 반환한다.
-        인가 확인 동작은 `login_decorator`가 수행한다.
+        검색 뷰 함수.
 
         parameters
         ----------
         request: nothing.
+        query parameters
+            keyword: str (required)
+            limit: int (default: 100, max: 1000)
 
         returns
         -------
         JsonResponse: list of JSON
             id: int
-            date: str(datetime)
+            date: str (yyyy-mm-dd)
             title: str
             amount: int
+            score: int
             status code:
                 200: success
                 400: failure
@@ -313,97 +570,965 @@ class DeletedExpenseListView(View):
                 405: not allowed method
         """
 
-        d_expenses = DeletedExpense.objects.filter(user_id=request.user.id)
-        d_expenses = [d_expense for d_expense in d_expenses.values('id', 'date', 'title', 'amount')]
-        return JsonResponse({"deleted_expenses": d_expenses}, status=200)
+        try:
+            keyword = request.GET.get('keyword', '').strip()
+            if not keyword:
+                raise InvalidValueException(message="'keyword' is required.")
+            expenses = search.search(request.user.id, keyword, get_page_size(request))
+            return JsonResponse({"expenses": expenses}, status=200)
+        except InvalidValueException as e:
+            return JsonResponse({"error": e.message}, status=e.status)
 
 
-class DeletedDetailView(View):
+class ExpenseSummaryView(View):
     """
-    삭제된 지출내역 상세 뷰.
+    가계부 지출 합계 뷰.
 
-    유효한 인가 token 보유자에 한하여 본인이 삭제한 지출 상세내역을
-    조회(get)･삭제(=복원, delete) 할 수 있다.
+    유효한 인가 token 보유자에 한하여 본인의 일별･월별 지출 합계와 건수를 출력한다.
+    지출내역 변경 시 갱신되는 집계(rollup) 테이블을 조회하므로 비용은 지출내역 수가 아닌 기간(bucket) 수에 비례한다.
     """
 
+    periods = {
+        'daily'  : (DailySpending, 'date'),
+        'monthly': (MonthlySpending, 'month'),
+    }
+
     @login_decorator
-    def get(self, request, d_expense_id):
+    def get(self, request):
         """
-        삭제 상세조회 뷰 함수.
-
-        지출내역 id(expense_id)를 path parameter로 한다.
-        token decoding 값에 포함된 `user_id`와 매칭되는 경우에만 지출 내역을 반환한다.
+        합계 뷰 함수.
 
         parameters
         ----------
         request: nothing.
-        d_expense_id: int
+        query parameters
+            period: str (daily or monthly, default: daily)
+            start-date: str (yyyy-mm-dd)
+            end-date: str (yyyy-mm-dd)
 
         returns
         -------
         JsonResponse: JSON
-            id: int
-            owner_id: int
-            date: str (yyyy-mm-dd)
-            title: str
-            amount: int (positive)
-            description: str
-            created_at: datetime
-            updated_at: datetime
-            deleted_at: datetime
+            period: str
+            summary: list of JSON
+                date: str (yyyy-mm-dd) (daily)
+                month: str (yyyy-mm) (monthly)
+                total: int
+                count: int
             status code:
                 200: success
                 400: failure
                 401: authorization error
-                403: permission error
-                404: page not found
                 405: not allowed method
         """
 
         try:
-            d_expense = get_object_or_404(DeletedExpense, id=d_expense_id)
-            if d_expense.user_id == request.user.id:
-                d_expense = d_expense.get_expense(request)
-                return JsonResponse({"deleted_expense": d_expense}, status=200)
-            raise PermissionException
-        except PermissionException as e:
+            period = request.GET.get('period', 'daily')
+            if period not in self.periods:
+                raise InvalidValueException(message="'period' must be one of %s." % ', '.join(self.periods))
+            model, key = self.periods[period]
+
+            due_stt = request.GET.get('start-date', None)
+            due_end = request.GET.get('end-date', None)
+            queryset = model.objects.filter(user_id=request.user.id, count__gt=0)
+            if due_stt:
+                due_stt = datetime.date.fromisoformat(due_stt)
+                queryset = queryset.filter(**{'%s__gte' % key: due_stt.replace(day=1) if key == 'month' else due_stt})
+            if due_end:
+                queryset = queryset.filter(**{'%s__lte' % key: datetime.date.fromisoformat(due_end)})
+
+            summary = [
+                {key: bucket.strftime('%Y-%m') if key == 'month' else bucket, 'total': total, 'count': count}
+                for bucket, total, count in queryset.order_by(key).values_list(key, 'total', 'count')
+            ]
+            return JsonResponse({"period": period, "summary": summary}, status=200)
+        except InvalidValueException as e:
             return JsonResponse({"error": e.message}, status=e.status)
+        except ValueError:
+            return JsonResponse({"error": "date format must be 'yyyy-mm-dd'."}, status=400)
+
+
+class ExpenseAggregateView(View):
+    """
+    가계부 지출 기간별 집계 뷰.
+
+    유효한 인가 token 보유자에 한하여 임의 기간의 일･주･월･연 단위 합계, 건수, 평균, 최솟값, 최댓값과
+    선택한 백분위(중앙값 등)를 출력한다. 집계는 DB(GROUP BY)와 NumPy 에서 수행하며(`aggregates`),
+    결과는 열 이름(fields)과 bucket 별 값 배열로 반환한다.
+    ETag 는 유저의 가계부 버전(`ledger.get_version`)이다.
+    """
 
     @login_decorator
-    def delete(self, request, d_expense_id):
+    def get(self, request):
         """
-        삭제(=복원) 뷰 함수.
+        집계 뷰 함수.
 
-        지출내역 id(expense_id)를 path parameter로 한다.
-        token decoding 값에 포함된 `user_id`와 매칭되는 경우에만 삭제할 수 있다.
-        삭제 시 지출내역 테이블(expenses)에 복원 후 삭제된다.
+        parameters
+        ----------
+        request: nothing.
+        query parameters
+            period: str (day, week, month or year, default: month)
+            start-date: str (yyyy-mm-dd)
+            end-date: str (yyyy-mm-dd)
+            keyword: str
+            percentiles: str (예: 50,90,99, 50 은 중앙값)
+
+        returns
+        -------
+        JsonResponse: JSON
+            period: str
+            fields: list of str (bucket, total, count, avg, min, max, p<백분위>...)
+            buckets: list of list
+                bucket: str (yyyy-mm-dd, 기간의 첫 날)
+            status code:
+                200: success
+                304: not modified (If-None-Match)
+                400: failure
+                401: authorization error
+                405: not allowed method
+        """
+
+        try:
+            options = aggregates.get_options(request.GET)
+            version, last_modified = ledger.get_version(request.user.id)
+            etag = make_etag('aggregate', request.user.id, version)
+            response = not_modified(request, etag, last_modified)
+            if response:
+                return response
+
+            queryset = filter_expenses(Expense.objects.filter(user_id=request.user.id), request.user.id,
+                                       {'keyword': request.GET.get('keyword')})
+            fields, buckets = aggregates.aggregate(queryset, options)
+            response = JsonResponse({"period": options['period'], "fields": fields, "buckets": buckets}, status=200)
+            return set_validators(response, etag, last_modified)
+        except InvalidValueException as e:
+            return JsonResponse({"error": e.message}, status=e.status)
+
+
+class TagListView(View):
+    """
+    가계부 태그 뷰.
+
+    유효한 인가 token 보유자에 한하여 본인의 태그(지출 분류)를 조회(get)･생성(post) 할 수 있다.
+    조회 시 태그별 월 지출 합계를 함께 출력하며, 지출내역 변경 시 갱신되는 태그별 월별 집계 테이블을 조회한다.
+    """
+
+    @login_decorator
+    def get(self, request):
+        """
+        태그 목록 뷰 함수.
 
         parameters
         ----------
         request: nothing.
-        d_expense_id: int
+        query parameters
+            month: str (yyyy-mm, default: 이번 달)
 
         returns
         -------
-        message: str
-        status_code:
-            204: success (no content)
-            401: authorization error
-            403: permission error
-            404: page not found
-            405: not allowed method
+        JsonResponse: JSON
+            month: str (yyyy-mm)
+            tags: list of JSON
+                id: int
+                name: str
+                total: int (월 지출 합계)
+                count: int (월 지출 건수)
+            status code:
+                200: success
+                400: failure
+                401: authorization error
+                405: not allowed method
+        """
+
+        try:
+            month = tags.parse_month(request.GET.get('month'))
+            totals = tags.monthly_totals(request.user.id, month)
+            result = []
+            for tag in Tag.objects.filter(user_id=request.user.id).order_by('name'):
+                total, count = totals.get(tag.id, (0, 0))
+                result.append(dict(tag.get_tag(), total=total, count=count))
+            return JsonResponse({"month": month.strftime('%Y-%m'), "tags": result}, status=200)
+        except InvalidValueException as e:
+            return JsonResponse({"error": e.message}, status=e.status)
+
+    @login_decorator
+    def post(self, request):
+        """
+        태그 생성 뷰 함수.
+
+        parameters
+        ----------
+        request: JSON
+            name: str (max: 30, 유저별로 유일)
+
+        returns
+        -------
+        JsonResponse: JSON
+            tag: JSON
+                id: int
+                name: str
+            status code:
+                201: success
+                400: failure (duplicated name, too many tags)
+                401: authorization error
+                405: not allowed method
+                413: data too long
+                503: ledger is being moved (Retry-After)
         """
 
         try:
-            d_expense = get_object_or_404(DeletedExpense, id=d_expense_id)
-            if d_expense.user_id == request.user.id:
-                with transaction.atomic():
-                    r_expense = Expense(user_id=d_expense.user_id, title=d_expense.title,
-                                        amount=d_expense.amount, description=d_expense.description,
-                                        created_at=d_expense.created_at, updated_at=d_expense.updated_at)
-                    r_expense.save()
-                    d_expense.delete()
-                    return JsonResponse({"message": "'id: %d' recovered successfully." % d_expense_id}, status=204)
-            raise PermissionException
-        except PermissionException as e:
+            data = json.loads(request.body)
+            if type(data) != dict:
+                raise DataTypeException(message="request datatype must be <class 'dict'>.")
+            tag = tags.create_tag(request.user.id, data.get('name'))
+            return JsonResponse({"tag": tag.get_tag()}, status=201)
+        except ServiceUnavailableException as e:
+            response = JsonResponse({"error": e.message}, status=e.status)
+            response['Retry-After'] = e.retry_after
+            return response
+        except JSONDecodeError:
+            return JsonResponse({"error": "invalid json."}, status=400)
+        except (DataTypeException, DataTooLongException, InvalidValueException, DuplicationException) as e:
             return JsonResponse({"error": e.message}, status=e.status)
+
+
+class TagDetailView(View):
+    """
+    가계부 태그 상세 뷰.
+
+    유효한 인가 token 보유자에 한하여 본인의 태그 이름을 수정(put)하거나 삭제(delete) 할 수 있다.
+    """
+
+    @login_decorator
+    def put(self, request, tag_id):
+        """
+        태그 이름 수정 뷰 함수.
+
+        parameters
+        ----------
+        request: JSON
+            name: str
+        tag_id: int
+
+        returns
+        -------
+        JsonResponse: JSON
+            tag: JSON
+            status code:
+                200: success
+                400: failure
+                401: authorization error
+                404: page not found (다른 유저의 것 포함)
+                405: not allowed method
+                413: data too long
+        """
+
+        try:
+            tag = get_object_or_404(Tag, id=tag_id, user_id=request.user.id)
+            data = json.loads(request.body)
+            if type(data) != dict:
+                raise DataTypeException(message="request datatype must be <class 'dict'>.")
+            tags.rename_tag(tag, data.get('name'))
+            return JsonResponse({"tag": tag.get_tag()}, status=200)
+        except JSONDecodeError:
+            return JsonResponse({"error": "invalid json."}, status=400)
+        except (DataTypeException, DataTooLongException, InvalidValueException, DuplicationException) as e:
+            return JsonResponse({"error": e.message}, status=e.status)
+
+    @login_decorator
+    def delete(self, request, tag_id):
+        """
+        태그 삭제 뷰 함수.
+
+        태그가 지정된 지출내역･삭제내역은 태그 없음으로 바뀐다. (`tags.delete_tag`)
+
+        parameters
+        ----------
+        request: nothing.
+        tag_id: int
+
+        returns
+        -------
+        message: str
+        status_code:
+            204: success (no content)
+            401: authorization error
+            404: page not found (다른 유저의 것 포함)
+            405: not allowed method
+            503: ledger is being moved (Retry-After)
+        """
+
+        try:
+            tag = get_object_or_404(Tag, id=tag_id, user_id=request.user.id)
+            tags.delete_tag(tag)
+            return JsonResponse({"message": "'id: %d' removed successfully." % tag_id}, status=204)
+        except ServiceUnavailableException as e:
+            response = JsonResponse({"error": e.message}, status=e.status)
+            response['Retry-After'] = e.retry_after
+            return response
+
+
+# 내보내기 형식 → (인코딩 함수, content type, 확장자)
+EXPORT_FORMATS = {
+    'csv'     : (export.stream_csv, 'text/csv; charset=utf-8', 'csv'),
+    'columnar': (export.stream_columnar, 'application/x-ndjson; charset=utf-8', 'ndjson'),
+}
+EXPORT_SCOPES = ('active', 'deleted', 'all')
+EXPORT_FIELDS = ('id', 'date', 'title', 'amount', 'description', 'created_at', 'updated_at')
+
+
+def get_export_rows(user_id, params):
+    """
+    내보내기 행 조회 함수.
+
+    형식(format)･범위(scope)･필터를 검사하고 내보낼 행을 (date, id) 순으로 읽는 iterator 를 만든다.
+    scope 가 all 이면 활성 내역 뒤에 삭제된 내역을 이어서 반환하며 status 열로 구분한다.
+    내보내기 뷰와 내보내기 작업(`jobs`)에서 공통으로 사용한다.
+
+    parameters
+    ----------
+    user_id: int
+    params: dict-like (format, scope, keyword, date, start-date, end-date)
+
+    returns
+    -------
+    (fields, rows, querysets): (tuple of str, iterator of tuple, list of QuerySet)
+    """
+
+    if params.get('format', 'csv') not in EXPORT_FORMATS:
+        raise InvalidValueException(message="'format' must be one of %s." % ', '.join(EXPORT_FORMATS))
+    scope = params.get('scope', 'active')
+    if scope not in EXPORT_SCOPES:
+        raise InvalidValueException(message="'scope' must be one of %s." % ', '.join(EXPORT_SCOPES))
+    for key in ('date', 'start-date', 'end-date'):
+        if params.get(key):
+            datetime.date.fromisoformat(params[key])
+
+    parts, querysets = [], []
+    for model, name in ((Expense, 'active'), (DeletedExpense, 'deleted')):
+        if scope in (name, 'all'):
+            queryset = filter_expenses(model.objects.filter(user_id=user_id), user_id, params).order_by('date', 'id')
+            fields = EXPORT_FIELDS if model is Expense else EXPORT_FIELDS + ('deleted_at',)
+            parts.append(iterate_rows(queryset, fields))
+            querysets.append(queryset)
+
+    if scope == 'all':
+        active, deleted = parts
+        fields = ('status',) + EXPORT_FIELDS + ('deleted_at',)
+        rows = itertools.chain((('active',) + row + (None,) for row in active), (('deleted',) + row for row in deleted))
+    else:
+        fields = EXPORT_FIELDS if scope == 'active' else EXPORT_FIELDS + ('deleted_at',)
+        rows = parts[0]
+    return fields, rows, querysets
+
+
+class ExpenseExportView(View):
+    """
+    가계부 지출내역 내보내기 뷰.
+
+    유효한 인가 token 보유자에 한하여 본인의 지출내역 전체를 CSV 또는 열(column) 단위 형식으로 내려받는다.
+    """
+
+    @login_decorator
+    def get(self, request):
+        """
+        내보내기 뷰 함수.
+
+        리스트 뷰와 같은 필터를 적용한 지출내역을 (date, id) 순으로 페이지 없이 스트리밍한다. (`get_export_rows`)
+        서버 측 커서로 chunk 단위 조회･인코딩하므로 내역 수와 관계없이 메모리 사용량이 일정하다.
+        Accept-Encoding 에 gzip 이 있으면 응답을 gzip 으로 압축하면서 전송한다.
+        scope 가 all 이면 활성 내역 뒤에 삭제된 내역을 이어서 반환하며 status 열로 구분한다.
+        내보낸 파일을 나중에 내려받으려면 내보내기 작업(`/expenses/jobs/`, kind=export)을 사용한다.
+
+        parameters
+        ----------
+        request: nothing.
+        query parameters
+            format: str (csv or columnar, default: csv)
+            scope: str (active, deleted or all, default: active)
+            keyword: str
+            date: str (yyyy-mm-dd)
+            start-date: str (yyyy-mm-dd)
+            end-date: str (yyyy-mm-dd)
+
+        returns
+        -------
+        StreamingHttpResponse: CSV or NDJSON (attachment)
+            (status), id, date, title, amount, description, created_at, updated_at, (deleted_at)
+            status code:
+                200: success
+                400: failure
+                401: authorization error
+                405: not allowed method
+        """
+
+        try:
+            fields, rows, _ = get_export_rows(request.user.id, request.GET)
+            encode, content_type, extension = EXPORT_FORMATS[request.GET.get('format', 'csv')]
+            response = StreamingHttpResponse(encode(rows, fields), content_type=content_type)
+            response['Content-Disposition'] = 'attachment; filename="expenses-%s.%s"' % (
+                request.GET.get('scope', 'active'), extension)
+            return gzip_stream(request, response)
+        except InvalidValueException as e:
+            return JsonResponse({"error": e.message}, status=e.status)
+        except ValueError:
+            return JsonResponse({"error": "date format must be 'yyyy-mm-dd'."}, status=400)
+
+
+class ExpenseImportView(View):
+    """
+    가계부 지출내역 가져오기 뷰.
+
+    유효한 인가 token 보유자에 한하여 CSV 파일(가계부 앱･은행 거래내역 등)의 지출내역을 등록할 수 있다.
+    """
+
+    max_size = getattr(settings, 'EXPENSE_IMPORT_MAX_SIZE', 100 * 1024 * 1024)
+
+    @login_decorator
+    def post(self, request):
+        """
+        가져오기 뷰 함수.
+
+        multipart 로 업로드한 CSV 파일을 저장하고 가져오기 작업(`jobs`, kind=import)을 등록한다.
+        작업자가 파일을 한 줄씩 읽어 검사(`validate_expense`)하고 EXPENSE_IMPORT_CHUNK_SIZE 행마다 저장하며
+        (`expenses.imports.run`), 검사에 실패한 줄은 건너뛰고 오류 파일(errors)에 기록한다.
+        진행률은 가져오기 상세 뷰 또는 작업 상세 뷰에서 조회한다.
+
+        parameters
+        ----------
+        request: multipart/form-data
+            file: CSV file (max: 100MB, 첫 줄은 열 이름)
+            encoding: str (default: utf-8, 예: cp949)
+            delimiter: str (',', ';', '|' or 'tab', default: ',')
+            date-column: str (default: date, yyyy-mm-dd, yyyy.mm.dd, yyyy/mm/dd, yyyymmdd)
+            title-column: str (default: title)
+            amount-column: str (default: amount, 예: 12,000원)
+            description-column: str (default: description, optional)
+
+        returns
+        -------
+        JsonResponse: JSON
+            import: JSON
+                id: int
+                filename: str
+                status: str (pending, running, done or failed)
+                size: int
+                processed_bytes: int
+                progress: float (%)
+                lines: int
+                imported: int
+                failed: int
+                error: str (failed only)
+                errors: str (error file url, null if no failed lines)
+                created_at: datetime
+                finished_at: datetime
+            job: JSON (작업 상세 뷰와 같다)
+            status code:
+                202: accepted
+                400: failure
+                401: authorization error
+                405: not allowed method
+                413: file too large
+        """
+
+        try:
+            upload = request.FILES.get('file')
+            if upload is None:
+                raise InvalidValueException(message="'file' is required.")
+            if upload.size > self.max_size:
+                raise DataTooLongException(message="file too large. (max: %d bytes)" % self.max_size)
+            options = imports.get_options(request.POST)
+
+            record = ExpenseImport.objects.create(user_id=request.user.id, filename=upload.name[:255],
+                                                  size=upload.size)
+            imports.save_upload(record, upload)
+            job = jobs.enqueue('import', request.user.id, {'import_id': record.id, 'options': options})
+            return JsonResponse({"import": imports.get_progress(record), "job": jobs.get_status(job)}, status=202)
+        except (DataTooLongException, InvalidValueException) as e:
+            return JsonResponse({"error": e.message}, status=e.status)
+
+
+class ExpenseImportDetailView(View):
+    """
+    가계부 지출내역 가져오기 상세 뷰.
+
+    유효한 인가 token 보유자에 한하여 본인의 가져오기 작업 진행률과 오류 파일을 조회할 수 있다.
+    """
+
+    @login_decorator
+    def get(self, request, import_id):
+        """
+        진행률 조회 뷰 함수.
+
+        parameters
+        ----------
+        request: nothing.
+        import_id: int
+
+        returns
+        -------
+        JsonResponse: JSON
+            import: JSON (가져오기 뷰와 같다. status 는 pending, running, done or failed)
+            status code:
+                200: success
+                401: authorization error
+                404: page not found (다른 유저의 것 포함)
+                405: not allowed method
+        """
+
+        job = get_object_or_404(ExpenseImport, id=import_id, user_id=request.user.id)
+        return JsonResponse({"import": imports.get_progress(job)}, status=200)
+
+
+class ExpenseImportErrorsView(View):
+    """
+    가계부 지출내역 가져오기 오류 파일 뷰.
+    """
+
+    @login_decorator
+    def get(self, request, import_id):
+        """
+        오류 파일 다운로드 뷰 함수.
+
+        실패한 줄을 `line, error, <원본 열...>` 형식의 CSV 로 반환한다. (최대 EXPENSE_IMPORT_MAX_ERRORS 줄)
+
+        parameters
+        ----------
+        request: nothing.
+        import_id: int
+
+        returns
+        -------
+        FileResponse: CSV (attachment)
+            status code:
+                200: success
+                401: authorization error
+                404: page not found (다른 유저의 것 포함, no failed lines)
+                405: not allowed method
+        """
+
+        job = get_object_or_404(ExpenseImport, id=import_id, user_id=request.user.id)
+        path = imports.error_path(job.id)
+        if not job.failed or not os.path.exists(path):
+            return JsonResponse({"error": "no failed lines."}, status=404)
+        return FileResponse(open(path, 'rb'), as_attachment=True, content_type='text/csv; charset=utf-8',
+                            filename='import-%d-errors.csv' % job.id)
+
+
+class JobListView(View):
+    """
+    백그라운드 작업 뷰.
+
+    유효한 인가 token 보유자에 한하여 본인의 작업을 등록(post)･조회(get) 할 수 있다.
+    """
+
+    # API 로 등록할 수 있는 작업 (가져오기는 가져오기 뷰에서 등록한다)
+    kinds = ('export', 'rebuild_rollups', 'purge_deleted')
+
+    @login_decorator
+    def get(self, request):
+        """
+        작업 목록 뷰 함수.
+
+        최근 등록한 작업부터 limit 개를 반환한다.
+
+        parameters
+        ----------
+        request: nothing.
+        query parameters
+            limit: int (default: 100)
+
+        returns
+        -------
+        JsonResponse: JSON
+            jobs: list of JSON (작업 상세 뷰와 같다)
+            status code:
+                200: success
+                400: failure
+                401: authorization error
+                405: not allowed method
+        """
+
+        try:
+            queryset = Job.objects.filter(user_id=request.user.id).order_by('-created_at', '-id')
+            return JsonResponse({"jobs": [jobs.get_status(job) for job in queryset[:get_page_size(request)]]},
+                                status=200)
+        except InvalidValueException as e:
+            return JsonResponse({"error": e.message}, status=e.status)
+
+    @login_decorator
+    def post(self, request):
+        """
+        작업 등록 뷰 함수.
+
+        작업은 작업자(`run_jobs` 커맨드)가 실행하며, 진행률과 결과는 작업 상세 뷰에서 조회한다.
+
+        parameters
+        ----------
+        request: JSON
+            kind: str (export, rebuild_rollups or purge_deleted)
+            params: JSON
+                export: format, scope, keyword, date, start-date, end-date (내보내기 뷰와 같다)
+                rebuild_rollups: nothing.
+                purge_deleted: ids or keyword, date, start-date, end-date (일괄복원 뷰와 같다)
+
+        returns
+        -------
+        JsonResponse: JSON
+            job: JSON (작업 상세 뷰와 같다)
+            status code:
+                202: accepted
+                400: failure
+                401: authorization error
+                405: not allowed method
+        """
+
+        try:
+            data = json.loads(request.body)
+            if type(data) != dict:
+                raise DataTypeException(message="request datatype must be <class 'dict'>.")
+            kind, params = data.get('kind'), data.get('params', {})
+            if kind not in self.kinds:
+                raise InvalidValueException(message="'kind' must be one of %s." % ', '.join(self.kinds))
+            if type(params) != dict:
+                raise DataTypeException(message="params datatype must be <class 'dict'>.")
+            if kind == 'export':
+                get_export_rows(request.user.id, params)
+            elif kind == 'purge_deleted':
+                get_bulk_queryset(DeletedExpense.objects.all(), request.user.id, params)
+
+            job = jobs.enqueue(kind, request.user.id, params)
+            return JsonResponse({"job": jobs.get_status(job)}, status=202)
+        except JSONDecodeError:
+            return JsonResponse({"error": "invalid json."}, status=400)
+        except (DataTypeException, InvalidValueException) as e:
+            return JsonResponse({"error": e.message}, status=e.status)
+        except ValueError:
+            return JsonResponse({"error": "date format must be 'yyyy-mm-dd'."}, status=400)
+
+
+class JobDetailView(View):
+    """
+    백그라운드 작업 상세 뷰.
+
+    유효한 인가 token 보유자에 한하여 본인의 작업 상태･진행률･결과를 조회하고 취소할 수 있다.
+    """
+
+    @login_decorator
+    def get(self, request, job_id):
+        """
+        작업 상태 조회 뷰 함수.
+
+        parameters
+        ----------
+        request: nothing.
+        job_id: int
+
+        returns
+        -------
+        JsonResponse: JSON
+            job: JSON
+                id: int
+                kind: str
+                status: str (queued, running, done, failed or cancelled)
+                progress: float (%)
+                attempts: int
+                max_attempts: int
+                result: JSON (done only)
+                error: str (마지막 실패 사유)
+                cancel_requested: bool
+                run_at: datetime (다음 실행 시각)
+                created_at: datetime
+                started_at: datetime
+                finished_at: datetime
+            status code:
+                200: success
+                401: authorization error
+                404: page not found (다른 유저의 것 포함)
+                405: not allowed method
+        """
+
+        job = get_object_or_404(Job, id=job_id, user_id=request.user.id)
+        return JsonResponse({"job": jobs.get_status(job)}, status=200)
+
+
+class JobCancelView(View):
+    """
+    백그라운드 작업 취소 뷰.
+    """
+
+    @login_decorator
+    def post(self, request, job_id):
+        """
+        작업 취소 뷰 함수.
+
+        대기 중인 작업은 바로 취소되며, 실행 중인 작업은 다음 진행률 기록 시 멈춘다. (`jobs.cancel`)
+
+        parameters
+        ----------
+        request: nothing.
+        job_id: int
+
+        returns
+        -------
+        JsonResponse: JSON
+            job: JSON (작업 상세 뷰와 같다)
+            status code:
+                200: success
+                400: job already finished
+                401: authorization error
+                404: page not found (다른 유저의 것 포함)
+                405: not allowed method
+        """
+
+        try:
+            job = get_object_or_404(Job, id=job_id, user_id=request.user.id)
+            if not jobs.cancel(job):
+                raise InvalidValueException(message="job already finished.")
+            job.refresh_from_db()
+            return JsonResponse({"job": jobs.get_status(job)}, status=200)
+        except InvalidValueException as e:
+            return JsonResponse({"error": e.message}, status=e.status)
+
+
+class JobFileView(View):
+    """
+    백그라운드 작업 결과 파일 뷰.
+    """
+
+    @login_decorator
+    def get(self, request, job_id):
+        """
+        결과 파일 다운로드 뷰 함수. (내보내기 작업)
+
+        parameters
+        ----------
+        request: nothing.
+        job_id: int
+
+        returns
+        -------
+        FileResponse: CSV or NDJSON (attachment)
+            status code:
+                200: success
+                401: authorization error
+                404: page not found (다른 유저의 것 포함, no file)
+                405: not allowed method
+        """
+
+        job = get_object_or_404(Job, id=job_id, user_id=request.user.id)
+        path = jobs.output_path(job)
+        if job.status != Job.STATUS_DONE or path is None or not os.path.exists(path):
+            return JsonResponse({"error": "no result file."}, status=404)
+        return FileResponse(open(path, 'rb'), as_attachment=True, content_type=job.result['content_type'],
+                            filename=job.result['filename'])
+
+
+class DeletedExpenseListView(View):
+    """
+    삭제된 지출내역 리스트 뷰.
+
+    유효한 인가 token 보유자에 한하여 본인이 삭제한 지출내역을 출력한다.
+    """
+
+    @login_decorator
+    def get(self, request):
+        """
+        삭제 리스트 뷰 함수.
+
+        token decoding 값에 포함된 `user_id`와 매칭되는 삭제된 지출 내역을 반환한다.
+        인가 확인 동작은 `login_decorator`가 수행한다.
+        리스트 뷰와 동일하게 커서(cursor) 기반으로 페이지를 나누며 스트리밍 응답･조건부 요청(ETag)을 지원한다.
+
+        parameters
+        ----------
+        request: nothing.
+        query parameters
+            limit: int (default: 100, max: 1000)
+            cursor: str
+            stream: bool (1 or true)
+
+        returns
+        -------
+        JsonResponse: list of JSON
+            id: int
+            date: str(datetime)
+            title: str
+            amount: int
+            next: str or null
+            status code:
+                200: success
+                304: not modified (If-None-Match)
+                400: failure
+                401: authorization error
+                405: not allowed method
+        """
+
+        try:
+            version, last_modified = ledger.get_version(request.user.id)
+            etag = make_etag('deleted', request.user.id, version)
+            response = not_modified(request, etag, last_modified)
+            if response:
+                return response
+
+            d_expenses = DeletedExpense.objects.filter(user_id=request.user.id)
+            if is_streaming(request):
+                response = streaming_json_response('deleted_expenses', d_expenses.order_by('date', 'id'),
+                                                   ('id', 'date', 'title', 'amount'), extra={'next': None})
+            else:
+                d_expenses, next_cursor = paginate(d_expenses, request, ('id', 'date', 'title', 'amount'))
+                response = JsonResponse({"deleted_expenses": d_expenses, "next": next_cursor}, status=200)
+            return set_validators(response, etag, last_modified)
+        except InvalidValueException as e:
+            return JsonResponse({"error": e.message}, status=e.status)
+
+
+class DeletedBulkRestoreView(View):
+    """
+    삭제된 지출내역 일괄복원 뷰.
+
+    유효한 인가 token 보유자에 한하여 본인이 삭제한 지출내역을 id 리스트 또는 필터 조건으로 일괄 복원한다.
+    """
+
+    @login_decorator
+    def post(self, request):
+        """
+        일괄복원 뷰 함수.
+
+        parameters
+        ----------
+        request: JSON
+            ids: list of int
+            or
+            keyword: str
+            date: str (yyyy-mm-dd)
+            start-date: str (yyyy-mm-dd)
+            end-date: str (yyyy-mm-dd)
+            tag: int (tag id)
+
+        returns
+        -------
+        JsonResponse: JSON
+            message: str
+            count: int
+            status code:
+                200: success
+                400: failure
+                401: authorization error
+                405: not allowed method
+                503: ledger is being moved (Retry-After)
+        """
+
+        try:
+            data = json.loads(request.body)
+            queryset = get_bulk_queryset(DeletedExpense.objects.all(), request.user.id, data)
+            count = bulk.restore(request.user.id, queryset)
+            return JsonResponse({"message": "%d expenses recovered successfully." % count, "count": count}, status=200)
+        except ServiceUnavailableException as e:
+            response = JsonResponse({"error": e.message}, status=e.status)
+            response['Retry-After'] = e.retry_after
+            return response
+        except JSONDecodeError:
+            return JsonResponse({"error": "invalid json."}, status=400)
+        except (DataTypeException, InvalidValueException) as e:
+            return JsonResponse({"error": e.message}, status=e.status)
+        except ValidationError as e:
+            return JsonResponse({"error": "%s" % e}, status=400)
+
+
+class DeletedDetailView(View):
+    """
+    삭제된 지출내역 상세 뷰.
+
+    유효한 인가 token 보유자에 한하여 본인이 삭제한 지출 상세내역을
+    조회(get)･삭제(=복원, delete) 할 수 있다.
+    다른 유저의 내역은 샤드 배치와 관계없이 없는 내역과 같이 404 를 반환한다.
+    """
+
+    @login_decorator
+    def get(self, request, d_expense_id):
+        """
+        삭제 상세조회 뷰 함수.
+
+        지출내역 id(expense_id)를 path parameter로 한다.
+        token decoding 값에 포함된 `user_id`와 매칭되는 경우에만 지출 내역을 반환한다.
+        ETag 는 `deleted_at`과 `updated_at`(태그 삭제 등으로 바뀐다)으로 만들며, If-None-Match 가 일치하면 직렬화 없이 304 를 반환한다.
+
+        parameters
+        ----------
+        request: nothing.
+        d_expense_id: int
+
+        returns
+        -------
+        JsonResponse: JSON
+            id: int
+            owner_id: int
+            date: str (yyyy-mm-dd)
+            title: str
+            amount: int (positive)
+            description: str
+            created_at: datetime
+            updated_at: datetime
+            deleted_at: datetime
+            status code:
+                200: success
+                304: not modified (If-None-Match)
+                400: failure
+                401: authorization error
+                404: page not found (다른 유저의 것 포함)
+                405: not allowed method
+        """
+
+        d_expense = get_object_or_404(DeletedExpense, id=d_expense_id, user_id=request.user.id)
+        # 삭제 후에도 태그 삭제 등으로 수정일시가 바뀔 수 있으므로 두 값으로 만든다.
+        updated_at = d_expense.updated_at or d_expense.deleted_at
+        etag = make_etag(d_expense.id, int(d_expense.deleted_at.timestamp() * 1000000),
+                         int(updated_at.timestamp() * 1000000))
+        last_modified = max(d_expense.deleted_at, updated_at)
+        response = not_modified(request, etag, last_modified)
+        if response:
+            return response
+        d_expense = d_expense.get_expense(request)
+        return set_validators(JsonResponse({"deleted_expense": d_expense}, status=200), etag, last_modified)
+
+    @login_decorator
+    def delete(self, request, d_expense_id):
+        """
+        삭제(=복원) 뷰 함수.
+
+        지출내역 id(expense_id)를 path parameter로 한다.
+        token decoding 값에 포함된 `user_id`와 매칭되는 경우에만 삭제할 수 있다.
+        삭제 시 지출내역 테이블(expenses)에 복원 후 삭제된다.
+
+        parameters
+        ----------
+        request: nothing.
+        d_expense_id: int
+
+        returns
+        -------
+        message: str
+        status_code:
+            204: success (no content)
+            401: authorization error
+            404: page not found (다른 유저의 것 포함)
+            405: not allowed method
+            503: ledger is being moved (Retry-After)
+        """
+
+        try:
+            d_expense = get_object_or_404(DeletedExpense, id=d_expense_id, user_id=request.user.id)
+            with sharding.atomic(request.user.id):
+                r_expense = Expense(user_id=d_expense.user_id, title=d_expense.title, date=d_expense.date,
+                                    amount=d_expense.amount, description=d_expense.description,
+                                    tag_id=d_expense.tag_id, created_at=d_expense.created_at,
+                                    updated_at=d_expense.updated_at)
+                r_expense.save()
+                ledger.expenses_added(request.user.id, [r_expense])
+                d_expense.delete()
+                return JsonResponse({"message": "'id: %d' recovered successfully." % d_expense_id}, status=204)
+        except ServiceUnavailableException as e:
+            response = JsonResponse({"error": e.message}, status=e.status)
+            response['Retry-After'] = e.retry_after
+            return response
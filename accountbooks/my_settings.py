@@ -2,7 +2,7 @@ ALGORITHM  = 'HS256'
 SECRET_KEY = 'django-insecure-_sqwc(uluvkj1u9a4sj2ih^7p34kaebbj@-b90g@^igr%9_0e#'
 DATABASES  = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'utils.db.mysql',
         'NAME': 'accountbook',
         'USER': 'root',
         'PASSWORD': 'abc135!!',
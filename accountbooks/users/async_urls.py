@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import async_views
+
+urlpatterns = [
+    path('sign-up/', async_views.AsyncSignupView.as_view()),
+    path('sign-in/', async_views.AsyncSigninView.as_view()),
+]
@@ -0,0 +1,23 @@
+from utils.aio import AsyncView, run_db
+
+from . import views
+
+
+class AsyncSignupView(AsyncView):
+    """
+    회원가입 뷰. (ASGI)
+
+    요청 처리는 동기 뷰(`SignupView`)의 로직을 DB 스레드에서 실행한다.
+    """
+
+    async def post(self, request):
+        return await run_db(views.SignupView.post, self, request)
+
+
+class AsyncSigninView(AsyncView):
+    """
+    로그인 뷰. (ASGI)
+    """
+
+    async def post(self, request):
+        return await run_db(views.SigninView.post, self, request)
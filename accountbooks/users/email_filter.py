@@ -0,0 +1,170 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+from utils.bloom import BloomFilter
+
+from .models import User
+
+logger = logging.getLogger('accountbooks.email_filter')
+
+# users 테이블을 읽어 filter 를 채울 때의 fetch 크기
+WARM_CHUNK_SIZE = 10000
+
+
+class EmailFilter:
+    """
+    가입된 이메일 Bloom filter 클래스.
+
+    회원가입 시 이메일 중복 확인 쿼리를 생략하기 위해 사용한다. filter 에 없는 이메일은 "확실히 새 이메일"이므로
+    조회 없이 저장하고, filter 에 있는 이메일만 DB 에서 확인한다. 다른 프로세스에서 가입했거나 ORM 을 거치지 않고
+    저장된 유저는 filter 에 없을 수 있으므로 최종 중복 판단은 users.email unique 인덱스(IntegrityError)가 한다.
+
+    서버 프로세스 시작 시(`config.wsgi`･`config.asgi`의 `start()`) 백그라운드 스레드에서 users 테이블 전체 이메일로
+    채우고(warm), 이후 유저 생성 시(`users.signals`) 추가한다. 채워지기 전(cold)에는 요청을 기다리게 하지 않고
+    중복 확인 쿼리를 그대로 실행한다. 항목 수가 capacity 를 넘으면 기존 filter 를 계속 사용하면서 백그라운드에서
+    더 큰 filter 로 다시 채운다. 삭제된 유저의 이메일은 다시 채울 때 빠진다.
+    false positive 비율(예상값･관측값)과 메모리 사용량을 `stats()`로 제공한다. (`/metrics/`)
+    capacity 가 0 이면 사용하지 않는다. (항상 DB 에서 확인한다)
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.filter = None
+        self.started = False
+        self._pending = None
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock()
+        self.clear()
+
+    @property
+    def enabled(self):
+        return self.capacity > 0
+
+    def _warm(self):
+        """users 테이블의 이메일로 새 filter 를 채운다. `_warm_lock`을 잡은 상태에서 호출한다."""
+
+        with self._lock:
+            self._pending = []
+        try:
+            queryset = User.objects.values_list('email', flat=True)
+            bloom = BloomFilter(max(self.capacity, queryset.count() * 2), self.error_rate)
+            for email in queryset.iterator(chunk_size=WARM_CHUNK_SIZE):
+                bloom.add(email)
+            # 채우는 동안 가입한 유저의 이메일을 더한 뒤 교체한다.
+            with self._lock:
+                for email in self._pending:
+                    bloom.add(email)
+                self.filter = bloom
+                self.counters['warms'] += 1
+        finally:
+            with self._lock:
+                self._pending = None
+        return bloom
+
+    def warm(self):
+        """filter 를 현재 스레드에서 채운다. (관리 커맨드･테스트용)"""
+
+        with self._warm_lock:
+            return self._warm()
+
+    def warm_async(self):
+        """
+        백그라운드 스레드에서 filter 를 채운다. 이미 채우는 중이면 아무것도 하지 않는다.
+
+        returns
+        -------
+        thread: threading.Thread or None
+        """
+
+        if not self.enabled or not self._warm_lock.acquire(blocking=False):
+            return None
+
+        def run():
+            try:
+                self._warm()
+            except Exception:
+                logger.exception('email filter warm failed.')
+            finally:
+                self._warm_lock.release()
+                connections.close_all()
+
+        thread = threading.Thread(target=run, name='email-filter-warm', daemon=True)
+        thread.start()
+        return thread
+
+    def start(self):
+        """서버 프로세스 시작 시 호출한다. 백그라운드에서 채우며, 실패하면 다음 cold 확인 때 다시 시도한다."""
+
+        self.started = True
+        return self.warm_async()
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def might_exist(self, email):
+        """
+        이메일 확인 함수.
+
+        filter 가 채워지지 않았으면(cold) 기다리지 않고 None 을 반환한다.
+
+        returns
+        -------
+        result: bool or None (False 이면 가입되지 않은 이메일, True 이면 DB 확인이 필요하다, None 이면 cold)
+        """
+
+        if not self.enabled:
+            return True
+        bloom = self.filter
+        if bloom is None or len(bloom) > bloom.capacity:
+            if self.started:
+                self.warm_async()
+            if bloom is None:
+                self.count('cold')
+                return None
+        present = email in bloom
+        self.count('checks')
+        self.count('maybe_present' if present else 'definitely_new')
+        return present
+
+    def add(self, email):
+        """filter 에 이메일을 추가한다. 채우는 중이면 새 filter 에도 추가된다."""
+
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(email)
+        bloom = self.filter
+        if bloom is not None:
+            bloom.add(email)
+
+    def clear(self):
+        """filter 와 카운터를 비운다. (테스트용)"""
+
+        self.filter = None
+        self.counters = {'warms': 0, 'cold': 0, 'checks': 0, 'definitely_new': 0, 'maybe_present': 0,
+                         'false_positives': 0, 'duplicates': 0, 'integrity_errors': 0}
+
+    def stats(self):
+        bloom = self.filter
+        with self._lock:
+            counters = dict(self.counters)
+        negatives = counters['definitely_new'] + counters['false_positives']
+        return dict(counters, **{
+            'enabled'          : self.enabled,
+            'warming'          : self._warm_lock.locked(),
+            'capacity'         : bloom.capacity if bloom is not None else self.capacity,
+            'items'            : len(bloom) if bloom is not None else 0,
+            'bits'             : bloom.size if bloom is not None else 0,
+            'hashes'           : bloom.hashes if bloom is not None else 0,
+            'memory_bytes'     : bloom.memory if bloom is not None else 0,
+            'estimated_fp_rate': bloom.false_positive_rate() if bloom is not None else 0.0,
+            'observed_fp_rate' : counters['false_positives'] / negatives if negatives else 0.0,
+        })
+
+
+email_filter = EmailFilter(capacity=getattr(settings, 'SIGNUP_EMAIL_FILTER_CAPACITY', 1000000),
+                           error_rate=getattr(settings, 'SIGNUP_EMAIL_FILTER_ERROR_RATE', 0.01))
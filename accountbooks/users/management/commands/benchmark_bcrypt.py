@@ -0,0 +1,53 @@
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from django.core.management.base import BaseCommand
+
+from utils.hashing import BCRYPT_ROUNDS
+
+
+class Command(BaseCommand):
+    """
+    bcrypt 해싱 마이크로 벤치마크 커맨드.
+
+    cost factor 별로 단일 스레드와 worker 스레드 풀의 초당 해싱 수를 측정하고 코어당 처리량을 출력한다.
+    해싱 풀 크기･cost factor 설정값을 정하는 데 사용한다.
+    """
+
+    help = 'Measure bcrypt hashes per second per core for each cost factor.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, nargs='+', default=[10, 11, BCRYPT_ROUNDS])
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--seconds', type=float, default=2.0, help='measuring time per case.')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        self.stdout.write('cores: %d, workers: %d' % (os.cpu_count() or 1, workers))
+        for rounds in options['rounds']:
+            single = self.measure(rounds, 1, options['seconds'])
+            pooled = self.measure(rounds, workers, options['seconds'])
+            self.stdout.write('rounds %2d  %7.1f ms/hash  single %6.1f hash/s  pool %6.1f hash/s  %6.1f hash/s/core' % (
+                rounds, 1000 / single, single, pooled, pooled / min(workers, os.cpu_count() or 1)))
+
+    @staticmethod
+    def measure(rounds, workers, seconds):
+        password = b'abc135!!'
+        salt = bcrypt.gensalt(rounds=rounds)
+        deadline = time.perf_counter() + seconds
+
+        def work(_):
+            count = 0
+            while time.perf_counter() < deadline:
+                bcrypt.hashpw(password, salt)
+                count += 1
+            return count
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            total = sum(executor.map(work, range(workers)))
+        return total / (time.perf_counter() - started)
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from utils.decorators import principal_cache
+
+from .email_filter import email_filter
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def invalidate_principal_on_save(sender, instance, created, **kwargs):
+    """비밀번호 변경 등 유저 정보가 수정되면 캐시된 인가 정보를 무효화한다."""
+
+    if not created:
+        principal_cache.invalidate_tag(instance.id)
+
+
+@receiver(post_save, sender=User)
+def add_email_on_create(sender, instance, created, **kwargs):
+    """새 유저의 이메일을 회원가입 중복 확인용 Bloom filter 에 추가한다."""
+
+    if created:
+        email_filter.add(instance.email)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_principal_on_delete(sender, instance, **kwargs):
+    """유저가 삭제되면 캐시된 인가 정보를 무효화한다."""
+
+    principal_cache.invalidate_tag(instance.id)
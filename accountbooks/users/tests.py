@@ -1,9 +1,22 @@
 import json
+import threading
+import time
 
-import bcrypt
-
-from django.test import TestCase, Client
+from unittest import mock
 
+import bcrypt
+import jwt
+
+from django.db import connection
+from django.test import TestCase, Client, AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+
+import my_settings
+from utils import admission, hashing
+from utils.bloom import BloomFilter
+from utils.cache import TTLCache
+from utils.decorators import principal_cache
+from .email_filter import email_filter
 from .models import User
 
 
@@ -15,6 +28,7 @@ class UserTest(TestCase):
     def setUp(self):
         """Mock 데이터 세팅."""
 
+        admission.reset()
         User.objects.create(email='test1@example.com',
                             password=bcrypt.hashpw('abc135!!'.encode('utf-8'), bcrypt.gensalt()).decode())
 
@@ -267,3 +281,280 @@ class UserTest(TestCase):
         response = client.post('/user/sign-in/', json.dumps(request_data), content_type='application/json')
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json(), {"error": "invalid 'email' or 'password'."})
+
+
+class PasswordHashingTest(TestCase):
+    """
+    비밀번호 해싱 풀 테스트 클래스.
+    """
+
+    def setUp(self):
+        admission.reset()
+
+    def test_rehash_outdated_cost(self):
+        """cost factor 가 설정값과 다른 해시는 로그인 시 다시 해싱된다."""
+
+        User.objects.create(email='test1@example.com',
+                            password=bcrypt.hashpw('abc135!!'.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode())
+        request_data = {
+            'email'   : 'test1@example.com',
+            'password': 'abc135!!'
+        }
+        response = Client().post('/user/sign-in/', json.dumps(request_data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        password = User.objects.get(email='test1@example.com').password
+        self.assertEqual(hashing.get_rounds(password), hashing.BCRYPT_ROUNDS)
+        self.assertTrue(bcrypt.checkpw('abc135!!'.encode('utf-8'), password.encode('utf-8')))
+
+    def test_backpressure(self):
+        """대기열이 가득 차면 503 에러와 Retry-After 헤더를 반환한다."""
+
+        release = threading.Event()
+        pool = hashing.HashingPool(workers=1, max_pending=0, timeout=5)
+        worker = threading.Thread(target=pool.run, args=(release.wait,))
+        worker.start()
+        while not pool.stats()['in_flight']:
+            time.sleep(0.01)
+        try:
+            with mock.patch.object(hashing, 'hashing_pool', pool):
+                request_data = {
+                    'email'   : 'test2@example.com',
+                    'password': 'abc135!!'
+                }
+                response = Client().post('/user/sign-up/', json.dumps(request_data), content_type='application/json')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '1')
+            self.assertEqual(pool.stats()['rejected'], 1)
+        finally:
+            release.set()
+            worker.join()
+
+
+class PrincipalCacheTest(TestCase):
+    """
+    인가 정보(principal) 캐시 테스트 클래스.
+    """
+
+    def setUp(self):
+        """Mock 데이터 세팅."""
+
+        principal_cache.clear()
+        self.user = User.objects.create(email='test1@example.com', password='-')
+        self.token = jwt.encode(payload={'user_id': self.user.id}, key=my_settings.SECRET_KEY,
+                                algorithm=my_settings.ALGORITHM)
+        self.client = Client()
+
+    def test_cache_hit_skips_query(self):
+        """두 번째 요청부터 유저 조회 쿼리가 실행되지 않는다."""
+
+        header = {"HTTP_Authorization": self.token}
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/expenses/', **header)
+        self.assertTrue([query for query in queries if 'FROM "users"' in query['sql'].replace('`', '"')])
+
+        hits = principal_cache.stats()['hits']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/expenses/', **header)
+        self.assertFalse([query for query in queries if 'FROM "users"' in query['sql'].replace('`', '"')])
+        self.assertEqual(principal_cache.stats()['hits'], hits + 1)
+
+    def test_invalidate_on_password_change(self):
+        header = {"HTTP_Authorization": self.token}
+        self.client.get('/expenses/', **header)
+        self.user.password = '--'
+        self.user.save()
+        self.assertEqual(principal_cache.stats()['size'], 0)
+
+    def test_invalidate_on_delete(self):
+        header = {"HTTP_Authorization": self.token}
+        self.client.get('/expenses/', **header)
+        self.user.delete()
+        response = self.client.get('/expenses/', **header)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "invalid token."})
+
+    def test_lru_and_ttl(self):
+        now = [0]
+        cache = TTLCache(max_size=2, ttl=10, clock=lambda: now[0])
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        now[0] = 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+
+class AdmissionControlTest(TestCase):
+    """
+    admission control(`utils.admission`) 테스트 클래스.
+    """
+
+    def setUp(self):
+        admission.reset()
+
+    def sign_in(self, email, **extra):
+        return Client().post('/user/sign-in/', json.dumps({'email': email, 'password': 'abc135!!'}),
+                             content_type='application/json', **extra)
+
+    def test_token_bucket(self):
+        now = [0]
+        bucket = admission.TokenBucket(rate=0.5, burst=2, max_keys=2, clock=lambda: now[0])
+        self.assertEqual([bucket.take('a'), bucket.take('a')], [0, 0])
+        self.assertEqual(bucket.take('a'), 2)
+        now[0] = 2
+        self.assertEqual(bucket.take('a'), 0)
+        bucket.take('b')
+        bucket.take('c')
+        self.assertEqual(len(bucket), 2)
+
+    def test_rate_limit(self):
+        """이메일별･클라이언트별 rate 를 넘으면 Retry-After 와 함께 429 에러를 반환한다."""
+
+        controller = admission.AdmissionController(concurrency=4, queue=0, timeout=0, client_rate=0.1,
+                                                   client_burst=3, email_rate=0.1, email_burst=1)
+        with mock.patch.dict(admission.controllers, {'signin': controller}):
+            self.assertEqual(self.sign_in('nobody@example.com').status_code, 400)
+            response = self.sign_in('NOBODY@example.com')
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '10')
+            self.assertEqual(self.sign_in('other@example.com').status_code, 400)
+            self.assertEqual(self.sign_in('another@example.com').status_code, 429)
+            self.assertEqual(self.sign_in('another@example.com', REMOTE_ADDR='10.0.0.2').status_code, 400)
+
+        stats = controller.stats()
+        self.assertEqual((stats['admitted'], stats['email_limited'], stats['client_limited']), (3, 1, 1))
+
+    def test_queue_full(self):
+        """동시 실행 자리와 대기열이 가득 차면 503 에러를 반환하고 다른 경로는 영향을 받지 않는다."""
+
+        controller = admission.AdmissionController(concurrency=1, queue=1, timeout=0.01)
+        with mock.patch.dict(admission.controllers, {'signin': controller}):
+            self.assertEqual(controller.limiter.acquire(), 'ok')
+            response = self.sign_in('nobody@example.com')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '1')
+
+            controller.limiter.waiting = 1
+            self.assertEqual(self.sign_in('nobody@example.com').status_code, 503)
+            controller.limiter.waiting = 0
+
+            response = Client().get('/metrics/')
+            self.assertEqual(response.json()['admission']['signin']['in_flight'], 1)
+            self.assertEqual(Client().post('/user/sign-up/', {}, content_type='application/json').status_code, 400)
+
+            controller.leave()
+            self.assertEqual(self.sign_in('nobody@example.com').status_code, 400)
+
+        stats = controller.stats()
+        self.assertEqual((stats['queue_timeout'], stats['queue_full'], stats['in_flight']), (1, 1, 0))
+
+
+class EmailFilterTest(TestCase):
+    """
+    회원가입 이메일 Bloom filter(`users.email_filter`) 테스트 클래스.
+    """
+
+    def setUp(self):
+        admission.reset()
+        email_filter.clear()
+        User.objects.create(email='test1@example.com', password='-')
+        email_filter.warm()
+
+    def sign_up(self, email):
+        return Client().post('/user/sign-up/', json.dumps({'email': email, 'password': 'abc135!!'}),
+                             content_type='application/json')
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add('user%d@example.com' % i)
+        self.assertTrue(all('user%d@example.com' % i in bloom for i in range(1000)))
+        false_positives = sum('other%d@example.com' % i in bloom for i in range(10000))
+        self.assertLess(false_positives / 10000, 0.03)
+        self.assertAlmostEqual(bloom.false_positive_rate(), 0.01, delta=0.005)
+        self.assertEqual((bloom.size, bloom.hashes, bloom.memory), (9586, 7, 1199))
+
+    def test_new_email_skips_duplicate_query(self):
+        """filter 에 없는 이메일은 중복 확인 쿼리 없이 저장한다."""
+
+        self.assertEqual(self.sign_up('test2@example.com').status_code, 201)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.sign_up('test3@example.com').status_code, 201)
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT')])
+
+        stats = email_filter.stats()
+        self.assertEqual((stats['warms'], stats['definitely_new'], stats['items']), (1, 2, 3))
+        self.assertGreater(stats['memory_bytes'], 0)
+
+    def test_duplicate_email(self):
+        """filter 에 있는 이메일은 DB 에서 확인하고, filter 에 없는 중복은 unique 인덱스로 거절한다."""
+
+        self.assertEqual(self.sign_up('test1@example.com').json(), {"error": "'test1@example.com' is already."})
+        User.objects.bulk_create([User(email='test4@example.com', password='-')])
+        response = self.sign_up('test4@example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "'test4@example.com' is already."})
+
+        stats = email_filter.stats()
+        self.assertEqual((stats['duplicates'], stats['integrity_errors']), (1, 1))
+
+    def test_cold_filter_falls_back_to_query(self):
+        """채워지지 않은 filter 는 요청을 기다리게 하지 않고 중복 확인 쿼리를 실행한다."""
+
+        email_filter.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.sign_up('test2@example.com').status_code, 201)
+        self.assertTrue([query for query in queries if query['sql'].startswith('SELECT')])
+        self.assertEqual(self.sign_up('test1@example.com').status_code, 400)
+
+        stats = email_filter.stats()
+        self.assertEqual((stats['cold'], stats['warms'], stats['false_positives'], stats['duplicates']), (2, 0, 0, 1))
+
+        # 서버 프로세스에서는 cold 확인 시 백그라운드 warm 을 다시 시도한다.
+        with mock.patch.object(email_filter, 'started', True), mock.patch.object(email_filter, 'warm_async') as warm:
+            self.sign_up('test3@example.com')
+        warm.assert_called_once_with()
+
+    def test_warm_keeps_emails_added_meanwhile(self):
+        """채우는 동안 가입한 유저의 이메일도 새 filter 에 들어간다."""
+
+        email_filter.clear()
+        original = BloomFilter.add
+
+        def add(bloom, email):
+            if email == 'test1@example.com':
+                email_filter.add('late@example.com')
+            original(bloom, email)
+
+        with mock.patch.object(BloomFilter, 'add', add):
+            bloom = email_filter.warm()
+        self.assertIn('late@example.com', bloom)
+        self.assertIs(email_filter.filter, bloom)
+
+
+@override_settings(ROOT_URLCONF='config.asgi_urls', ASYNC_DB_POOL_SIZE=0)
+class AsyncUserTest(TestCase):
+    """
+    유저 앱 비동기(ASGI) 뷰 테스트 클래스.
+    """
+
+    def setUp(self):
+        """Mock 데이터 세팅."""
+
+        admission.reset()
+        User.objects.create(email='test1@example.com',
+                            password=bcrypt.hashpw('abc135!!'.encode('utf-8'), bcrypt.gensalt()).decode())
+
+    async def test_sign_in_success(self):
+        request_data = {
+            'email'   : 'test1@example.com',
+            'password': 'abc135!!'
+        }
+        response = await AsyncClient().post('/user/sign-in/', json.dumps(request_data),
+                                            content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['message'], "sign-in success.")
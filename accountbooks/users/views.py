@@ -2,11 +2,16 @@ import json
 
 from json import JSONDecodeError
 
+from django.db import IntegrityError, transaction
 from django.views import View
-from django.http import JsonResponse
 
+from utils.admission import admission_control
+from utils.hashing import hash_password, needs_rehash
+from utils.responses import JsonResponse
 from utils.validators import validate_email, validate_password, check_password
-from utils.exceptions import InvalidValueException, DataTooLongException, DataTypeException, DuplicationException
+from utils.exceptions import InvalidValueException, DataTooLongException, DataTypeException, DuplicationException, \
+    ServiceUnavailableException
+from .email_filter import email_filter
 from .models import User
 
 
@@ -15,8 +20,12 @@ class SignupView(View):
     회원가입 뷰.
 
     비밀번호는 validators 모듈로 암호화(Hashing) 후 저장한다.
+    이메일 중복은 Bloom filter(`email_filter`)에 있는 이메일만 조회하여 확인하고, 최종적으로 unique 인덱스로 보장한다.
+    filter 가 아직 채워지지 않았으면(cold) 기다리지 않고 항상 조회한다.
+    요청은 admission control(`ADMISSION_CONTROL['signup']`)을 통과해야 실행된다.
     """
 
+    @admission_control('signup')
     def post(self, request):
         """
         회원가입 뷰 함수.
@@ -39,18 +48,34 @@ class SignupView(View):
                 400: failure
                 405: not allowed method
                 413: data too long
+                429: too many requests from the client or for the email (Retry-After)
+                503: password hashing pool or admission queue is full (Retry-After)
         """
 
         try:
             data = json.loads(request.body)
-            if User.objects.filter(email=data['email']).exists():
-                raise DuplicationException(message="'%s' is already." % data['email'])
-
             email = validate_email(data['email'])
+            present = email_filter.might_exist(email)
+            if present is not False:
+                if User.objects.filter(email=email).exists():
+                    email_filter.count('duplicates')
+                    raise DuplicationException(message="'%s' is already." % email)
+                if present:
+                    email_filter.count('false_positives')
+
             hashed_password = validate_password(data['password'])
-            User.objects.create(email=email, password=hashed_password)
+            try:
+                with transaction.atomic():
+                    User.objects.create(email=email, password=hashed_password)
+            except IntegrityError:
+                email_filter.count('integrity_errors')
+                raise DuplicationException(message="'%s' is already." % email)
             return JsonResponse({"message": "sign-up success."}, status=201)
 
+        except ServiceUnavailableException as e:
+            response = JsonResponse({"error": e.message}, status=e.status)
+            response['Retry-After'] = e.retry_after
+            return response
         except InvalidValueException as e:
             return JsonResponse({"error": "%s" % e.message}, status=e.status)
         except JSONDecodeError:
@@ -70,8 +95,11 @@ class SigninView(View):
     로그인 뷰.
 
     성공적으로 로그인하면 인가 헤더용 token을 반환한다.
+    저장된 비밀번호 해시의 cost factor 가 설정값과 다르면 로그인 시 다시 해싱하여 저장한다.
+    요청은 admission control(`ADMISSION_CONTROL['signin']`)을 통과해야 실행된다.
     """
 
+    @admission_control('signin')
     def post(self, request):
         """
         로그인 뷰 함수.
@@ -94,14 +122,23 @@ class SigninView(View):
                 400: failure
                 405: not allowed method
                 413: data too long
+                429: too many requests from the client or for the email (Retry-After)
+                503: password hashing pool or admission queue is full (Retry-After)
         """
 
         try:
             data  = json.loads(request.body)
             user  = User.objects.get(email=data['email'])
             token = check_password(data['password'], user.password, user.id)
+            if needs_rehash(user.password):
+                user.password = hash_password(data['password'])
+                user.save(update_fields=['password', 'updated_at'])
             return JsonResponse({"message": "sign-in success.", "Authorization": "%s" % token}, status=200)
 
+        except ServiceUnavailableException as e:
+            response = JsonResponse({"error": e.message}, status=e.status)
+            response['Retry-After'] = e.retry_after
+            return response
         except InvalidValueException as e:
             return JsonResponse({"error": e.message}, status=e.status)
         except User.DoesNotExist:
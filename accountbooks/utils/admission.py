@@ -0,0 +1,256 @@
+import functools
+import json
+import math
+import threading
+import time
+
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .exceptions import ServiceUnavailableException, TooManyRequestsException
+from .responses import JsonResponse
+
+
+class TokenBucket:
+    """
+    키별 토큰 버킷(token bucket) rate limiter 클래스.
+
+    키(클라이언트 주소･이메일 등)마다 최대 burst 개의 토큰을 두고 초당 rate 개씩 채운다.
+    요청마다 토큰 1개를 사용하며, 토큰이 없으면 다음 토큰까지 남은 시간(초)을 반환한다.
+    키 수가 max_keys 를 넘으면 가장 오래 사용되지 않은 키부터 제거한다. (제거된 키는 가득 찬 버킷으로 다시 시작한다)
+    """
+
+    def __init__(self, rate, burst, max_keys=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    @property
+    def enabled(self):
+        return self.rate > 0 and self.burst > 0
+
+    def take(self, key):
+        """
+        토큰 사용 함수.
+
+        returns
+        -------
+        wait: float (0 이면 허용, 아니면 다음 토큰까지 남은 시간(초))
+        """
+
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            tokens = self.burst if bucket is None else min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class ConcurrencyLimiter:
+    """
+    동시 실행 수 제한 클래스.
+
+    최대 limit 개의 요청만 동시에 실행하고, 최대 max_queue 개의 요청이 timeout 초까지 자리를 기다린다.
+    대기열이 가득 차거나 대기 시간이 지나면 즉시 실패하여 요청 스레드를 오래 점유하지 않는다.
+    """
+
+    def __init__(self, limit, max_queue, timeout):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+
+    def acquire(self):
+        """
+        자리 점유 함수.
+
+        returns
+        -------
+        result: str ('ok', 'queue_full' or 'timeout')
+        """
+
+        with self._condition:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return 'ok'
+            if self.waiting >= self.max_queue:
+                return 'queue_full'
+            self.waiting += 1
+            try:
+                if not self._condition.wait_for(lambda: self.in_flight < self.limit, timeout=self.timeout):
+                    return 'timeout'
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            return 'ok'
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+
+class AdmissionController:
+    """
+    경로별 admission control 클래스.
+
+    요청을 실행하기 전에 클라이언트별･이메일별 토큰 버킷(429)과 동시 실행 수 제한(503)을 차례로 확인하여
+    bcrypt 연산 등 CPU 비용이 큰 경로의 요청 폭주가 다른 경로를 처리할 worker 를 모두 점유하지 않도록 한다.
+    경로별 카운터를 `stats()`로 제공한다. (`/metrics/`)
+
+    parameters
+    ----------
+    concurrency: int (동시 실행 수)
+    queue: int (최대 대기 요청 수)
+    timeout: float (최대 대기 시간(초))
+    client_rate, client_burst: float, int (클라이언트 주소별 초당 요청 수와 burst, 0 이면 제한하지 않는다)
+    email_rate, email_burst: float, int (요청 본문의 이메일별 초당 요청 수와 burst, 0 이면 제한하지 않는다)
+    max_keys: int (토큰 버킷 최대 키 수)
+    """
+
+    def __init__(self, concurrency, queue, timeout, client_rate=0, client_burst=0, email_rate=0, email_burst=0,
+                 max_keys=10000):
+        self.limiter = ConcurrencyLimiter(concurrency, queue, timeout)
+        self.clients = TokenBucket(client_rate, client_burst, max_keys)
+        self.emails = TokenBucket(email_rate, email_burst, max_keys)
+        self._lock = threading.Lock()
+        self.reset_counters()
+
+    def reset_counters(self):
+        with self._lock:
+            self.counters = {'admitted': 0, 'client_limited': 0, 'email_limited': 0, 'queue_full': 0,
+                             'queue_timeout': 0}
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def check_rate(self, bucket, key, counter):
+        if key is None or not bucket.enabled:
+            return
+        wait = bucket.take(key)
+        if wait:
+            self.count(counter)
+            raise TooManyRequestsException(retry_after=math.ceil(wait))
+
+    def enter(self, client, email=None):
+        """
+        요청 허용 함수.
+
+        허용되면 동시 실행 자리를 점유하며, 요청 처리 후 `leave()`를 호출해야 한다.
+        rate 제한을 넘으면 `TooManyRequestsException`(429), 자리가 없으면 `ServiceUnavailableException`(503).
+        """
+
+        self.check_rate(self.clients, client, 'client_limited')
+        self.check_rate(self.emails, email, 'email_limited')
+        result = self.limiter.acquire()
+        if result == 'queue_full':
+            self.count('queue_full')
+            raise ServiceUnavailableException(retry_after=1)
+        if result == 'timeout':
+            self.count('queue_timeout')
+            raise ServiceUnavailableException(retry_after=1)
+        self.count('admitted')
+
+    def leave(self):
+        self.limiter.release()
+
+    def reset(self):
+        self.clients.clear()
+        self.emails.clear()
+        self.reset_counters()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return dict(counters, **{
+            'concurrency': self.limiter.limit,
+            'queue'      : self.limiter.max_queue,
+            'in_flight'  : self.limiter.in_flight,
+            'waiting'    : self.limiter.waiting,
+            'clients'    : len(self.clients),
+            'emails'     : len(self.emails),
+        })
+
+
+controllers = {name: AdmissionController(max_keys=getattr(settings, 'ADMISSION_CONTROL_MAX_KEYS', 10000), **options)
+               for name, options in getattr(settings, 'ADMISSION_CONTROL', {}).items()}
+
+
+def stats():
+    return {name: controller.stats() for name, controller in controllers.items()}
+
+
+def reset():
+    """토큰 버킷과 카운터를 초기화한다. (테스트용)"""
+
+    for controller in controllers.values():
+        controller.reset()
+
+
+def get_client(request):
+    """클라이언트 주소를 반환한다. `ADMISSION_CLIENT_IP_HEADER`가 있으면 해당 헤더의 첫 번째 주소를 사용한다."""
+
+    header = getattr(settings, 'ADMISSION_CLIENT_IP_HEADER', None)
+    if header and request.META.get(header):
+        return request.META[header].split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR')
+
+
+def get_email(request):
+    """요청 본문(JSON)의 이메일을 반환한다. 없거나 읽을 수 없으면 None (뷰가 오류를 처리한다)."""
+
+    try:
+        email = json.loads(request.body).get('email')
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if type(email) == str else None
+
+
+def admission_control(name):
+    """
+    admission control 데코레이터.
+
+    `ADMISSION_CONTROL[name]` 설정이 있으면 뷰 실행 전 `AdmissionController.enter()`로 허용 여부를 확인하고,
+    거절된 요청에는 `Retry-After` 헤더와 함께 429･503 에러를 바로 반환한다.
+    ASGI 뷰는 동기 뷰를 DB 스레드에서 실행하므로 같은 제한을 공유한다.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            controller = controllers.get(name)
+            if controller is None:
+                return func(self, request, *args, **kwargs)
+            try:
+                controller.enter(get_client(request), get_email(request))
+            except (TooManyRequestsException, ServiceUnavailableException) as e:
+                response = JsonResponse({"error": e.message}, status=e.status)
+                response['Retry-After'] = e.retry_after
+                return response
+            try:
+                return func(self, request, *args, **kwargs)
+            finally:
+                controller.leave()
+        return wrapper
+    return decorator
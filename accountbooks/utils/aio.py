@@ -0,0 +1,90 @@
+import asyncio
+import contextvars
+import functools
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils.decorators import classonlymethod
+from django.views import View
+
+from utils import timing
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """DB 전용 스레드 풀을 (최초 호출 시) 생성하여 반환한다."""
+
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.ASYNC_DB_POOL_SIZE, thread_name_prefix='async-db')
+        return _executor
+
+
+def _call_instrumented(func, args, kwargs):
+    timing.install(connection)
+    return func(*args, **kwargs)
+
+
+def _call_in_db_thread(func, args, kwargs):
+    close_old_connections()
+    try:
+        return _call_instrumented(func, args, kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    비동기 DB 실행 함수.
+
+    Django 3.2 는 비동기 ORM 을 지원하지 않고, ASGI 핸들러의 `thread_sensitive` 동기 코드는
+    모든 요청이 하나의 스레드를 공유한다. 따라서 동기 ORM 코드를 크기가 제한된 DB 전용 스레드 풀에서 실행하여
+    이벤트 루프를 막지 않으면서 요청 간 DB 작업이 병렬로 실행되도록 한다.
+    풀의 스레드는 각자 DB 연결을 가지며 호출 전후로 만료된 연결을 정리한다.
+    호출 컨텍스트(contextvars)를 DB 스레드로 전달하고, 쿼리를 현재 요청의 계측 정보(`utils.timing`)에 기록한다.
+
+    `ASYNC_DB_POOL_SIZE`가 0 이면 `sync_to_async(thread_sensitive=True)`로 실행한다. (테스트용)
+
+    parameters
+    ----------
+    func: callable (동기 함수)
+
+    returns
+    -------
+    func 의 반환값
+    """
+
+    if not getattr(settings, 'ASYNC_DB_POOL_SIZE', 0):
+        return await sync_to_async(_call_instrumented, thread_sensitive=True)(func, args, kwargs)
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), context.run, _call_in_db_thread, func, args, kwargs)
+
+
+class AsyncView(View):
+    """
+    비동기 클래스 기반 뷰.
+
+    Django 3.2 의 `View.as_view()`는 동기 함수를 반환하므로
+    핸들러가 코루틴 함수인 뷰를 ASGI 핸들러가 비동기로 실행할 수 있도록 감싼다.
+    """
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+            return response
+
+        functools.update_wrapper(async_view, view)
+        return async_view
@@ -0,0 +1,60 @@
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """
+    Bloom filter 클래스.
+
+    문자열 집합의 포함 여부를 비트 배열로 근사한다. `key in filter`가 False 이면 추가된 적이 없는 값이고(false negative 없음),
+    True 이면 추가되었거나 false positive 이다. 값은 제거할 수 없다.
+    비트 수(m)와 해시 함수 수(k)는 capacity(n)와 목표 false positive 비율(p)로 정한다. (m = -n ln p / ln²2, k = m/n ln 2)
+    해시 위치는 blake2b 128-bit digest 를 둘로 나눈 double hashing(h1 + i･h2)으로 구한다.
+
+    parameters
+    ----------
+    capacity: int (예상 최대 항목 수)
+    error_rate: float (capacity 개일 때의 목표 false positive 비율)
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(64, int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, key):
+        positions = self.positions(key)
+        with self._lock:
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def memory(self):
+        """비트 배열 크기(byte)"""
+
+        return len(self.bits)
+
+    def false_positive_rate(self):
+        """현재 항목 수에서의 예상 false positive 비율. ((1 - e^(-kn/m))^k)"""
+
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
@@ -0,0 +1,95 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    프로세스 내부(in-process) LRU + TTL 캐시 클래스.
+
+    최대 크기(max_size)를 넘으면 가장 오래 사용되지 않은 항목부터 제거하며,
+    저장 후 ttl 초가 지난 항목은 조회 시 만료 처리한다.
+    항목에 태그(tag)를 붙여 같은 태그의 항목을 한 번에 무효화할 수 있다.
+    hit･miss 등 카운터를 `stats()`로 제공한다.
+    """
+
+    def __init__(self, max_size, ttl, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tags = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, key):
+        """캐시 값을 반환한다. 없거나 만료된 경우 None 을 반환한다."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, tag, expires_at = entry
+            if expires_at <= self.clock():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, tag=None):
+        """캐시 값을 저장한다. 최대 크기를 넘으면 LRU 항목을 제거한다."""
+
+        if not self.enabled:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, tag, self.clock() + self.ttl)
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_tag(self, tag):
+        """태그가 같은 모든 항목을 제거한다."""
+
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size'         : len(self._entries),
+                'max_size'     : self.max_size,
+                'hits'         : self.hits,
+                'misses'       : self.misses,
+                'evictions'    : self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+    def _remove(self, key):
+        _, tag, _ = self._entries.pop(key)
+        if tag is not None:
+            keys = self._tags.get(tag)
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
@@ -0,0 +1,52 @@
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """
+    약한(weak) ETag 생성 함수.
+
+    같은 데이터도 JSON 인코더(orjson 등)에 따라 바이트가 다를 수 있으므로 약한 ETag 를 사용한다.
+    """
+
+    return 'W/"%s"' % '.'.join(str(part) for part in parts)
+
+
+def set_validators(response, etag, last_modified=None):
+    """
+    응답에 ETag, Last-Modified, Vary 헤더를 설정한다.
+
+    응답은 Authorization 헤더(유저)에 따라 다르므로 `Vary: Authorization`을 추가한다.
+    """
+
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    조건부 요청(conditional GET) 확인 함수.
+
+    If-None-Match(없으면 If-Modified-Since)가 현재 값과 일치하면 304 응답을 반환하고, 아니면 None 을 반환한다.
+    Last-Modified 는 초 단위이므로 같은 초 안의 변경은 ETag 로만 구분된다.
+
+    parameters
+    ----------
+    request: HttpRequest
+    etag: str
+    last_modified: datetime or None
+
+    returns
+    -------
+    HttpResponseNotModified or None
+    """
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+    if response is None or response.status_code != 304:
+        return None
+    return set_validators(response, etag, last_modified)
@@ -0,0 +1,15 @@
+from django.db.backends.mysql import base
+
+from utils.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    연결 풀 MySQL 백엔드. (ENGINE: 'utils.db.mysql')
+
+    원격 MySQL 서버와의 TCP 연결･인증(handshake)을 요청마다 반복하지 않도록 연결을 재사용한다.
+    pre-ping 은 `MySQLdb.Connection.ping()`을 사용한다.
+    """
+
+    def ping_connection(self, connection):
+        connection.ping()
@@ -0,0 +1,264 @@
+import collections
+import functools
+import threading
+import time
+
+from django.conf import settings
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    DB 연결 풀 클래스.
+
+    최대 max_size 개의 연결을 만들고, 반납된 연결은 idle 목록에 보관하였다가 재사용한다. (LIFO)
+    모든 연결이 사용 중이면 timeout 초 동안 반납을 기다리며, 초과하면 `PoolTimeout`을 발생시킨다.
+    꺼낸 연결은 생성 후 max_lifetime 초가 지났으면 닫고, pre_ping 이면 `ping()`으로 상태를 확인한 뒤 반환한다.
+    생성･재사용･폐기 횟수와 대기 시간 등 카운터를 `stats()`로 제공한다.
+
+    parameters
+    ----------
+    connect: callable (() → connection)
+    close: callable (connection → None)
+    ping: callable (connection → None, 실패 시 예외) or None
+    min_size: int (`warm()`으로 미리 만들고, 만료 외에는 유지하는 연결 수)
+    max_size: int
+    max_lifetime: float or None (초)
+    timeout: float (초)
+    """
+
+    def __init__(self, connect, close, ping=None, min_size=0, max_size=10, max_lifetime=None, timeout=10,
+                 clock=time.monotonic):
+        self.connect = connect
+        self.close = close
+        self.ping = ping
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.clock = clock
+        self._condition = threading.Condition()
+        self._idle = collections.deque()
+        self._created_at = {}
+        self.size = 0
+        self.in_use = 0
+        self.created = 0
+        self.reused = 0
+        self.discarded = 0
+        self.ping_failures = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.timeouts = 0
+
+    def warm(self):
+        """연결 수가 min_size 가 될 때까지 연결을 만들어 idle 목록에 넣는다."""
+
+        while True:
+            with self._condition:
+                if self.size >= self.min_size:
+                    return
+                self.size += 1
+            connection = self._create()
+            with self._condition:
+                self._idle.append(connection)
+                self._condition.notify()
+
+    def acquire(self):
+        """연결을 꺼낸다. idle 연결이 없고 max_size 에 도달했으면 반납될 때까지 기다린다."""
+
+        started = self.clock()
+        waited = False
+        while True:
+            with self._condition:
+                while not self._idle and self.size >= self.max_size:
+                    remaining = self.timeout - (self.clock() - started)
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        self._record_wait(started)
+                        raise PoolTimeout('no connection available within %.1fs.' % self.timeout)
+                    waited = True
+                    self._condition.wait(remaining)
+                if waited:
+                    self._record_wait(started)
+                    waited = False
+                if self._idle:
+                    connection = self._idle.pop()
+                else:
+                    connection = None
+                    self.size += 1
+                self.in_use += 1
+
+            if connection is None:
+                try:
+                    return self._create()
+                except Exception:
+                    with self._condition:
+                        self.size -= 1
+                        self.in_use -= 1
+                        self._condition.notify()
+                    raise
+            if self._is_usable(connection):
+                with self._condition:
+                    self.reused += 1
+                return connection
+            with self._condition:
+                self.in_use -= 1
+            self._discard(connection)
+
+    def release(self, connection, discard=False):
+        """연결을 반납한다. discard 이거나 수명이 지난 연결은 닫는다."""
+
+        with self._condition:
+            self.in_use -= 1
+        if discard or self._expired(connection):
+            self._discard(connection)
+            return
+        with self._condition:
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def close_all(self):
+        """idle 연결을 모두 닫는다."""
+
+        with self._condition:
+            connections, self._idle = list(self._idle), collections.deque()
+        for connection in connections:
+            self._discard(connection)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size'         : self.size,
+                'idle'         : len(self._idle),
+                'in_use'       : self.in_use,
+                'min_size'     : self.min_size,
+                'max_size'     : self.max_size,
+                'created'      : self.created,
+                'reused'       : self.reused,
+                'discarded'    : self.discarded,
+                'ping_failures': self.ping_failures,
+                'waits'        : self.waits,
+                'wait_time'    : self.wait_time,
+                'max_wait_time': self.max_wait_time,
+                'timeouts'     : self.timeouts,
+            }
+
+    def _create(self):
+        connection = self.connect()
+        with self._condition:
+            self._created_at[id(connection)] = self.clock()
+            self.created += 1
+        return connection
+
+    def _expired(self, connection):
+        if self.max_lifetime is None:
+            return False
+        return self.clock() - self._created_at.get(id(connection), 0) >= self.max_lifetime
+
+    def _is_usable(self, connection):
+        if self._expired(connection):
+            return False
+        if self.ping is None:
+            return True
+        try:
+            self.ping(connection)
+        except Exception:
+            with self._condition:
+                self.ping_failures += 1
+            return False
+        return True
+
+    def _discard(self, connection):
+        try:
+            self.close(connection)
+        except Exception:
+            pass
+        with self._condition:
+            self._created_at.pop(id(connection), None)
+            self.size -= 1
+            self.discarded += 1
+            self._condition.notify()
+
+    def _record_wait(self, started):
+        elapsed = self.clock() - started
+        self.waits += 1
+        self.wait_time += elapsed
+        self.max_wait_time = max(self.max_wait_time, elapsed)
+
+
+# 프로세스의 연결 풀 ((DB alias, 연결 인자) → ConnectionPool)
+pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_stats():
+    """DB alias 별 연결 풀 카운터를 반환한다."""
+
+    with _pools_lock:
+        return {alias: pool.stats() for (alias, _), pool in pools.items()}
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    연결 풀 DB 백엔드 mixin.
+
+    `DatabaseWrapper`의 새 연결 생성과 연결 닫기를 풀에서 꺼내기･풀에 반납하기로 바꾼다.
+    Django 는 요청이 끝날 때(`close_old_connections`) 연결을 닫으므로 `CONN_MAX_AGE`는 0 으로 두고
+    연결 수명은 풀의 MAX_LIFETIME 으로 관리한다. WSGI 의 요청 스레드와 ASGI 의 DB 스레드(`utils.aio.run_db`) 모두
+    요청마다 연결을 꺼내고 반납한다.
+
+    DATABASES 설정의 `POOL` 항목 (없으면 `DATABASE_POOL` 설정)
+        MIN_SIZE: int (기본값 0)
+        MAX_SIZE: int (기본값 10)
+        MAX_LIFETIME: float or None (초, 기본값 1800)
+        PRE_PING: bool (기본값 True)
+        TIMEOUT: float (초, 기본값 10)
+    """
+
+    def get_pool(self, conn_params):
+        """연결 인자(conn_params)별 풀을 (최초 호출 시) 생성하여 반환한다. (테스트 DB 전환 시 풀이 분리된다)"""
+
+        key = (self.alias, repr(sorted(conn_params.items())))
+        pool = pools.get(key)
+        if pool is not None:
+            return pool
+        with _pools_lock:
+            if key not in pools:
+                options = self.settings_dict.get('POOL') or getattr(settings, 'DATABASE_POOL', {})
+                pools[key] = ConnectionPool(
+                    connect=functools.partial(super().get_new_connection, conn_params),
+                    close=lambda connection: connection.close(),
+                    ping=self.ping_connection if options.get('PRE_PING', True) else None,
+                    min_size=options.get('MIN_SIZE', 0),
+                    max_size=options.get('MAX_SIZE', 10),
+                    max_lifetime=options.get('MAX_LIFETIME', 1800),
+                    timeout=options.get('TIMEOUT', 10),
+                )
+                pools[key].warm()
+            return pools[key]
+
+    def ping_connection(self, connection):
+        raise NotImplementedError
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        try:
+            return self.pool.acquire()
+        except PoolTimeout as e:
+            raise self.Database.OperationalError(str(e))
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        discard = self.errors_occurred or self.in_atomic_block
+        if not discard:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+        self.pool.release(connection, discard=discard)
@@ -0,0 +1,14 @@
+from django.db.backends.sqlite3 import base
+
+from utils.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    연결 풀 SQLite 백엔드. (ENGINE: 'utils.db.sqlite3')
+
+    로컬 테스트에서 `utils.db.mysql`을 대신하는 백엔드이다.
+    """
+
+    def ping_connection(self, connection):
+        connection.execute('SELECT 1')
@@ -1,9 +1,69 @@
+import asyncio
+import functools
+
+from collections import namedtuple
+
 import jwt
 import my_settings
 
-from django.http import JsonResponse
+from django.conf import settings
 from users.models import User
+from utils.aio import run_db
+from utils.cache import TTLCache
 from utils.exceptions import UnauthorizedException
+from utils.responses import JsonResponse
+from utils import routers, timing
+
+# 인가된 유저의 경량 정보 (뷰는 `request.user.id`만 사용한다)
+Principal = namedtuple('Principal', ['id', 'email'])
+
+# 검증된 token → Principal 캐시
+# 유저 삭제･비밀번호 변경 시 `users.signals`가 해당 유저 항목을 무효화한다.
+# 프로세스 간 무효화는 되지 않으므로 TTL 이 다른 프로세스의 최대 지연 시간이 된다.
+principal_cache = TTLCache(max_size=getattr(settings, 'AUTH_PRINCIPAL_CACHE_SIZE', 10000),
+                           ttl=getattr(settings, 'AUTH_PRINCIPAL_CACHE_TTL', 300))
+
+
+def load_principal(access_token):
+    """
+    token 검증 함수.
+
+    token 을 decoding 하여 유저를 조회한 뒤 캐시에 저장한다.
+
+    parameters
+    ----------
+    access_token: str
+
+    returns
+    -------
+    principal: Principal
+    """
+
+    payload = jwt.decode(jwt=access_token, key=my_settings.SECRET_KEY, algorithms=my_settings.ALGORITHM)
+    user = User.objects.only('id', 'email').get(id=payload['user_id'])
+    principal = Principal(id=user.id, email=user.email)
+    principal_cache.set(access_token, principal, tag=user.id)
+    return principal
+
+
+def get_principal(access_token):
+    """
+    인가 정보 조회 함수.
+
+    캐시에 있으면 jwt decoding 과 유저 조회 없이 반환하고, 없으면 `load_principal`로 검증한다.
+    """
+
+    return principal_cache.get(access_token) or load_principal(access_token)
+
+
+async def aget_principal(access_token):
+    """
+    인가 정보 조회 함수. (비동기)
+
+    캐시 조회는 이벤트 루프에서 수행하며, 캐시에 없을 때만 DB 스레드에서 검증한다.
+    """
+
+    return principal_cache.get(access_token) or await run_db(load_principal, access_token)
 
 
 def login_decorator(func):
@@ -11,19 +71,46 @@ def login_decorator(func):
     인가(Authorization) 함수.
 
     Authorization 헤더 값(jwt token)의 유효성을 검증한다.
+    코루틴 함수(비동기 뷰 핸들러)에 적용하면 비동기 wrapper 를 반환한다.
+    검증 시간은 현재 요청의 auth 구간(`utils.timing`)에 기록하며,
+    뷰 실행 중에는 인가된 유저를 DB 라우팅 컨텍스트(`utils.routers`)에 설정한다.
     """
 
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(self, request, *args, **kwargs):
+            try:
+                access_token = request.headers.get('Authorization')
+                if not access_token:
+                    raise UnauthorizedException
+                with timing.timer('auth'):
+                    request.user = await aget_principal(access_token)
+            except UnauthorizedException as e:
+                return JsonResponse({"error": e.message}, status=e.status)
+            except (jwt.exceptions.DecodeError, KeyError, User.DoesNotExist):
+                return JsonResponse({"error": "invalid token."}, status=400)
+            token = routers.set_user(request.user.id, primary=request.method not in ('GET', 'HEAD', 'OPTIONS'))
+            try:
+                return await func(self, request, *args, **kwargs)
+            finally:
+                routers.reset_user(token)
+        return async_wrapper
+
+    @functools.wraps(func)
     def wrapper(self, request, *args, **kwargs):
         try:
             if not request.headers.get('Authorization'):
                 raise UnauthorizedException
             access_token = request.headers.get('Authorization')
-            payload = jwt.decode(jwt=access_token, key=my_settings.SECRET_KEY, algorithms=my_settings.ALGORITHM)
-            user = User.objects.get(id=payload['user_id'])
-            request.user = user
+            with timing.timer('auth'):
+                request.user = get_principal(access_token)
         except UnauthorizedException as e:
             return JsonResponse({"error": e.message}, status=e.status)
-        except jwt.exceptions.DecodeError:
+        except (jwt.exceptions.DecodeError, KeyError, User.DoesNotExist):
             return JsonResponse({"error": "invalid token."}, status=400)
-        return func(self, request, *args, **kwargs)
+        token = routers.set_user(request.user.id, primary=request.method not in ('GET', 'HEAD', 'OPTIONS'))
+        try:
+            return func(self, request, *args, **kwargs)
+        finally:
+            routers.reset_user(token)
     return wrapper
@@ -32,3 +32,17 @@ class DataTooLongException(AbstractException):
     def __init__(self, message="data too long.", status=413):
         self.message = message
         self.status = status
+
+
+class ServiceUnavailableException(AbstractException):
+    def __init__(self, message="server is busy. try again later.", status=503, retry_after=1):
+        self.message = message
+        self.status = status
+        self.retry_after = retry_after
+
+
+class TooManyRequestsException(AbstractException):
+    def __init__(self, message="too many requests. try again later.", status=429, retry_after=1):
+        self.message = message
+        self.status = status
+        self.retry_after = retry_after
@@ -0,0 +1,123 @@
+import csv
+import datetime
+import io
+import itertools
+import json
+
+from django.conf import settings
+
+from utils.responses import format_datetime
+from utils.streaming import BUFFER_SIZE, ENCODE_BATCH_SIZE
+
+# 열(column) 단위 형식의 batch 당 행 수
+COLUMNAR_BATCH_SIZE = getattr(settings, 'EXPORT_COLUMNAR_BATCH_SIZE', 5000)
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def to_columns(batch):
+    """
+    행(tuple) batch 를 열 리스트로 바꾼다.
+
+    date･datetime 열은 열 단위로 문자열(`DjangoJSONEncoder`와 같은 형식)로 변환한다. (null 은 유지)
+    """
+
+    columns = [list(column) for column in zip(*batch)]
+    for index, column in enumerate(columns):
+        kinds = set(map(type, column))
+        if datetime.datetime in kinds:
+            columns[index] = [format_datetime(value) if value is not None else None for value in column]
+        elif datetime.date in kinds:
+            columns[index] = [value.isoformat() if value is not None else None for value in column]
+    return columns
+
+
+def stream_csv(rows, fields):
+    """
+    CSV 스트리밍 함수.
+
+    첫 줄은 필드 이름이며 ENCODE_BATCH_SIZE 행 단위로 쓰고, 버퍼가 BUFFER_SIZE 이상이 될 때마다 반환한다.
+    엑셀에서 한글이 깨지지 않도록 UTF-8 BOM 으로 시작한다. null 은 빈 칸이다.
+
+    parameters
+    ----------
+    rows: iterable of tuple
+    fields: tuple of str
+
+    returns
+    -------
+    chunks: generator of str
+    """
+
+    buffer = io.StringIO()
+    buffer.write('\ufeff')
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for batch in batches(rows, ENCODE_BATCH_SIZE):
+        writer.writerows(zip(*to_columns(batch)))
+        if buffer.tell() >= BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def encode_column(column):
+    """
+    열 인코딩 함수.
+
+    문자열 열의 서로 다른 값이 행 수의 절반 이하이면 사전(dictionary) 부호화한다.
+        {"values": [고유 값, ...], "codes": [값 위치, ...]}
+    그 외 열은 값 리스트 그대로 둔다.
+    """
+
+    if set(map(type, column)) != {str}:
+        return column
+    codes, values = {}, []
+    for value in column:
+        if value not in codes:
+            codes[value] = len(values)
+            values.append(value)
+            if len(values) * 2 > len(column):
+                return column
+    return {'values': values, 'codes': [codes[value] for value in column]}
+
+
+def stream_columnar(rows, fields, batch_size=COLUMNAR_BATCH_SIZE):
+    """
+    열(column) 단위 스트리밍 함수. (NDJSON)
+
+    첫 줄은 `{"fields": [...]}`이고, 이후 batch_size 행마다 한 줄씩
+    `{"rows": n, "columns": [열, ...]}`를 쓴다. 열은 fields 순서이며 `encode_column()`으로 인코딩한다.
+    행마다 필드 이름을 반복하지 않고 반복되는 문자열을 한 번만 쓰므로 CSV･JSON 보다 작고,
+    읽는 쪽은 줄마다 열 배열을 그대로 사용할 수 있다. (예: `pandas.DataFrame(dict(zip(fields, columns)))`)
+
+    parameters
+    ----------
+    rows: iterable of tuple
+    fields: tuple of str
+    batch_size: int
+
+    returns
+    -------
+    chunks: generator of str
+    """
+
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    buffer = [dumps({'fields': list(fields)}) + '\n']
+    size = 0
+    for batch in batches(rows, batch_size):
+        line = dumps({'rows': len(batch), 'columns': [encode_column(column) for column in to_columns(batch)]})
+        buffer.append(line + '\n')
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    yield ''.join(buffer)
@@ -0,0 +1,111 @@
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import bcrypt
+
+from django.conf import settings
+
+from .exceptions import ServiceUnavailableException
+
+# bcrypt cost factor (2^rounds 회 반복)
+BCRYPT_ROUNDS = getattr(settings, 'BCRYPT_ROUNDS', 12)
+
+
+class HashingPool:
+    """
+    비밀번호 해싱 전용 스레드 풀 클래스.
+
+    bcrypt 연산은 요청 스레드가 아닌 크기가 제한된 풀에서 실행된다.
+    (bcrypt 는 연산 중 GIL 을 해제하므로 스레드로도 코어 수만큼 병렬 실행된다)
+    실행 중･대기 중인 작업 수가 `workers + max_pending`을 넘으면 즉시 503 에러를 반환하여
+    로그인 폭주가 다른 요청을 처리할 worker 를 모두 점유하지 않도록 한다. (backpressure)
+    """
+
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.in_flight = 0
+
+    def run(self, func, *args):
+        """func 를 풀에서 실행하고 결과를 반환한다. 대기열이 가득 차면 503 에러를 발생시킨다."""
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ServiceUnavailableException(retry_after=1)
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise ServiceUnavailableException(retry_after=1)
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers'    : self.workers,
+                'max_pending': self.max_pending,
+                'in_flight'  : self.in_flight,
+                'submitted'  : self.submitted,
+                'rejected'   : self.rejected,
+            }
+
+
+hashing_pool = HashingPool(workers=getattr(settings, 'PASSWORD_HASHER_WORKERS', None) or os.cpu_count() or 1,
+                           max_pending=getattr(settings, 'PASSWORD_HASHER_MAX_PENDING', 32),
+                           timeout=getattr(settings, 'PASSWORD_HASHER_TIMEOUT', 5))
+
+
+def hash_password(password, rounds=None):
+    """
+    비밀번호 해싱 함수.
+
+    parameters
+    ----------
+    password: str
+    rounds: int (default: BCRYPT_ROUNDS)
+
+    returns
+    -------
+    hashed_password: str
+    """
+
+    salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
+    return hashing_pool.run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+
+def verify_password(password, hashed_password):
+    """비밀번호와 해시 값의 일치 여부를 반환한다."""
+
+    return hashing_pool.run(bcrypt.checkpw, password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+def get_rounds(hashed_password):
+    """해시 값(`$2b$<rounds>$...`)에 저장된 cost factor 를 반환한다."""
+
+    try:
+        return int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(hashed_password):
+    """저장된 해시의 cost factor 가 설정값과 다른지 확인한다."""
+
+    return get_rounds(hashed_password) != BCRYPT_ROUNDS
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.views import View
+
+from users.email_filter import email_filter
+from utils import admission
+from utils.db.pool import pool_stats
+from utils.decorators import principal_cache
+from utils.exceptions import PermissionException
+from utils.hashing import hashing_pool
+from utils.routers import replica_state
+from utils.responses import JsonResponse
+from utils.timing import route_metrics
+
+
+class MetricsView(View):
+    """
+    성능 지표 조회 뷰.
+
+    `TimingMiddleware`가 집계한 경로별 히스토그램과
+    인가 캐시･비밀번호 해싱 풀･admission control･회원가입 이메일 filter･DB 연결 풀･DB 라우팅 카운터를
+    반환한다.
+    `METRICS_ALLOWED_IPS`에 있는 주소(기본값: localhost)에서만 조회할 수 있다.
+    """
+
+    def get(self, request):
+        """
+        성능 지표 조회 뷰 함수.
+
+        returns
+        -------
+        JsonResponse: JSON
+            200: 조회 성공
+            403: 허용되지 않은 주소
+        """
+
+        try:
+            if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1']):
+                raise PermissionException
+
+            return JsonResponse({
+                "routes"         : route_metrics.snapshot(),
+                "principal_cache": principal_cache.stats(),
+                "password_hasher": hashing_pool.stats(),
+                "admission"      : admission.stats(),
+                "email_filter"   : email_filter.stats(),
+                "db_pools"       : pool_stats(),
+                "db_routing"     : replica_state.stats(),
+            }, status=200)
+        except PermissionException as e:
+            return JsonResponse({"error": e.message}, status=e.status)
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.utils.deprecation import MiddlewareMixin
+
+from utils import timing
+
+logger = logging.getLogger('accountbooks.timing')
+
+# 새 DB 연결(ASGI 의 동기 뷰 스레드 등)에도 쿼리 계측 함수를 설치한다.
+connection_created.connect(timing.install)
+
+
+class TimingMiddleware(MiddlewareMixin):
+    """
+    요청별 성능 계측 미들웨어.
+
+    요청마다 DB 쿼리 수･시간, 인가(auth), 뷰(view), 직렬화(serialize) 시간을 측정하여
+    `Server-Timing` 헤더와 구조화된(JSON) 로그로 남기고 경로별 히스토그램(`timing.route_metrics`)에 집계한다.
+
+    DB 쿼리는 각 연결에 설치된 `timing.record_query`가 기록한다. WSGI 에서는 요청 스레드의 연결에 설치하고,
+    ASGI 에서는 `utils.aio.run_db`가 DB 스레드의 연결에 설치하므로 이벤트 루프에서는 시간만 측정한다.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not getattr(settings, 'REQUEST_TIMING_ENABLED', True):
+            return self.get_response(request)
+
+        timings, token = timing.start()
+        try:
+            timing.install(connection)
+            response = self.get_response(request)
+        finally:
+            timing.stop(token)
+        return self.record(request, response, timings)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'REQUEST_TIMING_ENABLED', True):
+            return await self.get_response(request)
+
+        timings, token = timing.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.stop(token)
+        return self.record(request, response, timings)
+
+    @staticmethod
+    def record(request, response, timings):
+        timings.finish()
+        match = getattr(request, 'resolver_match', None)
+        route = '%s %s' % (request.method, match.route if match else '<unresolved>')
+
+        response['Server-Timing'] = timings.server_timing()
+        timing.route_metrics.observe(route, timings, response.status_code)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'route'  : route,
+                'path'   : request.path,
+                'status' : response.status_code,
+                'queries': timings.queries,
+                'ms'     : {phase: round(duration, 3) for phase, duration in timings.as_dict().items()},
+            }))
+        return response
@@ -0,0 +1,114 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+from .exceptions import InvalidValueException
+from .responses import Rows
+
+# 페이지 크기 기본값 및 상한값
+DEFAULT_PAGE_SIZE = getattr(settings, 'EXPENSE_PAGE_SIZE', 100)
+MAX_PAGE_SIZE = getattr(settings, 'EXPENSE_MAX_PAGE_SIZE', 1000)
+
+
+def encode_cursor(date, pk):
+    """
+    커서 인코딩 함수.
+
+    마지막 행의 (date, id) 값을 클라이언트가 해석할 수 없는(opaque) 문자열로 변환한다.
+
+    parameters
+    ----------
+    date: datetime.date
+    pk: int
+
+    returns
+    -------
+    cursor: str (url-safe base64)
+    """
+
+    raw = json.dumps([date.isoformat(), pk], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('utf-8').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    커서 디코딩 함수.
+
+    parameters
+    ----------
+    cursor: str
+
+    returns
+    -------
+    (date, pk): (datetime.date, int)
+    """
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date, pk = json.loads(base64.urlsafe_b64decode(padded.encode('utf-8')))
+        return datetime.date.fromisoformat(date), int(pk)
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidValueException(message="invalid cursor.")
+
+
+def get_page_size(request):
+    """
+    쿼리 파라미터 `limit` 검사 함수.
+
+    값이 없으면 기본값을 반환하며, 1 ~ MAX_PAGE_SIZE 범위를 벗어나면 에러를 반환한다.
+    """
+
+    limit = request.GET.get('limit', None)
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise InvalidValueException(message="'limit' must be between 1 and %d." % MAX_PAGE_SIZE)
+    return limit
+
+
+def paginate(queryset, request, fields):
+    """
+    키셋(keyset, cursor) 페이지네이션 함수.
+
+    (date, id) 순으로 정렬한 뒤 직전 페이지의 마지막 (date, id) 이후의 행만 조회한다.
+    OFFSET 과 달리 페이지 깊이와 관계없이 인덱스 탐색 비용이 일정하다.
+    다음 페이지 존재 여부는 `limit + 1`개를 조회하여 판단한다.
+
+    parameters
+    ----------
+    queryset: QuerySet
+    request: HttpRequest
+        query parameters
+            limit: int
+            cursor: str
+    fields: tuple of str (`date`, `id` 포함)
+
+    returns
+    -------
+    (rows, next_cursor): (Rows, str or None)
+        rows 는 `values_list()` 행을 담은 `utils.responses.Rows`이며 `JsonResponse`가 직접 인코딩한다.
+    """
+
+    limit = get_page_size(request)
+    cursor = request.GET.get('cursor', None)
+
+    queryset = queryset.order_by('date', 'id')
+    if cursor:
+        date, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(date__gt=date) | Q(date=date, id__gt=pk))
+
+    rows = list(queryset.values_list(*fields)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = dict(zip(fields, rows[-1]))
+        next_cursor = encode_cursor(last['date'], last['id'])
+    return Rows(fields, rows), next_cursor
@@ -0,0 +1,201 @@
+import datetime
+import json
+
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse as BaseJsonResponse
+
+from utils import timing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class Rows:
+    """
+    `values_list()` 결과 래퍼 클래스.
+
+    행(tuple) 리스트와 필드 이름을 함께 보관하며, 인코딩 시 중간 dict 없이 JSON 객체 배열로 변환한다.
+    """
+
+    __slots__ = ('fields', 'rows')
+
+    def __init__(self, fields, rows):
+        self.fields = tuple(fields)
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        fields = self.fields
+        return (dict(zip(fields, row)) for row in self.rows)
+
+    def as_dicts(self):
+        """date･datetime 열을 문자열로 변환한 dict 리스트를 반환한다. (orjson 용)"""
+
+        if not self.rows:
+            return []
+        columns = list(zip(*self.rows))
+        for index, column in enumerate(columns):
+            kinds = set(map(type, column))
+            if kinds == {datetime.date}:
+                columns[index] = map(datetime.date.isoformat, column)
+            elif kinds == {datetime.datetime}:
+                columns[index] = map(format_datetime, column)
+        fields = self.fields
+        return [dict(zip(fields, row)) for row in zip(*columns)]
+
+
+def format_datetime(value):
+    """`DjangoJSONEncoder`와 같은 형식(밀리초, UTC 는 Z)으로 datetime 을 변환한다."""
+
+    text = value.isoformat()
+    if value.microsecond:
+        text = text[:23] + text[26:]
+    if text.endswith('+00:00'):
+        text = text[:-6] + 'Z'
+    return text
+
+
+_django_default = DjangoJSONEncoder().default
+
+
+def default(value):
+    """json 인코더의 default 함수. date･datetime 은 타입 검사 한 번으로 변환한다."""
+
+    value_type = type(value)
+    if value_type is datetime.date:
+        return value.isoformat()
+    if value_type is datetime.datetime:
+        return format_datetime(value)
+    if value_type is Rows:
+        return value.as_dicts()
+    return _django_default(value)
+
+
+def _encode_value(encode_string, ensure_ascii):
+    encoders = {
+        int              : int.__repr__,
+        str              : encode_string,
+        type(None)       : lambda value: 'null',
+        bool             : lambda value: 'true' if value else 'false',
+        datetime.date    : lambda value: '"%s"' % value.isoformat(),
+        datetime.datetime: lambda value: '"%s"' % format_datetime(value),
+    }
+
+    def encode(value):
+        encoder = encoders.get(type(value))
+        if encoder is None:
+            return json.dumps(value, default=default, ensure_ascii=ensure_ascii)
+        return encoder(value)
+
+    return encode
+
+
+_ENCODE_VALUE = {
+    True : _encode_value(encode_basestring_ascii, True),
+    False: _encode_value(encode_basestring, False),
+}
+
+
+def encode_rows(fields, rows, ensure_ascii=True):
+    """
+    행(tuple) 리스트 인코딩 함수.
+
+    행을 열(column) 단위로 바꾼 뒤 열의 값 타입이 하나(int, str, date, datetime)이면
+    열 전체를 한 번에 변환하고, 행마다 `'{"id": %d, "date": "%s", ...}' % row` 형식 문자열로 인코딩한다.
+    date･datetime 은 `DjangoJSONEncoder`와 같은 형식이며, 타입이 섞인 열(null 포함)은 값마다 인코딩한다.
+
+    parameters
+    ----------
+    fields: tuple of str
+    rows: list of tuple
+    ensure_ascii: bool
+
+    returns
+    -------
+    list of str (행별 JSON 객체)
+    """
+
+    if not rows:
+        return []
+    encode_string = encode_basestring_ascii if ensure_ascii else encode_basestring
+    encode_value = _ENCODE_VALUE[ensure_ascii]
+
+    columns = list(zip(*rows))
+    specs = []
+    for index, column in enumerate(columns):
+        kinds = set(map(type, column))
+        if kinds == {int}:
+            specs.append('%d')
+            continue
+        if kinds == {str}:
+            columns[index], spec = map(encode_string, column), '%s'
+        elif kinds == {datetime.date}:
+            columns[index], spec = map(datetime.date.isoformat, column), '"%s"'
+        elif kinds == {datetime.datetime}:
+            columns[index], spec = map(format_datetime, column), '"%s"'
+        else:
+            columns[index], spec = map(encode_value, column), '%s'
+        specs.append(spec)
+
+    template = '{%s}' % ', '.join('%s: %s' % (encode_string(field).replace('%', '%%'), spec)
+                                  for field, spec in zip(fields, specs))
+    return [template % row for row in zip(*columns)]
+
+
+def dumps(data):
+    """
+    빠른 JSON 인코딩 함수.
+
+    date･datetime 은 `DjangoJSONEncoder`와 같은 형식으로 변환한다.
+    orjson(선택 의존성, requirements 에 포함하지 않는다)이 설치되어 있으면 orjson 으로 인코딩하고,
+    아니면 표준 json 모듈(C 인코더)로 인코딩하되 최상위 dict 의 `Rows` 값은 `encode_rows()`로 직접 인코딩한다.
+    출력 바이트는 경로에 따라 다르다.
+        표준 json: `DjangoJSONEncoder`와 바이트 단위로 같다. (", "･": " 구분자, 비 ASCII 문자는 \\uXXXX)
+        orjson: 값은 같지만 공백 없는 구분자(",", ":")와 UTF-8 문자 그대로 출력한다.
+
+    returns
+    -------
+    content: bytes
+    """
+
+    if orjson is not None:
+        return orjson.dumps(data, default=default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+
+    if not isinstance(data, dict):
+        return json.dumps(data, default=default).encode('utf-8')
+    items = []
+    for key, value in data.items():
+        if type(value) is Rows:
+            value = '[%s]' % ', '.join(encode_rows(value.fields, value.rows))
+        else:
+            value = json.dumps(value, default=default)
+        items.append('%s: %s' % (json.dumps(str(key)), value))
+    return ('{%s}' % ', '.join(items)).encode('utf-8')
+
+
+class JsonResponse(BaseJsonResponse):
+    """
+    JSON 응답 클래스.
+
+    `django.http.JsonResponse`와 같으며, JSON 직렬화 시간을 현재 요청의 serialize 구간에 기록한다.
+    encoder 와 json_dumps_params 를 지정하지 않고 `JSON_FAST_ENCODER`가 True 이면 `dumps()`로 인코딩한다.
+    """
+
+    def __init__(self, data, encoder=None, safe=True, json_dumps_params=None, **kwargs):
+        with timing.timer('serialize'):
+            if encoder is None and json_dumps_params is None and getattr(settings, 'JSON_FAST_ENCODER', True):
+                if safe and not isinstance(data, dict):
+                    raise TypeError(
+                        'In order to allow non-dict objects to be serialized set the safe parameter to False.'
+                    )
+                kwargs.setdefault('content_type', 'application/json')
+                HttpResponse.__init__(self, content=dumps(data), **kwargs)
+            else:
+                super().__init__(data, encoder or DjangoJSONEncoder, safe, json_dumps_params, **kwargs)
@@ -0,0 +1,266 @@
+import contextvars
+import datetime
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+# 현재 요청의 라우팅 컨텍스트 (`login_decorator`가 인가된 유저로 설정한다)
+_context = contextvars.ContextVar('routing_context', default=None)
+
+
+class RoutingContext:
+    def __init__(self, user_id, pinned=None):
+        self.user_id = user_id
+        self.pinned = pinned
+
+
+def set_user(user_id, primary=False):
+    """
+    현재 요청의 유저를 설정하고 reset token 을 반환한다.
+
+    primary 이면 요청의 모든 읽기를 primary 로 보낸다. (쓰기 요청의 읽기-수정-쓰기가 지연된 데이터를 읽지 않도록)
+    """
+
+    return _context.set(RoutingContext(user_id, pinned=True if primary else None))
+
+
+def reset_user(token):
+    _context.reset(token)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def measure_lag(alias):
+    """
+    복제 지연 시간 측정 함수.
+
+    MySQL 은 `SHOW SLAVE STATUS`의 Seconds_Behind_Master 값(초)을 반환하며,
+    복제가 멈춘 경우(None) 예외를 발생시킨다. 그 외 DB(로컬 SQLite stand-in 등)는 0 을 반환한다.
+    """
+
+    connection = connections[alias]
+    if connection.vendor != 'mysql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute('SHOW SLAVE STATUS')
+        row = cursor.fetchone()
+        if row is None:
+            raise RuntimeError('replication is not configured.')
+        lag = dict(zip([column[0] for column in cursor.description], row)).get('Seconds_Behind_Master')
+    if lag is None:
+        raise RuntimeError('replication is stopped.')
+    return float(lag)
+
+
+class ReplicaState:
+    """
+    replica 라우팅 상태 클래스.
+
+    쓰기 후 primary 고정(pin) 유저 목록, replica 별 복제 지연 시간, 라우팅 카운터를 보관한다.
+    복제 지연은 REPLICA_LAG_CHECK_INTERVAL 초마다 한 스레드만 측정하며,
+    REPLICA_MAX_LAG 초를 넘거나 측정에 실패한 replica 는 다음 측정 전까지 사용하지 않는다.
+    """
+
+    def __init__(self, measure=measure_lag, clock=time.monotonic):
+        self.measure = measure
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._pins = {}
+        self._lag = {}
+        self._checked_at = None
+        self._next = itertools.count()
+        self.counters = {'primary_only_reads': 0, 'replica_reads': 0, 'pinned_reads': 0, 'atomic_reads': 0,
+                         'fallback_reads': 0, 'writes': 0}
+        self.replica_reads = {}
+
+    def count(self, name, alias=None):
+        with self._lock:
+            self.counters[name] += 1
+            if alias is not None:
+                self.replica_reads[alias] = self.replica_reads.get(alias, 0) + 1
+
+    def pin(self, user_id, window):
+        with self._lock:
+            now = self.clock()
+            if len(self._pins) > 10000:
+                self._pins = {key: expires_at for key, expires_at in self._pins.items() if expires_at > now}
+            self._pins[user_id] = now + window
+
+    def is_pinned(self, user_id):
+        with self._lock:
+            expires_at = self._pins.get(user_id)
+            return expires_at is not None and expires_at > self.clock()
+
+    def healthy_replicas(self, replicas):
+        self.check_lag(replicas)
+        max_lag = getattr(settings, 'REPLICA_MAX_LAG', 10)
+        with self._lock:
+            return [alias for alias in replicas
+                    if self._lag.get(alias, {}).get('seconds') is not None and self._lag[alias]['seconds'] <= max_lag]
+
+    def choose(self, replicas):
+        """정상 replica 중 하나를 순서대로(round-robin) 반환한다. 없으면 None."""
+
+        healthy = self.healthy_replicas(replicas)
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    def check_lag(self, replicas, force=False):
+        interval = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5)
+        if not force and self._checked_at is not None and self.clock() - self._checked_at < interval:
+            return
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            for alias in replicas:
+                try:
+                    lag = {'seconds': self.measure(alias), 'error': None}
+                except Exception as e:
+                    lag = {'seconds': None, 'error': str(e)}
+                with self._lock:
+                    self._lag[alias] = lag
+            self._checked_at = self.clock()
+        finally:
+            self._check_lock.release()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, replica_reads_by_alias=dict(self.replica_reads), lag=dict(self._lag),
+                        pinned_users=sum(1 for expires_at in self._pins.values() if expires_at > self.clock()))
+
+
+replica_state = ReplicaState()
+
+
+def wrote_recently(user_id, window):
+    """
+    다른 프로세스에서의 쓰기 확인 함수.
+
+    쓰기마다 갱신되는 가계부 버전(`LedgerVersion.updated_at`)을 유저 shard 의 primary 에서 조회하여
+    window 초 안에 쓰기가 있었는지 확인한다.
+    """
+
+    from expenses import sharding
+    from expenses.models import LedgerVersion
+
+    updated_at = LedgerVersion.objects.using(sharding.get_shard(user_id)).filter(user_id=user_id) \
+                                      .values_list('updated_at', flat=True).first()
+    return updated_at is not None and timezone.now() - updated_at < datetime.timedelta(seconds=window)
+
+
+class ShardRouter:
+    """
+    가계부 shard DB 라우터.
+
+    `SHARDED_MODELS` 모델의 읽기･쓰기를 다음 순서로 정한 유저 shard 로 보낸다.
+        - `expenses.sharding.use_shard()`로 지정한 shard (관리 커맨드 등)
+        - 객체(instance) 힌트의 DB(shard 인 경우) 또는 객체 유저의 shard
+        - 라우팅 컨텍스트(`login_decorator`가 설정한 유저)의 shard
+    shard 가 default 이거나 정할 수 없으면 None 을 반환하여 다음 라우터(`ReplicaRouter`)에 맡긴다.
+    shard 가 하나이면 항상 None 을 반환한다.
+    """
+
+    def db_for_read(self, model, **hints):
+        return self.db_for_shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_shard(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        from expenses import sharding
+
+        if sharding.is_sharded(type(obj1)) or sharding.is_sharded(type(obj2)):
+            return True
+        return None
+
+    @staticmethod
+    def db_for_shard(model, hints):
+        from expenses import sharding
+
+        alias = sharding.get_override()
+        if alias is not None:
+            return alias if sharding.is_sharded(model) else None
+        shards = sharding.get_shards()
+        if len(shards) == 1 or not sharding.is_sharded(model):
+            return None
+
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in shards:
+            alias = instance._state.db
+        elif instance is not None and getattr(instance, 'user_id', None) is not None:
+            alias = sharding.get_shard(instance.user_id)
+        else:
+            context = _context.get()
+            if context is None or context.user_id is None:
+                return None
+            alias = sharding.get_shard(context.user_id)
+        return None if alias == DEFAULT_DB_ALIAS else alias
+
+
+class ReplicaRouter:
+    """
+    읽기 replica DB 라우터.
+
+    쓰기는 primary(default)로, 읽기는 `DATABASE_REPLICAS`의 replica 로 보낸다.
+    다음 읽기는 primary 로 보낸다.
+        - 트랜잭션(atomic 블록) 안의 읽기와 쓰기 요청(POST･PUT･DELETE 등)의 읽기
+        - `PRIMARY_ONLY_MODELS` 모델의 읽기
+        - 정상 replica 가 없는 경우
+        - 최근 READ_YOUR_WRITES_WINDOW 초 안에 쓰기를 한 유저의 읽기 (read-your-writes)
+    쓰기를 한 유저는 프로세스 내부 목록에 고정(pin)하고, 다른 프로세스의 쓰기는 요청마다 한 번
+    `wrote_recently()`로 확인한다. 유저는 `login_decorator`가 설정한 라우팅 컨텍스트에서 가져온다.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas:
+            return None
+        if model._meta.label in getattr(settings, 'PRIMARY_ONLY_MODELS', []):
+            replica_state.count('primary_only_reads')
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            replica_state.count('atomic_reads')
+            return DEFAULT_DB_ALIAS
+        if self.is_pinned():
+            replica_state.count('pinned_reads')
+            return DEFAULT_DB_ALIAS
+
+        alias = replica_state.choose(replicas)
+        if alias is None:
+            replica_state.count('fallback_reads')
+            return DEFAULT_DB_ALIAS
+        replica_state.count('replica_reads', alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        if get_replicas():
+            replica_state.count('writes')
+            context = _context.get()
+            if context is not None and context.user_id is not None:
+                replica_state.pin(context.user_id, getattr(settings, 'READ_YOUR_WRITES_WINDOW', 5))
+                context.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    @staticmethod
+    def is_pinned():
+        context = _context.get()
+        if context is None or context.user_id is None:
+            return False
+        if context.pinned is None:
+            window = getattr(settings, 'READ_YOUR_WRITES_WINDOW', 5)
+            context.pinned = replica_state.is_pinned(context.user_id) or wrote_recently(context.user_id, window)
+        return context.pinned
@@ -0,0 +1,189 @@
+import datetime
+import re
+
+from .exceptions import InvalidValueException, DataTooLongException, DataTypeException
+
+
+def parse_date(value):
+    """yyyy-mm-dd 문자열을 date 로 바꾼다. 형식이 다르면 `InvalidValueException`."""
+
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise InvalidValueException(message="date format must be 'yyyy-mm-dd'.")
+
+
+class Field:
+    """
+    스키마 필드 선언 클래스.
+
+    parameters
+    ----------
+    datatype: type (str, int …, bool 은 int 로 인정하지 않는다)
+    max_length: int (문자열 최대 길이)
+    pattern: str (정규식, 미리 컴파일하여 `match`로 검사한다)
+    pattern_message: str (형식 오류 메시지)
+    parse: callable(value) (검사 후 값 변환, 예: `parse_date`)
+    minimum: int (최솟값)
+    minimum_message: str (최솟값 오류 메시지)
+    required: bool (전체 검사 시 필수 여부, default: True)
+    nullable: bool (None(JSON null) 허용 여부, None 은 검사 없이 그대로 반환한다, default: False)
+    """
+
+    def __init__(self, datatype, max_length=None, pattern=None, pattern_message=None, parse=None,
+                 minimum=None, minimum_message=None, required=True, nullable=False):
+        self.datatype = datatype
+        self.max_length = max_length
+        self.pattern = pattern
+        self.pattern_message = pattern_message
+        self.parse = parse
+        self.minimum = minimum
+        self.minimum_message = minimum_message
+        self.required = required
+        self.nullable = nullable
+
+    def compile(self, name):
+        """
+        필드 검사 함수 컴파일 함수.
+
+        오류 메시지와 정규식을 미리 만들어 두고, 선언된 검사만 순서대로(자료형 → 길이 → 형식 → 변환 → 최솟값)
+        수행하는 함수를 반환한다. 오류 메시지는 스키마 도입 이전의 필드별 검사와 같다.
+
+        returns
+        -------
+        check: callable(value) → value
+        """
+
+        datatype = self.datatype
+        type_message = "%s datatype must be %s." % (name, datatype)
+
+        def check_type(value):
+            if type(value) is not datatype:
+                raise DataTypeException(message=type_message)
+            return value
+
+        steps = []
+        if self.max_length is not None:
+            max_length = self.max_length
+            length_message = "'%s' too long. (max: %d)" % (name, max_length)
+
+            def check_length(value):
+                if len(value) > max_length:
+                    raise DataTooLongException(message=length_message)
+                return value
+            steps.append(check_length)
+        if self.pattern is not None:
+            match = re.compile(self.pattern).match
+            pattern_message = self.pattern_message or "invalid %s." % name
+
+            def check_pattern(value):
+                if match(value) is None:
+                    raise InvalidValueException(message=pattern_message)
+                return value
+            steps.append(check_pattern)
+        if self.parse is not None:
+            steps.append(self.parse)
+        if self.minimum is not None:
+            minimum = self.minimum
+            minimum_message = self.minimum_message or "%s must be at least %s." % (name, minimum)
+
+            def check_minimum(value):
+                if value < minimum:
+                    raise InvalidValueException(message=minimum_message)
+                return value
+            steps.append(check_minimum)
+
+        if not steps:
+            check = check_type
+        elif len(steps) == 1:
+            step = steps[0]
+
+            def check(value):
+                return step(check_type(value))
+        else:
+            def check(value):
+                value = check_type(value)
+                for step in steps:
+                    value = step(value)
+                return value
+
+        if self.nullable:
+            check_value = check
+            return lambda value: None if value is None else check_value(value)
+        return check
+
+
+class Schema:
+    """
+    선언형 입력값 스키마 클래스.
+
+    필드 선언(`Field`)을 생성 시 한 번 필드별 검사 함수로 컴파일하고, 입력 dict 를 한 번 순회하며 모든 필드를 검사한다.
+    선언되지 않은 키는 `KeyError`(뷰에서 "'<key>' is required.")로, 전체 검사 시 빠진 필수 키는
+    `InvalidValueException`("'<key>' is required.")으로 알린다.
+
+    parameters
+    ----------
+    name: str (입력 이름, 자료형 오류 메시지에 사용한다)
+    fields: dict (필드 이름 → Field)
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.checks = {key: field.compile(key) for key, field in fields.items()}
+        self.required = tuple(key for key, field in fields.items() if field.required)
+        self.type_message = "%s datatype must be <class 'dict'>." % name
+
+    def validate(self, data, partial=False):
+        """
+        단건 검사 함수.
+
+        parameters
+        ----------
+        data: dict (JSON)
+        partial: bool (True 이면 입력된 키만 검사한다, 수정 요청용)
+
+        returns
+        -------
+        data: dict (변환된 값)
+        """
+
+        if type(data) is not dict:
+            raise DataTypeException(message=self.type_message)
+        checks = self.checks
+        cleaned = {}
+        for key, value in data.items():
+            cleaned[key] = checks[key](value)
+        if not partial:
+            for key in self.required:
+                if key not in cleaned:
+                    raise InvalidValueException(message="'%s' is required." % key)
+        return cleaned
+
+    def validate_many(self, items, partial=False):
+        """
+        일괄 검사 함수.
+
+        항목마다 `validate()`를 수행하고 오류를 항목 위치(index)별로 모은다. 첫 오류에서 멈추지 않는다.
+
+        parameters
+        ----------
+        items: iterable of dict
+        partial: bool
+
+        returns
+        -------
+        valid: list of (index, dict)
+        errors: list of (index, AbstractException)
+        """
+
+        validate = self.validate
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, validate(item, partial)))
+            except (DataTypeException, DataTooLongException, InvalidValueException) as e:
+                errors.append((index, e))
+            except KeyError as e:
+                errors.append((index, InvalidValueException(message="%s is required." % e)))
+        return valid, errors
@@ -0,0 +1,226 @@
+import asyncio
+import itertools
+import queue
+import re
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+from utils.responses import encode_rows
+
+# 서버 측 커서에서 한 번에 가져오는 행 수
+CHUNK_SIZE = getattr(settings, 'STREAM_CHUNK_SIZE', 2000)
+
+# 응답 버퍼 크기 (이 크기 이상이 모이면 클라이언트로 전송한다)
+BUFFER_SIZE = 64 * 1024
+
+# 한 번에 인코딩하는 행 수 (`utils.responses.encode_rows`)
+ENCODE_BATCH_SIZE = 500
+
+GZIP_PATTERN = re.compile(r'\bgzip\b')
+
+
+def in_event_loop():
+    """현재 스레드에서 이벤트 루프가 실행 중인지 확인한다."""
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def produce_in_thread(rows, chunk_size, maxsize=4):
+    """
+    별도 스레드 생산자(producer) 함수.
+
+    Django 3.2 ASGI 핸들러는 스트리밍 응답을 이벤트 루프 스레드에서 동기로 반복하므로
+    그 스레드에서는 ORM 을 사용할 수 없다. 이 경우 조회는 별도 스레드에서 수행하고
+    크기가 제한된 큐(maxsize 개 chunk)로 전달하여 메모리 사용량을 일정하게 유지한다.
+    """
+
+    chunks = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                chunks.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def produce():
+        try:
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    put(chunk)
+                    chunk = []
+                    if stopped.is_set():
+                        return
+            put(chunk)
+            put(done)
+        except Exception as e:
+            put(e)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=produce, name='stream-producer', daemon=True).start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield from chunk
+    finally:
+        stopped.set()
+
+
+def iterate_rows(queryset, fields, chunk_size=CHUNK_SIZE):
+    """
+    행 스트리밍 함수.
+
+    조회할 DB 는 호출 시점(뷰 실행 중)에 정한다. 응답은 뷰가 끝난 뒤 반복되므로
+    그때는 `login_decorator`가 설정한 DB 라우팅 컨텍스트(shard･replica)가 없다.
+    이벤트 루프 스레드(ASGI)에서 반복되는 경우에는 조회를 별도 스레드에서 수행한다.
+    생성 시점이 아닌 반복 시점의 스레드를 기준으로 판단한다.
+    """
+
+    queryset = queryset.using(queryset.db)
+
+    def iterate():
+        rows = fetch_rows(queryset, fields, chunk_size)
+        if in_event_loop():
+            rows = produce_in_thread(rows, chunk_size)
+        yield from rows
+
+    return iterate()
+
+
+def fetch_rows(queryset, fields, chunk_size=CHUNK_SIZE):
+    """
+    행 조회 함수.
+
+    queryset 결과를 `values_list` 튜플로 chunk 단위로 반환한다.
+    MySQL(mysqlclient)은 기본 커서가 결과 전체를 메모리에 올리므로
+    서버 측 커서(SSCursor)로 직접 조회하고, 그 외 DB는 `QuerySet.iterator()`를 사용한다.
+    DB 값 변환(타임존 등)은 Django compiler 의 converter 를 그대로 적용한다.
+
+    parameters
+    ----------
+    queryset: QuerySet
+    fields: tuple of str
+    chunk_size: int
+
+    returns
+    -------
+    rows: generator of tuple
+    """
+
+    queryset = queryset.values_list(*fields)
+    connection = connections[queryset.db]
+    if connection.vendor != 'mysql':
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+
+    from MySQLdb.cursors import SSCursor
+
+    compiler = queryset.query.get_compiler(using=queryset.db)
+    sql, params = compiler.as_sql()
+    connection.ensure_connection()
+    cursor = connection.connection.cursor(SSCursor)
+
+    def chunks():
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+
+    # 변환기(converter)가 있는 열(DateTimeField 등)이 있으면 행이 list 로 반환되므로 tuple 로 받는다.
+    try:
+        yield from compiler.results_iter(results=chunks(), tuple_expected=True)
+    finally:
+        cursor.close()
+
+
+def stream_json(key, rows, fields, extra=None):
+    """
+    점진적(incremental) JSON 인코딩 함수.
+
+    `{"<key>": [{...}, ...], <extra>}` 형식의 JSON 을 ENCODE_BATCH_SIZE 행 단위로 인코딩하며
+    버퍼가 BUFFER_SIZE 이상이 될 때마다 반환한다.
+
+    parameters
+    ----------
+    key: str
+    rows: iterable of tuple
+    fields: tuple of str
+    extra: dict
+
+    returns
+    -------
+    chunks: generator of str
+    """
+
+    encode = DjangoJSONEncoder(ensure_ascii=False).encode
+    buffer = ['{%s: [' % encode(key)]
+    size = 0
+    separator = ''
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, ENCODE_BATCH_SIZE))
+        if not batch:
+            break
+        item = separator + ', '.join(encode_rows(fields, batch, ensure_ascii=False))
+        buffer.append(item)
+        size += len(item)
+        separator = ', '
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    buffer.append(']')
+    for name, value in (extra or {}).items():
+        buffer.append(', %s: %s' % (encode(name), encode(value)))
+    buffer.append('}')
+    yield ''.join(buffer)
+
+
+def streaming_json_response(key, queryset, fields, extra=None, status=200):
+    """queryset 을 스트리밍 JSON 으로 반환하는 StreamingHttpResponse 를 만든다."""
+
+    return StreamingHttpResponse(stream_json(key, iterate_rows(queryset, fields), fields, extra),
+                                 content_type='application/json', status=status)
+
+
+def gzip_stream(request, response):
+    """
+    스트리밍 응답 gzip 압축 함수.
+
+    Accept-Encoding 에 gzip 이 있으면 `streaming_content`를 chunk 단위로 압축하여 전송하도록 바꾼다.
+    (`django.middleware.gzip.GZipMiddleware`와 같은 방식이며, 전체 응답이 아닌 요청한 뷰에만 적용한다)
+    """
+
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if not GZIP_PATTERN.search(request.headers.get('Accept-Encoding', '')):
+        return response
+    response.streaming_content = compress_sequence(response.streaming_content)
+    response['Content-Encoding'] = 'gzip'
+    return response
+
+
+def is_streaming(request):
+    """쿼리 파라미터 `stream`이 참 값인지 확인한다."""
+
+    return request.GET.get('stream', '').lower() in ('1', 'true', 'yes')
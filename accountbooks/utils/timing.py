@@ -0,0 +1,207 @@
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+
+# 현재 요청의 구간별 처리 시간 (`TimingMiddleware`가 요청마다 설정한다)
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    요청 1건의 구간별 처리 시간(초)과 DB 쿼리 수.
+
+    구간(phase): db, auth, serialize (`timer()`로 측정), total (미들웨어가 측정)
+    view 는 total 에서 auth 와 serialize 를 뺀 값이다. (DB 시간 포함)
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.queries = 0
+        self.total = 0.0
+
+    def add(self, phase, duration):
+        self.phases[phase] = self.phases.get(phase, 0.0) + duration
+
+    def add_query(self, duration):
+        self.queries += 1
+        self.add('db', duration)
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        return self
+
+    def as_dict(self):
+        """구간별 처리 시간(ms) dict 를 반환한다."""
+
+        phases = {'db': 0.0, 'auth': 0.0, 'serialize': 0.0}
+        phases.update(self.phases)
+        phases['view'] = max(self.total - phases['auth'] - phases['serialize'], 0.0)
+        phases['total'] = self.total
+        return {phase: duration * 1000 for phase, duration in phases.items()}
+
+    def server_timing(self):
+        """`Server-Timing` 헤더 값을 반환한다."""
+
+        timings = self.as_dict()
+        entries = ['%s;dur=%.2f' % (phase, duration) for phase, duration in timings.items()]
+        entries.append('queries;desc="%d"' % self.queries)
+        return ', '.join(entries)
+
+
+def start():
+    """현재 컨텍스트에 새 `RequestTimings`를 설정하고 (timings, reset token)을 반환한다."""
+
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+@contextlib.contextmanager
+def timer(phase):
+    """with 블록의 처리 시간을 현재 요청의 phase 구간에 더한다. 요청 밖에서는 아무것도 하지 않는다."""
+
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    `connection.execute_wrapper` 함수.
+
+    현재 요청의 DB 쿼리 수와 처리 시간을 기록한다.
+    """
+
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(time.perf_counter() - started)
+
+
+def install(connection, **kwargs):
+    """
+    DB 연결에 `record_query`를 (한 번만) 설치한다.
+
+    요청 밖에서는 아무것도 기록하지 않으므로 연결에 계속 남겨둔다.
+    `connection.execute_wrapper()` 컨텍스트 매니저는 리스트의 마지막 항목을 제거하므로 맨 앞에 추가한다.
+    `connection_created` 시그널 수신 함수로도 사용한다.
+    """
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class Histogram:
+    """
+    고정 구간(bucket) 히스토그램 클래스.
+
+    값(ms)을 누적 구간별 개수로 집계하며, 백분위수는 구간 상한값으로 근사한다.
+    """
+
+    BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, rank):
+        if not self.count:
+            return 0.0
+        target = rank / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count'  : self.count,
+            'sum'    : self.sum,
+            'mean'   : self.sum / self.count if self.count else 0.0,
+            'max'    : self.max,
+            'p50'    : self.percentile(50),
+            'p95'    : self.percentile(95),
+            'p99'    : self.percentile(99),
+            'buckets': dict(zip([str(bucket) for bucket in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+
+class RouteMetrics:
+    """
+    경로(route)별 구간 처리 시간 히스토그램 집계 클래스.
+
+    key 는 'METHOD route' (예: 'GET expenses/<int:expense_id>/') 이다.
+    """
+
+    PHASES = ('total', 'view', 'db', 'auth', 'serialize')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, key, timings, status):
+        values = timings.as_dict()
+        with self._lock:
+            route = self._routes.get(key)
+            if route is None:
+                route = self._routes[key] = {
+                    'requests'  : 0,
+                    'errors'    : 0,
+                    'queries'   : Histogram(buckets=(0, 1, 2, 5, 10, 20, 50, 100, 1000)),
+                    'histograms': {phase: Histogram() for phase in self.PHASES},
+                }
+            route['requests'] += 1
+            route['errors'] += status >= 500
+            route['queries'].observe(timings.queries)
+            for phase in self.PHASES:
+                route['histograms'][phase].observe(values[phase])
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: {
+                    'requests': route['requests'],
+                    'errors'  : route['errors'],
+                    'queries' : route['queries'].as_dict(),
+                    'ms'      : {phase: histogram.as_dict() for phase, histogram in route['histograms'].items()},
+                }
+                for key, route in self._routes.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+
+route_metrics = RouteMetrics()
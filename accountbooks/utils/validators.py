@@ -1,11 +1,10 @@
-import re
-
 import jwt
-import bcrypt
 
 import my_settings
 
-from .exceptions import InvalidValueException, DataTooLongException, DataTypeException
+from .exceptions import InvalidValueException
+from .hashing import hash_password, verify_password
+from .schema import Field, Schema, parse_date
 
 # 이메일 정규식 검사 패턴
 # alphanumeric@alphanumeric.alphanumeric
@@ -15,6 +14,21 @@ EMAIL_REGEX_PATTERN = "^[a-zA-Z0-9]([-_\.]?[a-zA-Z0-9])*@[a-zA-Z0-9]([-_\.]?[a-z
 # 8자 이상, alphanumeric + 특수기호
 PASSWORD_REGEX_PATTERN = "^(?=.*[A-Za-z])(?=.*\d)(?=.*[@$!%*#?&])[A-Za-z\d@$!%*#?&]{8,}$"
 
+# 모듈 로드 시 한 번 컴파일되는 검사 함수･스키마
+check_email = Field(str, max_length=60, pattern=EMAIL_REGEX_PATTERN,
+                    pattern_message="invalid email address.").compile('email')
+check_password_format = Field(str, max_length=24, pattern=PASSWORD_REGEX_PATTERN,
+                              pattern_message="passwords must be at least 8 characters long and contain "
+                                              "alphanumeric characters and special characters.").compile('password')
+
+EXPENSE_SCHEMA = Schema('expense', {
+    'title'      : Field(str, max_length=255),
+    'date'       : Field(str, parse=parse_date),
+    'amount'     : Field(int, minimum=0, minimum_message="amount must be positive."),
+    'description': Field(str, max_length=255),
+    'tag'        : Field(int, required=False, nullable=True),
+})
+
 
 def validate_email(email):
     """
@@ -31,18 +45,14 @@ def validate_email(email):
     email: str
     """
 
-    if validate_datatype(data=email, field='email'):
-        if validate_length(data=email, field='email'):
-            if re.match(EMAIL_REGEX_PATTERN, email):
-                return email
-            raise InvalidValueException(message="invalid email address.")
+    return check_email(email)
 
 
 def validate_password(password):
     """
     패스워드 유효성 검사 함수.
 
-    자료형(type)･크기(length)･형식(format)을 검사한다.
+    자료형(type)･크기(length)･형식(format)을 검사한 뒤 해싱 전용 풀에서 암호화한다.
 
     parameters
     ----------
@@ -53,83 +63,34 @@ def validate_password(password):
     password: str
     """
 
-    if validate_datatype(data=password, field='password'):
-        if validate_length(data=password, field='password'):
-            if re.match(PASSWORD_REGEX_PATTERN, password):
-                return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            raise InvalidValueException(message="passwords must be at least 8 characters long and "
-                                                "contain alphanumeric characters and special characters.")
+    return hash_password(check_password_format(password))
 
 
-def validate_expense(data):
+def validate_expense(data, partial=False):
     """
     지출내역 입력값 유효성 검사 함수.
 
-    자료형(type)･크기(length)･형식(format)을 검사한다.
+    `EXPENSE_SCHEMA`로 모든 필드의 자료형(type)･크기(length)･형식(format)을 한 번에 검사하고
+    날짜(date)를 datetime.date 로 변환한다. 여러 건은 `EXPENSE_SCHEMA.validate_many()`로 검사한다.
 
     parameters
     ----------
     data: dict (JSON)
+    partial: bool (True 이면 입력된 필드만 검사한다, 수정 요청용)
 
     returns
     -------
     data: dict
     """
 
-    for key, value in data.items():
-        if validate_datatype(data=value, field=key):
-            if validate_length(data=value, field=key):
-                return data
-
-
-def validate_datatype(data, field):
-    """
-    유효성 검사 하위 함수. (자료형 검사)
-
-    parameters
-    ----------
-    data: dynamic (str OR int)
-    field: str
-
-    return
-    ------
-    True: bool
-    """
-
-    type_dict = {'email': str, 'password': str, 'title': str,
-                 'date': str, 'amount': int, 'description': str}
-    if type(data) != type_dict[field]:
-        raise DataTypeException(message="%s datatype must be %s." % (field, type_dict[field]))
-    return True
-
-
-def validate_length(data, field):
-    """
-    유효성 검사 하위 함수. (데이터 크기 검사)
-
-    Parameters
-    ----------
-    data: dynamic (str OR int)
-    field: str
-
-    Returns
-    -------
-    True: bool
-    """
-
-    length_dict = {'email': 60, 'password': 24, 'title': 255, 'description': 255}
-    if field == 'amount' or field == 'date':
-        return True
-    if len(data) > length_dict[field]:
-        raise DataTooLongException(message="'%s' too long. (max: %d)" % (field, length_dict[field]))
-    return True
+    return EXPENSE_SCHEMA.validate(data, partial)
 
 
 def check_password(password, saved_password, user_id):
     """
     패스워드 비교 함수.
 
-    입력받은 로그인 패스워드와 저장된 패스워드를 비교한다.
+    입력받은 로그인 패스워드와 저장된 패스워드를 해싱 전용 풀에서 비교한다.
 
     Parameters
     ----------
@@ -142,7 +103,7 @@ def check_password(password, saved_password, user_id):
     token: str (jwt token)
     """
 
-    if bcrypt.checkpw(password.encode('utf-8'), saved_password.encode('utf-8')):
+    if verify_password(password, saved_password):
         token = jwt.encode(payload={'user_id': user_id}, key=my_settings.SECRET_KEY, algorithm=my_settings.ALGORITHM)
         return token
     raise InvalidValueException(message="invalid 'email' or 'password'.")